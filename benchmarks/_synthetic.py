@@ -0,0 +1,90 @@
+"""Synthetic candles and stand-in models shared by the benchmark scripts"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def make_candles(n_rows, seed=0):
+    """Random-walk OHLCV candles in the predictor's input column format"""
+    rng = np.random.default_rng(seed)
+    close = 45000 * np.exp(np.cumsum(rng.normal(0, 0.002, n_rows)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.004, n_rows)) * close
+    return pd.DataFrame({
+        'open_price': open_,
+        'high_price': np.maximum(open_, close) + spread,
+        'low_price': np.minimum(open_, close) - spread,
+        'close_price': close,
+        'volume': rng.uniform(500, 5000, n_rows),
+        'sentiment_score': np.round(rng.uniform(-1, 1, n_rows), 2),
+    })
+
+
+HEADLINE_WORDS = (
+    'bitcoin', 'btc', 'etf', 'approved', 'rally', 'surge', 'crash', 'ban', 'regulation', 'institutional',
+    'investors', 'exchange', 'hack', 'record', 'high', 'low', 'miners', 'halving', 'fed', 'rates',
+    'inflation', 'treasury', 'whales', 'selling', 'buying', 'support', 'volatile', 'market', 'price', 'week',
+)
+
+
+def make_headlines(n, seed=0):
+    """Random news-like headlines built from a small crypto vocabulary"""
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(6, 16, n)
+    words = rng.choice(HEADLINE_WORDS, lengths.sum())
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    return [' '.join(words[bounds[i]:bounds[i + 1]]).capitalize() for i in range(n)]
+
+
+def make_text_models(n_headlines=5000, n_components=32, seed=0):
+    """Fit stand-in TF-IDF and TruncatedSVD models like the shipped text artifacts"""
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    headlines = make_headlines(n_headlines, seed)
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2)).fit(headlines)
+    svd = TruncatedSVD(n_components=n_components, random_state=seed).fit(vectorizer.transform(headlines))
+    return {'tfidf_vectorizer': vectorizer, 'svd': svd}
+
+
+def make_models(n_rows=2000, seed=0, n_trees=50, max_depth=10):
+    """Fit small stand-in models with the same interfaces as the shipped artifacts"""
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.linear_model import LinearRegression, Ridge
+    from sklearn.preprocessing import StandardScaler
+    from xgboost import XGBRegressor
+
+    from model.predict import engineer_features_batch
+    from model.schema import compile_schema
+
+    candles = make_candles(n_rows + 1, seed)
+    features = engineer_features_batch(candles.iloc[:-1])
+    X = pd.DataFrame(features)
+    y = candles['close_price'].to_numpy()[1:]
+
+    scaler = StandardScaler().fit(X)
+    random_forest = RandomForestRegressor(n_estimators=n_trees, max_depth=max_depth, random_state=seed)
+    random_forest.fit(pd.DataFrame(scaler.transform(X), columns=X.columns), y)
+    ridge = Ridge(alpha=1.0).fit(X.values, y)
+    xgboost = XGBRegressor(n_estimators=50, max_depth=4).fit(X.values, y)
+
+    base = np.column_stack([
+        random_forest.predict(pd.DataFrame(scaler.transform(X), columns=X.columns)),
+        ridge.predict(X.values),
+        xgboost.predict(X.values),
+    ])
+    meta_model = LinearRegression().fit(base, y)
+
+    models = {
+        'random_forest': random_forest,
+        'ridge': ridge,
+        'xgboost': xgboost,
+        'meta_model': meta_model,
+        'scaler': scaler,
+    }
+    models['schema'] = compile_schema(models)
+    return models
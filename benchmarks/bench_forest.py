@@ -0,0 +1,67 @@
+"""Random Forest latency: scikit-learn's predict vs. the flattened node-array evaluator
+
+    python benchmarks/bench_forest.py --synthetic-models
+    python benchmarks/bench_forest.py --synthetic-models --trees 200 --depth 0
+"""
+import argparse
+import time
+
+import numpy as np
+
+import _synthetic  # noqa: F401  (puts the repository root on sys.path)
+from _synthetic import make_candles, make_models
+
+from model.portable import FLAT_MAX_ROWS, flatten_forest
+from model.predict import engineer_features_batch, load_models
+from model.schema import schema_for
+
+
+def per_call(fn, X, repeat):
+    fn(X)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(X)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000, help="batch size for the throughput run")
+    parser.add_argument('--repeat', type=int, default=200, help="single-row calls to time")
+    parser.add_argument('--synthetic-models', action='store_true',
+                        help="fit a stand-in forest instead of loading the shipped artifacts")
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--depth', type=int, default=12, help="max_depth of the stand-in forest (0: unlimited)")
+    args = parser.parse_args()
+
+    if args.synthetic_models:
+        models = make_models(n_trees=args.trees, max_depth=args.depth or None)
+    else:
+        models = load_models()
+    forest = models['random_forest']
+    flat = flatten_forest('random_forest', forest, keep_original=False)
+    if flat is None:
+        parser.error("the flattened forest does not match scikit-learn")
+
+    layout = schema_for(models).layouts['random_forest']
+    X = layout.take(schema_for(models).fill_batch(engineer_features_batch(make_candles(args.rows, seed=3)), args.rows))
+    # Plain arrays on both sides: the comparison is the evaluator, not DataFrame handling
+    if hasattr(forest, 'feature_names_in_'):
+        del forest.feature_names_in_
+
+    error = np.max(np.abs(forest.predict(X) - flat.predict(X)))
+    print(f"trees: {flat.n_trees}, max nodes per tree: {flat.max_nodes}, max abs difference: {error:.3g}")
+
+    # The registry keeps the scikit-learn forest for batches above FLAT_MAX_ROWS;
+    # timing the flat evaluator alone shows where that crossover comes from
+    sizes = sorted({1, 16, FLAT_MAX_ROWS, args.rows})
+    print(f"{'rows':>8}  {'scikit-learn':>14}  {'flattened':>14}")
+    for size in sizes:
+        repeat = max(3, args.repeat // size)
+        sklearn_time = per_call(forest.predict, X[:size], repeat)
+        flat_time = per_call(flat.predict, X[:size], repeat)
+        print(f"{size:>8}  {sklearn_time * 1e3:11.3f} ms  {flat_time * 1e3:11.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Cold-start import time of the Streamlit app and the prediction module
+
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --budget streamlit_app=900 --runs 5
+
+Each module is imported in a fresh interpreter under ``python -X importtime``
+(best of ``--runs``). The report shows the slowest imports it pulled in and
+fails (exit status 1) when a module goes over its time budget or imports a
+library that should only load on first prediction, so it can run in CI as an
+import-time regression check. tests/test_import_time.py runs the deferred-import
+part of the check under pytest; the time budgets are only enforced here.
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Module -> (default budget in ms, libraries it must not import)
+TARGETS = {
+    'streamlit_app': (600, ('pandas', 'numpy', 'sklearn', 'xgboost', 'model.predict')),
+    'model.predict': (300, ('pandas', 'sklearn', 'xgboost')),
+}
+
+
+def import_profile(module):
+    """``{name: (self µs, cumulative µs)}`` of every module imported by ``import module``"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-W', 'ignore', '-c', f'import {module}'],
+                            cwd=REPO_ROOT, check=True, capture_output=True, text=True).stderr
+    profile = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        profile[name.strip()] = (int(own), int(cumulative))
+    return profile
+
+
+def measure(module, runs):
+    """Fastest of ``runs`` cold imports: ``(milliseconds, profile of that run)``"""
+    best = None
+    for _ in range(runs):
+        profile = import_profile(module)
+        if best is None or profile[module][1] < best[module][1]:
+            best = profile
+    return best[module][1] / 1000, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3, help="cold imports per module (the fastest counts)")
+    parser.add_argument('--budget', action='append', default=[], metavar='MODULE=MS',
+                        help="override a module's import-time budget")
+    parser.add_argument('--top', type=int, default=8, help="slowest imports listed per module")
+    args = parser.parse_args()
+
+    budgets = {module: budget for module, (budget, _) in TARGETS.items()}
+    for item in args.budget:
+        module, _, ms = item.partition('=')
+        if module not in TARGETS:
+            parser.error(f"unknown module {module!r}; choose from {', '.join(TARGETS)}")
+        budgets[module] = float(ms)
+
+    failures = []
+    for module, (_, deferred) in TARGETS.items():
+        ms, profile = measure(module, args.runs)
+        print(f"{module:<16}{ms:9.1f} ms  (budget {budgets[module]:g} ms)")
+        slowest = sorted(((name, own) for name, (own, _) in profile.items() if name != module),
+                         key=lambda item: item[1], reverse=True)[:args.top]
+        for name, own in slowest:
+            print(f"{'':>18}{name:<40}{own / 1000:8.1f} ms self")
+        if ms > budgets[module]:
+            failures.append(f"{module} imports in {ms:.0f} ms, over its {budgets[module]:g} ms budget")
+        eager = [name for name in deferred if name in profile]
+        if eager:
+            failures.append(f"{module} imports {', '.join(eager)} eagerly")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Cold-start load time and resident memory: pickled vs. portable model sets
+
+    python benchmarks/bench_model_load.py --manifest model/manifest.json --portable /tmp/portable
+    python benchmarks/bench_model_load.py --synthetic-models --trees 300
+
+Each model set is loaded in a fresh interpreter so import and page-cache
+effects are measured the way a new worker process sees them.
+"""
+import argparse
+import json
+import pickle
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import _synthetic  # noqa: F401  (puts the repository root on sys.path)
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+_CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+from model.registry import ModelRegistry, _resident_bytes
+rss = _resident_bytes()
+start = time.perf_counter()
+registry = ModelRegistry({models_dir!r})
+registry.models()
+print(json.dumps({{'seconds': time.perf_counter() - start, 'resident': _resident_bytes() - rss,
+                  'per_model': {{name: entry.get('load_seconds') for name, entry in registry.stats().items()}}}}))
+"""
+
+
+def measure(models_dir):
+    code = _CHILD.format(root=str(REPO_ROOT), models_dir=str(models_dir))
+    output = subprocess.run([sys.executable, '-W', 'ignore', '-c', code],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def write_synthetic(directory, n_trees):
+    """Pickle a stand-in model set and write its manifest"""
+    from _synthetic import make_models
+
+    from model.manifest import write_manifest
+
+    models = make_models(n_trees=n_trees, max_depth=None)
+    names = ('random_forest', 'ridge', 'xgboost', 'meta_model', 'scaler')
+    for name in names:
+        with open(directory / f'{name}.pkl', 'wb') as f:
+            pickle.dump(models[name], f)
+    manifest = {'manifest_version': 1,
+                'artifacts': {name: {'path': f'{name}.pkl', 'format': 'pickle', 'required': True} for name in names}}
+    with open(directory / 'manifest.json', 'w') as f:
+        json.dump(manifest, f)
+    write_manifest(directory / 'manifest.json')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--manifest', default=str(REPO_ROOT / 'model' / 'manifest.json'),
+                        help="manifest of the pickled model set")
+    parser.add_argument('--portable', default=None,
+                        help="directory of an exported model set (exported to a temp dir if omitted)")
+    parser.add_argument('--synthetic-models', action='store_true',
+                        help="pickle stand-in models instead of using the shipped artifacts")
+    parser.add_argument('--trees', type=int, default=50, help="forest size for --synthetic-models")
+    args = parser.parse_args()
+
+    from model.export import export_models
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        manifest = Path(args.manifest)
+        if args.synthetic_models:
+            (tmp / 'pickle').mkdir()
+            write_synthetic(tmp / 'pickle', args.trees)
+            manifest = tmp / 'pickle' / 'manifest.json'
+        portable = Path(args.portable) if args.portable else tmp / 'portable'
+        if not args.portable:
+            export_models(manifest, portable)
+
+        for label, directory in (('pickle', manifest.parent), ('portable', portable)):
+            result = measure(directory)
+            print(f"{label:>9}: {result['seconds'] * 1000:9.1f} ms  {result['resident'] / 2**20:8.1f} MiB resident")
+            for name, seconds in result['per_model'].items():
+                if seconds is not None:
+                    print(f"{'':>11}{name:<16}{seconds * 1000:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Compare rows/sec of predict_batch against the per-row make_predictions loop
+
+    python benchmarks/bench_predict_batch.py --rows 5000
+    python benchmarks/bench_predict_batch.py --rows 5000 --synthetic-models
+"""
+import argparse
+import time
+
+import _synthetic  # noqa: F401  (puts the repository root on sys.path)
+from _synthetic import make_candles, make_models
+
+from model.predict import (calculate_confidence, engineer_features, load_models,
+                           make_predictions, predict_batch)
+
+
+def per_row(models, candles):
+    results = []
+    for row in candles.to_dict('records'):
+        features = engineer_features(row)
+        predictions = make_predictions(models, features)
+        results.append((predictions['meta_model'], calculate_confidence(predictions, features)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--loop-rows', type=int, default=None,
+                        help="rows scored by the per-row loop (defaults to --rows)")
+    parser.add_argument('--synthetic-models', action='store_true',
+                        help="fit stand-in models instead of loading the shipped artifacts")
+    parser.add_argument('--execution', choices=['serial', 'thread', 'process'], default='serial',
+                        help="how predict_batch runs the base models")
+    parser.add_argument('--repeat', type=int, default=5, help="predict_batch runs used for the per-model timings")
+    args = parser.parse_args()
+
+    models = make_models() if args.synthetic_models else load_models()
+    candles = make_candles(args.rows, seed=1)
+    loop_candles = candles.iloc[:args.loop_rows or args.rows]
+
+    start = time.perf_counter()
+    per_row(models, loop_candles)
+    loop_seconds = time.perf_counter() - start
+
+    # Warm-up also starts the thread/process pool outside the timed runs
+    predict_batch(candles, models, execution=args.execution)
+    runs = []
+    for _ in range(args.repeat):
+        timings = {}
+        start = time.perf_counter()
+        predict_batch(candles, models, execution=args.execution, timings=timings)
+        runs.append((time.perf_counter() - start, timings))
+    batch_seconds = min(seconds for seconds, _ in runs)
+
+    loop_rate = len(loop_candles) / loop_seconds
+    batch_rate = len(candles) / batch_seconds
+    print(f"per-row loop : {len(loop_candles):>8} rows  {loop_rate:>12,.0f} rows/sec")
+    print(f"predict_batch: {len(candles):>8} rows  {batch_rate:>12,.0f} rows/sec")
+    print(f"speedup      : {batch_rate / loop_rate:>8.1f}x")
+    print(f"per-model time over {args.repeat} {args.execution} runs (min / max ms):")
+    for name in runs[0][1]:
+        times = [timings[name] * 1000 for _, timings in runs]
+        print(f"  {name:<14} {min(times):>9.2f} / {max(times):>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
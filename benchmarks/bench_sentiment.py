@@ -0,0 +1,75 @@
+"""Headline sentiment throughput: one-pass token matcher vs the old substring scans
+
+    python benchmarks/bench_sentiment.py --headlines 100000
+"""
+import argparse
+import random
+import time
+
+import _synthetic  # noqa: F401  (puts the repository root on sys.path)
+
+from model.sentiment import (CRYPTO_NEGATIVE, CRYPTO_POSITIVE, NEGATIVE_WORDS, POSITIVE_WORDS,
+                             score_headlines)
+
+FILLER = ('the', 'market', 'analysts', 'said', 'on', 'monday', 'after', 'traders', 'price', 'week',
+          'exchange', 'report', 'investors', 'shares', 'futures', 'support', 'upgrade', 'lower')
+VOCABULARY = sorted(POSITIVE_WORDS | NEGATIVE_WORDS | CRYPTO_POSITIVE | CRYPTO_NEGATIVE) + list(FILLER) * 4
+
+
+def make_headlines(n, seed=0):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(VOCABULARY) for _ in range(rng.randint(6, 16))).capitalize() for _ in range(n)]
+
+
+def substring_scores(headlines, market_data):
+    """The previous calculate_sentiment_score: one ``word in headline`` scan per lexicon word"""
+    positive_words, negative_words = list(POSITIVE_WORDS), list(NEGATIVE_WORDS)
+    crypto_positive, crypto_negative = list(CRYPTO_POSITIVE), list(CRYPTO_NEGATIVE)
+    price_range = market_data['high_price'] - market_data['low_price']
+    relative_range = price_range / market_data['open_price']
+    volume_factor = min(market_data['volume'] / 10000, 0.1)
+    scores = []
+    for headline in headlines:
+        headline = headline.lower()
+        positive_count = sum(1 for word in positive_words if word in headline)
+        negative_count = sum(1 for word in negative_words if word in headline)
+        score = (positive_count - negative_count) * 0.2
+        if relative_range > 0.05:
+            score += -0.1 if 'volatile' in headline else 0.05
+        if positive_count > negative_count:
+            score += volume_factor
+        elif negative_count > positive_count:
+            score -= volume_factor
+        for word in crypto_positive:
+            if word in headline and positive_count > 0:
+                score += 0.1
+        for word in crypto_negative:
+            if word in headline:
+                score -= 0.15
+        scores.append(round(max(min(score, 1), -1), 2))
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--headlines', type=int, default=100000)
+    args = parser.parse_args()
+
+    headlines = make_headlines(args.headlines)
+    market_data = {'open_price': 45000.0, 'high_price': 46000.0, 'low_price': 44000.0, 'volume': 1500.0}
+
+    start = time.perf_counter()
+    substring_scores(headlines, market_data)
+    substring_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    score_headlines(headlines, market_data)
+    matcher_seconds = time.perf_counter() - start
+
+    print(f"substring scans : {args.headlines / substring_seconds:>12,.0f} headlines/sec")
+    print(f"score_headlines : {args.headlines / matcher_seconds:>12,.0f} headlines/sec")
+    print(f"speedup         : {substring_seconds / matcher_seconds:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Throughput of the batched TF-IDF -> TruncatedSVD headline embedding stage
+
+    python benchmarks/bench_text_features.py
+    python benchmarks/bench_text_features.py --synthetic-models --sizes 1000 10000 100000
+"""
+import argparse
+import time
+
+import _synthetic  # noqa: F401  (puts the repository root on sys.path)
+from _synthetic import make_headlines, make_text_models
+
+from model.predict import load_models
+from model.text_features import embed_headlines, has_text_stage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--batch-size', type=int, default=8192)
+    parser.add_argument('--synthetic-models', action='store_true',
+                        help="fit stand-in text models instead of loading the shipped artifacts")
+    args = parser.parse_args()
+
+    models = make_text_models() if args.synthetic_models else load_models()
+    if not has_text_stage(models):
+        parser.error("tfidf_vectorizer.pkl / svd_model.pkl are not loadable; use --synthetic-models")
+
+    headlines = make_headlines(max(args.sizes), seed=1)
+
+    # Per-headline calls, as a single-request path would make them
+    sample = headlines[:min(1000, len(headlines))]
+    start = time.perf_counter()
+    for headline in sample:
+        embed_headlines(models, [headline])
+    single_rate = len(sample) / (time.perf_counter() - start)
+    print(f"{'one at a time':>14}: {single_rate:>12,.0f} headlines/sec")
+
+    for size in args.sizes:
+        start = time.perf_counter()
+        embed_headlines(models, headlines[:size], batch_size=args.batch_size)
+        rate = size / (time.perf_counter() - start)
+        print(f"{size:>14,}: {rate:>12,.0f} headlines/sec")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""Score a large CSV or Parquet file of historical candles in fixed-size chunks
+
+The file is read ``chunk_rows`` candles at a time, scored with predict_batch()
+and the predictions are appended to the output file, so memory stays bounded
+by the chunk size however long the history is. The last ``N_LAGS`` candles of
+each chunk are carried into the next one, which makes the lag features (and
+therefore every prediction) identical to scoring the whole file at once.
+
+Rows must be consecutive candles of one series, in time order.
+"""
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from model.history import N_LAGS
+from model.predict import load_models, predict_batch
+
+CHUNK_ROWS = 100_000
+
+# Input columns, and the names historical OHLCV exports commonly use for them
+INPUT_COLUMNS = ('open_price', 'high_price', 'low_price', 'close_price', 'volume', 'sentiment_score', 'news_headline')
+COLUMN_ALIASES = {
+    'open': 'open_price',
+    'high': 'high_price',
+    'low': 'low_price',
+    'close': 'close_price',
+    'volume': 'volume',
+    'sentiment': 'sentiment_score',
+    'headline': 'news_headline',
+}
+REQUIRED_COLUMNS = ('open_price', 'high_price', 'low_price', 'volume')
+
+
+def file_format(path):
+    """``'csv'`` or ``'parquet'``, from a candle file's name"""
+    suffix = Path(path).suffix.lower()
+    if suffix in ('.parquet', '.pq'):
+        return 'parquet'
+    if suffix in ('.csv', '.txt') or Path(path).name.lower().endswith('.csv.gz'):
+        return 'csv'
+    raise ValueError(f"{path}: expected a .csv or .parquet file")
+
+
+def _column_map(columns):
+    """Map file column names to input column names"""
+    mapping = {}
+    for column in columns:
+        key = str(column).strip().lower()
+        if key in INPUT_COLUMNS:
+            mapping[column] = key
+        elif key in COLUMN_ALIASES:
+            mapping[column] = COLUMN_ALIASES[key]
+    missing = [name for name in REQUIRED_COLUMNS if name not in mapping.values()]
+    if missing:
+        raise ValueError(f"input is missing columns: {', '.join(missing)}")
+    return mapping
+
+
+def _read_parquet(path, chunk_rows, keep):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("reading Parquet needs pyarrow (pip install pyarrow)") from e
+    parquet = pq.ParquetFile(path)
+    mapping = _column_map(parquet.schema_arrow.names)
+    columns = list(mapping) + [column for column in keep if column not in mapping]
+    chunks = (batch.to_pandas() for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns))
+    return mapping, parquet.metadata.num_rows, chunks
+
+
+def _read_csv(path, chunk_rows, keep):
+    header = pd.read_csv(path, nrows=0).columns
+    mapping = _column_map(header)
+    columns = list(mapping) + [column for column in keep if column not in mapping]
+    dtypes = {column: 'float64' for column, name in mapping.items() if name != 'news_headline'}
+    return mapping, None, pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunk_rows)
+
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS, keep=()):
+    """Return ``(total rows or None, iterator of (candles, passthrough) chunks)``
+
+    Each chunk has at most ``chunk_rows`` rows. ``candles`` uses the input
+    column names; ``passthrough`` holds the ``keep`` columns unchanged.
+    """
+    reader = _read_parquet if file_format(path) == 'parquet' else _read_csv
+    mapping, total, chunks = reader(path, chunk_rows, keep)
+
+    def iterate():
+        for chunk in chunks:
+            candles = chunk[list(mapping)].rename(columns=mapping)
+            yield candles, chunk[list(keep)]
+
+    return total, iterate()
+
+
+class _Writer:
+    """Appends scored chunks to a CSV or Parquet file"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.format = file_format(path)
+        self._parquet = None
+        self._header = True
+
+    def write(self, frame):
+        if self.format == 'csv':
+            frame.to_csv(self.path, mode='w' if self._header else 'a', header=self._header, index=False)
+            self._header = False
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if self._parquet is None:
+            self._parquet = pq.ParquetWriter(self.path, table.schema)
+        self._parquet.write_table(table)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def backfill(input_path, output_path, chunk_rows=CHUNK_ROWS, keep=(), models=None, execution=None,
+             progress=True):
+    """Score every candle of ``input_path`` and write the predictions to ``output_path``
+
+    The output has a ``row`` column (0-based position in the input), any
+    ``keep`` columns copied from the input, one column per model, and
+    ``prediction`` / ``confidence``. Returns ``(rows scored, seconds)``.
+    """
+    if models is None:
+        models = load_models()
+    total, chunks = read_chunks(input_path, chunk_rows, keep)
+    writer = _Writer(output_path)
+    context = None
+    rows = 0
+    start = time.perf_counter()
+    try:
+        for candles, passthrough in chunks:
+            n_rows = len(candles)
+            if context is not None:
+                candles = pd.concat([context, candles], ignore_index=True)
+            result = predict_batch(candles.reset_index(drop=True), models, execution=execution)
+            result = result.iloc[len(candles) - n_rows:].reset_index(drop=True)
+            context = candles.iloc[-N_LAGS:]
+
+            result.insert(0, 'row', range(rows, rows + n_rows))
+            for i, column in enumerate(keep):
+                result.insert(1 + i, column, passthrough[column].to_numpy())
+            writer.write(result)
+
+            rows += n_rows
+            if progress:
+                elapsed = time.perf_counter() - start
+                done = f"{rows:,}/{total:,} ({rows / total:.0%})" if total else f"{rows:,}"
+                print(f"\rScored {done} rows, {rows / elapsed:,.0f} rows/sec", end='', file=sys.stderr)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    if progress:
+        print(file=sys.stderr)
+    return rows, elapsed
+
+
+def run(input_path, output_path, chunk_rows=CHUNK_ROWS, keep=(), execution=None):
+    """CLI entry point: score the file and report throughput"""
+    rows, elapsed = backfill(input_path, output_path, chunk_rows=chunk_rows, keep=keep, execution=execution)
+    rate = rows / elapsed if elapsed > 0 else float('inf')
+    print(f"Scored {rows:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/sec) -> {output_path}", file=sys.stderr)
@@ -0,0 +1,253 @@
+"""Walk-forward backtest of the ensemble over historical candles
+
+Every candle is scored for the next period's close, then the predictions are
+cut into consecutive walk-forward windows (``window`` rows, advancing by
+``step``) and RMSE, MAE, R² and directional accuracy are computed for each
+base model and the stacker, per window and overall. Window metrics come from
+prefix sums, so any number of windows costs a few vectorised passes.
+
+Engineered features do not depend on the models, so they are computed once
+per candle file and cached (as a memory-mapped ``.npy`` matrix when
+``cache_dir`` is set); re-running after a model swap only recomputes the
+predictions.
+
+    python -m model.backtest candles.parquet --window 43200 --record
+"""
+import argparse
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from model.backfill import CHUNK_ROWS, read_chunks
+from model.execution import BASE_MODEL_LABELS
+from model.feature_store import FeatureStore
+from model.history import N_LAGS
+from model.performance import METRICS, record_performance
+from model.predict import engineer_features_batch, load_models, make_predictions_batch
+from model.schema import FEATURE_NAMES
+from model.text_features import text_feature_columns
+
+# Bump when engineer_features_batch() changes, so cached matrices are rebuilt
+FEATURE_CACHE_VERSION = 1
+
+MODEL_LABELS = dict(BASE_MODEL_LABELS, meta_model='Meta Model')
+
+
+def load_candles(path):
+    """Read a CSV/Parquet candle file into one DataFrame with the input column names"""
+    _, chunks = read_chunks(path)
+    return pd.concat([candles for candles, _ in chunks], ignore_index=True)
+
+
+def window_bounds(n_rows, window=None, step=None):
+    """Start and end row of every walk-forward window; one window over everything by default
+
+    When the windows stop short of the last row, one more window is anchored
+    at the end of the series (it overlaps the one before), so the most recent
+    candles are always evaluated and every window has the same length.
+    """
+    window = min(window or n_rows, n_rows)
+    step = step or window
+    starts = np.arange(0, n_rows - window + 1, step, dtype=np.intp)
+    ends = starts + window
+    if len(starts) and ends[-1] < n_rows:
+        starts = np.append(starts, n_rows - window)
+        ends = np.append(ends, n_rows)
+    return starts, ends
+
+
+def uncovered_rows(n_rows, starts, ends):
+    """Number of rows that fall outside every window (when ``step`` exceeds ``window``)"""
+    depth = np.zeros(n_rows + 1, dtype=np.intp)
+    np.add.at(depth, starts, 1)
+    np.add.at(depth, ends, -1)
+    return int(np.count_nonzero(np.cumsum(depth[:n_rows]) == 0))
+
+
+def window_metrics(y_true, y_pred, previous, starts, ends):
+    """RMSE, MAE, R² and directional accuracy of every ``[start, end)`` window
+
+    ``previous`` is the close each prediction was made from, so a direction
+    hit means the prediction moved the same way as the market.
+    """
+    def window_sums(values):
+        prefix = np.concatenate([[0.0], np.cumsum(values, dtype=np.float64)])
+        return prefix[ends] - prefix[starts]
+
+    n = (ends - starts).astype(np.float64)
+    error = y_pred - y_true
+    # Centering keeps the R² sums of squares well conditioned for prices in the tens of thousands
+    centered = y_true - y_true.mean()
+    sse = window_sums(error * error)
+    total = window_sums(centered)
+    sst = window_sums(centered * centered) - total * total / n
+    hits = np.sign(y_pred - previous) == np.sign(y_true - previous)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'rmse': np.sqrt(sse / n),
+            'mae': window_sums(np.abs(error)) / n,
+            'r2': np.where(sst > 0, 1.0 - sse / sst, np.nan),
+            'directional_accuracy': window_sums(hits) / n,
+        }
+
+
+def _candle_key(candles):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{FEATURE_CACHE_VERSION}:{N_LAGS}:{','.join(FEATURE_NAMES)}".encode())
+    for column in ('open_price', 'high_price', 'low_price', 'close_price', 'volume', 'sentiment_score'):
+        digest.update(column.encode())
+        if column in candles:
+            digest.update(np.ascontiguousarray(candles[column].to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+
+def _finite(values):
+    """JSON-safe list: undefined metrics (e.g. R² of a flat window) become None"""
+    return [float(value) if np.isfinite(value) else None for value in values]
+
+
+class Backtest:
+    """Candles plus their engineered features, ready to evaluate any number of model sets
+
+    ``features`` (e.g. a range read from a FeatureStore) replaces engineering
+    them from ``candles``.
+    """
+
+    def __init__(self, candles=None, cache_dir=None, features=None):
+        if features is None:
+            self.candles = candles.reset_index(drop=True)
+            self.features = self._engineer(cache_dir)
+        else:
+            self.candles = None
+            self.features = features
+        close = self.features['Close']
+        # Row t predicts the close of row t + 1; the last candle has no target
+        self.previous = close[:-1]
+        self.target = close[1:]
+        self.headlines = None
+        if self.candles is not None and 'news_headline' in self.candles:
+            self.headlines = self.candles['news_headline'].tolist()
+
+    def _engineer(self, cache_dir):
+        if cache_dir is None:
+            return engineer_features_batch(self.candles)
+        cache_dir = Path(cache_dir)
+        key = _candle_key(self.candles)
+        matrix_path = cache_dir / f"{key}.npy"
+        names_path = cache_dir / f"{key}.json"
+        if matrix_path.exists() and names_path.exists():
+            with open(names_path) as f:
+                names = json.load(f)
+            matrix = np.load(matrix_path, mmap_mode='r')
+            return {name: matrix[i] for i, name in enumerate(names)}
+
+        features = engineer_features_batch(self.candles)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        names = list(features)
+        # Feature-major, so each column is one contiguous row of the file
+        np.save(matrix_path, np.vstack([features[name] for name in names]))
+        with open(names_path, 'w') as f:
+            json.dump(names, f)
+        return features
+
+    def predictions(self, models, execution=None, chunk_rows=CHUNK_ROWS):
+        """Every model's prediction for each candle that has a next close"""
+        n_rows = len(self.target)
+        out = {}
+        for start in range(0, n_rows, chunk_rows):
+            end = min(start + chunk_rows, n_rows)
+            chunk = {name: np.asarray(column[start:end]) for name, column in self.features.items()}
+            if self.headlines is not None:
+                chunk.update(text_feature_columns(models, self.headlines[start:end]))
+            for name, values in make_predictions_batch(models, chunk, execution=execution).items():
+                out.setdefault(name, np.empty(n_rows))[start:end] = values
+        return out
+
+    def run(self, models, window=None, step=None, execution=None):
+        """Walk-forward metrics for each model: ``{'overall': {...}, 'windows': {...}}`` per model"""
+        start = time.perf_counter()
+        predictions = self.predictions(models, execution=execution)
+        elapsed = time.perf_counter() - start
+        starts, ends = window_bounds(len(self.target), window, step)
+        if not len(starts):
+            raise ValueError("not enough candles for one backtest window")
+        everything = (np.array([0]), np.array([len(self.target)]))
+        report = {
+            'version': models.get('version'),
+            'rows': len(self.target),
+            'windows': {'start': starts.tolist(), 'end': ends.tolist()},
+            'uncovered_rows': uncovered_rows(len(self.target), starts, ends),
+            'prediction_seconds': elapsed,
+            'models': {},
+        }
+        for name, predicted in predictions.items():
+            overall = window_metrics(self.target, predicted, self.previous, *everything)
+            per_window = window_metrics(self.target, predicted, self.previous, starts, ends)
+            report['models'][name] = {
+                'overall': {metric: _finite(values)[0] for metric, values in overall.items()},
+                'windows': {metric: _finite(values) for metric, values in per_window.items()},
+            }
+        return report
+
+
+def print_report(report, file=sys.stdout):
+    n_windows = len(report['windows']['start'])
+    print(f"{report['rows']:,} candles, {n_windows} walk-forward window(s), "
+          f"predictions in {report['prediction_seconds']:.2f}s", file=file)
+    if report.get('uncovered_rows'):
+        print(f"{report['uncovered_rows']:,} rows fall outside every window (--step > --window)", file=file)
+    print(f"{'model':<14}{'RMSE':>12}{'MAE':>12}{'R²':>9}{'direction':>11}{'worst-window RMSE':>19}", file=file)
+    for name, metrics in report['models'].items():
+        overall = metrics['overall']
+        worst = max(value for value in metrics['windows']['rmse'] if value is not None)
+        r2 = 'n/a' if overall['r2'] is None else f"{overall['r2']:.4f}"
+        print(f"{MODEL_LABELS.get(name, name):<14}{overall['rmse']:12.2f}{overall['mae']:12.2f}{r2:>9}"
+              f"{overall['directional_accuracy']:11.1%}{worst:19.2f}", file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the ensemble on historical candles")
+    parser.add_argument('input', nargs='?', help="CSV/Parquet file of consecutive candles (same columns as --backfill)")
+    parser.add_argument('--store', help="read engineered features from this feature store instead of a candle file")
+    parser.add_argument('--start', help="with --store, first candle timestamp to evaluate")
+    parser.add_argument('--end', help="with --store, evaluate candles before this timestamp")
+    parser.add_argument('--window', type=int, help="rows per walk-forward window (default: one window)")
+    parser.add_argument('--step', type=int, help="rows between window starts (default: --window)")
+    parser.add_argument('--cache-dir', default='.backtest_cache', help="where engineered feature matrices are cached")
+    parser.add_argument('--no-feature-cache', action='store_true', help="recompute features instead of caching them")
+    parser.add_argument('--execution', choices=['serial', 'thread', 'process'])
+    parser.add_argument('--json', action='store_true', help="print the full report (every window) as JSON")
+    parser.add_argument('--record', action='store_true',
+                        help="store the stacker's overall metrics as this model version's reported performance")
+    args = parser.parse_args(argv)
+
+    if (args.input is None) == (args.store is None):
+        parser.error("give either a candle file or --store")
+    models = load_models()
+    if args.store:
+        backtest = Backtest(features=FeatureStore(args.store).read(args.start, args.end))
+    else:
+        backtest = Backtest(load_candles(args.input), cache_dir=None if args.no_feature_cache else args.cache_dir)
+    report = backtest.run(models, window=args.window, step=args.step, execution=args.execution)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print_report(report)
+
+    if args.record:
+        if report['version'] is None:
+            parser.error("--record needs registry-loaded models")
+        overall = report['models']['meta_model']['overall']
+        record_performance(report['version'], {metric: overall[metric] for metric in METRICS},
+                           rows=report['rows'], windows=len(report['windows']['start']),
+                           source=str(args.input or args.store), evaluated_at=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()))
+        print(f"Recorded performance for model version {report['version']}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""Base-model execution: serially, on a thread pool, or on a process pool
+
+The three base learners are independent, so a batch can score them
+concurrently before the meta model stacks their outputs. Scikit-learn and
+XGBoost release the GIL inside their native predict loops, which makes the
+thread pool the cheap option; the process pool gives each model its own
+interpreter and passes the feature matrix through shared memory instead of
+pickling it.
+
+The default mode comes from ``PREDICTOR_EXECUTION`` (``serial`` if unset).
+Workers load their models from the process-wide registry, so other model
+sets (horizons, candidate versions, ad-hoc registries) run on the thread
+pool instead.
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+from model.manifest import ManifestError
+from model.schema import BASE_MODELS
+
+EXECUTION_MODES = ('serial', 'thread', 'process')
+
+BASE_MODEL_LABELS = {
+    'random_forest': 'Random Forest',
+    'ridge': 'Ridge',
+    'xgboost': 'XGBoost',
+}
+
+_thread_pool = None
+_process_pool = None
+_pool_lock = threading.Lock()
+
+
+class WorkerVersionMismatch(RuntimeError):
+    """A worker's registry does not serve the model set a batch was scored with"""
+
+
+def default_execution():
+    """Execution mode configured for this process"""
+    mode = os.environ.get('PREDICTOR_EXECUTION', 'serial').lower()
+    return mode if mode in EXECUTION_MODES else 'serial'
+
+
+def predict_base(name, model, layout, X, default):
+    """Run one base model on rows of ``X`` (schema order), falling back to ``default``"""
+    if model is None:
+        return default
+    if layout is None:
+        # Rejected when the schema was compiled; the warning was printed then
+        return default
+    try:
+        return np.asarray(model.predict(layout.take(X)), dtype=np.float64).reshape(-1)
+    except Exception as e:
+        print(f"Warning: {BASE_MODEL_LABELS.get(name, name)} prediction failed: {e}", file=sys.stderr)
+        return default
+
+
+def _timed_predict(name, model, layout, X, default):
+    start = time.perf_counter()
+    prediction = predict_base(name, model, layout, X, default)
+    return prediction, time.perf_counter() - start
+
+
+def _get_thread_pool():
+    global _thread_pool
+    if _thread_pool is None:
+        with _pool_lock:
+            if _thread_pool is None:
+                _thread_pool = ThreadPoolExecutor(max_workers=len(BASE_MODELS), thread_name_prefix='base-model')
+    return _thread_pool
+
+
+def _get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        with _pool_lock:
+            if _process_pool is None:
+                # spawn: the parent runs threads, which fork() would copy in an undefined state
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=len(BASE_MODELS),
+                    mp_context=get_context('spawn'),
+                    initializer=_warm_worker,
+                )
+    return _process_pool
+
+
+def _discard_process_pool(pool):
+    """Forget a broken pool so the next batch starts a fresh one"""
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _warm_worker():
+    from model.registry import get_registry
+    try:
+        get_registry().models()
+    except ManifestError:
+        # Raising here would break the whole pool; each task reports the error instead
+        pass
+
+
+def _attach(shm_name):
+    try:
+        return shared_memory.SharedMemory(name=shm_name, track=False)
+    except TypeError:
+        # Python < 3.13 registers attached segments with the resource tracker;
+        # spawned workers share the parent's tracker, so this is a no-op and the
+        # parent's unlink() clears the single registration
+        return shared_memory.SharedMemory(name=shm_name)
+
+
+def _predict_in_worker(name, version, shm_name, shape):
+    """Process-pool task: score the shared feature matrix with this worker's copy of ``name``"""
+    from model.registry import get_registry
+    models = get_registry().models()
+    if models.get('version') != version:
+        models = get_registry().refresh()
+        if models.get('version') != version:
+            raise WorkerVersionMismatch(f"worker has model version {models.get('version')}, expected {version}")
+
+    shm = _attach(shm_name)
+    try:
+        X = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        start = time.perf_counter()
+        prediction = predict_base(name, models[name], models['schema'].layouts.get(name), X, None)
+        elapsed = time.perf_counter() - start
+        del X
+    finally:
+        shm.close()
+    return prediction, elapsed
+
+
+def run_base_models(models, schema, X, default, mode=None, timings=None, names=BASE_MODELS):
+    """Score the base models in ``names`` on ``X``; returns ``{name: predictions}``
+
+    ``timings``, if given, receives each model's wall time in seconds (for the
+    process pool this is the time spent inside the worker).
+    """
+    mode = mode or default_execution()
+    if mode not in EXECUTION_MODES:
+        raise ValueError(f"unknown execution mode {mode!r}; expected one of {EXECUTION_MODES}")
+    if mode == 'process' and not _served_by_workers(models):
+        # Workers can only reproduce the process-wide registry's model set
+        mode = 'thread'
+
+    if mode == 'serial':
+        results = {
+            name: _timed_predict(name, models.get(name), schema.layouts.get(name), X, default)
+            for name in names
+        }
+    elif mode == 'thread':
+        pool = _get_thread_pool()
+        futures = {
+            name: pool.submit(_timed_predict, name, models.get(name), schema.layouts.get(name), X, default)
+            for name in names
+        }
+        results = {name: future.result() for name, future in futures.items()}
+    else:
+        results = _run_in_processes(models, X, default, names)
+
+    if timings is not None:
+        timings.update({name: elapsed for name, (_, elapsed) in results.items()})
+    return {name: prediction for name, (prediction, _) in results.items()}
+
+
+def _served_by_workers(models):
+    """Whether ``models`` is the set the process-wide registry (and so every worker) loads"""
+    version = models.get('version')
+    if version is None:
+        return False
+    from model.registry import get_registry
+    try:
+        return get_registry().models().get('version') == version
+    except ManifestError:
+        return False
+
+
+def _run_in_processes(models, X, default, names):
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    shm = shared_memory.SharedMemory(create=True, size=max(X.nbytes, 1))
+    try:
+        np.ndarray(X.shape, dtype=np.float64, buffer=shm.buf)[:] = X
+        pool = _get_process_pool()
+        futures = {}
+        results = {}
+        for name in names:
+            if models.get(name) is None:
+                results[name] = (default, 0.0)
+                continue
+            futures[name] = pool.submit(_predict_in_worker, name, models['version'], shm.name, X.shape)
+        for name, future in futures.items():
+            try:
+                prediction, elapsed = future.result()
+            except (BrokenProcessPool, WorkerVersionMismatch, ManifestError, CancelledError) as e:
+                if isinstance(e, (BrokenProcessPool, ManifestError)):
+                    # A worker that cannot load its models keeps failing; the next batch starts fresh ones
+                    _discard_process_pool(pool)
+                # e.g. the registry swapped versions between this batch and the worker's load,
+                # or the worker read the manifest while it was being rewritten
+                print(f"Warning: {BASE_MODEL_LABELS[name]} worker could not score ({e}); scoring it in-process",
+                      file=sys.stderr)
+                schema = models['schema']
+                prediction, elapsed = _timed_predict(name, models[name], schema.layouts.get(name), X, default)
+            results[name] = (default if prediction is None else prediction, elapsed)
+        return {name: results[name] for name in names}
+    finally:
+        shm.close()
+        shm.unlink()
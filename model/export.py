@@ -0,0 +1,86 @@
+"""Convert a pickled model set to the portable formats in model/portable.py
+
+    python -m model.export --out model/
+
+writes one portable file per convertible artifact next to the target manifest
+and rewrites the manifest to point at them. Artifacts without a portable form
+(the TF-IDF vocabulary, for instance) stay pickled and are copied as they are.
+"""
+import argparse
+import json
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from model.manifest import MANIFEST_NAME, MANIFEST_PATH, file_sha256, load_artifact, read_manifest, verify_file
+from model.portable import portable_format
+
+# Largest difference tolerated between an artifact's pickled and exported predictions
+TOLERANCE = 1e-6
+
+
+def _check_roundtrip(name, original, exported, n_features):
+    """Compare predictions (or transforms) of the exported artifact against the original"""
+    X = np.random.default_rng(0).normal(size=(64, n_features))
+    method = 'predict' if hasattr(original, 'predict') else 'transform'
+    expected = np.asarray(getattr(original, method)(X), dtype=np.float64)
+    actual = np.asarray(getattr(exported, method)(X), dtype=np.float64)
+    error = float(np.max(np.abs(expected - actual) / np.maximum(np.abs(expected), 1.0)))
+    if error > TOLERANCE:
+        raise ValueError(f"{name}: exported artifact differs from the pickle by {error:.3g}")
+
+
+def export_models(manifest_path=MANIFEST_PATH, out_dir=None):
+    """Export every convertible artifact; returns the new manifest"""
+    manifest_path = Path(manifest_path)
+    out_dir = Path(out_dir) if out_dir else manifest_path.parent
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    specs = read_manifest(manifest_path)
+
+    for name, spec in specs.items():
+        path = manifest_path.parent / spec['path']
+        verify_file(name, path, spec, path.stat().st_size, file_sha256(path))
+        model = load_artifact(name, path, spec)
+        converted = portable_format(model) if spec['format'] == 'pickle' else None
+        if converted is None:
+            if out_dir.resolve() != manifest_path.parent.resolve():
+                shutil.copy2(path, out_dir / spec['path'])
+            print(f"{name}: kept as {spec['format']}", file=sys.stderr)
+            continue
+
+        fmt, suffix, save = converted
+        target = out_dir / (Path(spec['path']).stem + suffix)
+        save(model, target)
+        names = getattr(model, 'feature_names_in_', None)
+        new_spec = dict(spec, path=target.name, format=fmt,
+                        size=target.stat().st_size, sha256=file_sha256(target))
+        if names is not None:
+            new_spec['features'] = [str(feature) for feature in names]
+        if getattr(model, 'n_features_in_', None) is not None:
+            new_spec['n_features'] = int(model.n_features_in_)
+        exported = load_artifact(name, target, new_spec)
+        _check_roundtrip(name, model, exported, new_spec.get('n_features', 1))
+        manifest['artifacts'][name] = new_spec
+        print(f"{name}: {spec['path']} -> {target.name} ({fmt})", file=sys.stderr)
+
+    with open(out_dir / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export pickled model artifacts to portable formats")
+    parser.add_argument('--manifest', default=str(MANIFEST_PATH), help="manifest of the pickled model set")
+    parser.add_argument('--out', default=None,
+                        help="directory for the exported artifacts and manifest (default: next to --manifest)")
+    args = parser.parse_args(argv)
+    export_models(args.manifest, args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""Columnar on-disk store of engineered features, keyed by candle timestamp
+
+Each feature column, and the candle timestamps (int64 ns UTC), is one
+memory-mapped ``.npy`` file in the store directory. ``meta.json`` records how
+many rows are committed. Appends write past the committed rows, flush, then
+replace ``meta.json`` atomically, so readers (and a writer restarted after a
+crash) only ever see whole candles. Files are preallocated and double in
+capacity when full, so appending is amortised O(rows appended).
+
+Appended candles must be consecutive and newer than the last stored one. The
+lag columns of a new batch are computed from the stored tail, so a store
+built in any number of appends matches engineer_features_batch() over the
+whole series. ``read(start, end)`` returns zero-copy views of a time range in
+the same ``{name: column}`` form, ready for make_predictions_batch(), the
+backtester and training.
+
+    python -m model.feature_store features/ --append candles.parquet
+
+Text (headline) features depend on the loaded model set and are not stored.
+One process may append at a time; any number may read.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from model.backfill import CHUNK_ROWS, read_chunks
+from model.history import N_LAGS
+from model.predict import engineer_features_batch
+from model.schema import FEATURE_NAMES
+
+# Bump when engineer_features_batch() changes, so stores are rebuilt
+FEATURE_VERSION = 1
+
+META_NAME = 'meta.json'
+TIMESTAMP = 'timestamp'
+INITIAL_CAPACITY = 1024
+
+# Stored feature columns that hold the raw candle, used to continue the lag features
+_CONTEXT_COLUMNS = {
+    'Open': 'open_price', 'High': 'high_price', 'Low': 'low_price',
+    'Close': 'close_price', 'Volume': 'volume', 'Sentiment': 'sentiment_score',
+}
+
+
+def to_nanoseconds(values):
+    """Timestamps (strings, datetimes or epoch nanoseconds) as int64 ns since the epoch, UTC"""
+    values = pd.to_datetime(pd.Series(values), utc=True).astype('datetime64[ns, UTC]')
+    return values.astype('int64').to_numpy()
+
+
+def _timestamp(value):
+    """One timestamp as int64 ns since the epoch (naive times are taken as UTC)"""
+    return int(to_nanoseconds([value])[0])
+
+
+class FeatureStore:
+    """Engineered feature columns of one candle series, appended in time order"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.columns = tuple(FEATURE_NAMES)
+        self.rows = 0
+        self._maps = {}
+        self._mode = None
+        self._capacity = 0
+        self._meta_mtime = None
+        meta_path = self.directory / META_NAME
+        if meta_path.exists():
+            self._load_meta()
+            if self._meta['feature_version'] != FEATURE_VERSION or self._meta['n_lags'] != N_LAGS:
+                raise ValueError(f"{self.directory} was built by a different feature version; rebuild it")
+
+    def _load_meta(self):
+        path = self.directory / META_NAME
+        with open(path) as f:
+            self._meta = json.load(f)
+        self._meta_mtime = path.stat().st_mtime_ns
+        self.columns = tuple(self._meta['columns'])
+        self.rows = self._meta['rows']
+
+    def _refresh(self):
+        """Pick up rows committed by another process since the last read"""
+        path = self.directory / META_NAME
+        try:
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._meta_mtime:
+            self._load_meta()
+
+    def _path(self, name):
+        return self.directory / f"{name}.npy"
+
+    def _open(self, mode):
+        self._maps = {name: np.load(self._path(name), mmap_mode=mode) for name in (TIMESTAMP,) + self.columns}
+        self._mode = mode
+        self._capacity = len(self._maps[TIMESTAMP])
+
+    def _column(self, name):
+        # Files are only replaced when they grow, so more rows than the mapping holds means remap
+        if not self._maps or self.rows > self._capacity:
+            self._open(self._mode or 'r')
+        return self._maps[name]
+
+    def __len__(self):
+        self._refresh()
+        return self.rows
+
+    def _reserve(self, needed):
+        """Open the columns for writing, doubling their capacity until ``needed`` rows fit"""
+        capacity = 0
+        if self._path(TIMESTAMP).exists():
+            if self._mode != 'r+' or self.rows > self._capacity:
+                self._open('r+')
+            capacity = self._capacity
+        if needed <= capacity:
+            return
+        grown_capacity = max(INITIAL_CAPACITY, capacity)
+        while grown_capacity < needed:
+            grown_capacity *= 2
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for name in (TIMESTAMP,) + self.columns:
+            tmp = self.directory / f"{name}.npy.tmp"
+            dtype = np.int64 if name == TIMESTAMP else np.float64
+            grown = np.lib.format.open_memmap(tmp, mode='w+', dtype=dtype, shape=(grown_capacity,))
+            if self.rows:
+                grown[:self.rows] = self._maps[name][:self.rows]
+            grown.flush()
+            del grown
+            os.replace(tmp, self._path(name))
+        self._open('r+')
+
+    def _commit(self, rows):
+        for column in self._maps.values():
+            column.flush()
+        meta = {'feature_version': FEATURE_VERSION, 'n_lags': N_LAGS, 'columns': list(self.columns),
+                'rows': rows, 'updated_at': time.time()}
+        tmp = self.directory / f"{META_NAME}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.directory / META_NAME)
+        self._meta = meta
+        self._meta_mtime = (self.directory / META_NAME).stat().st_mtime_ns
+        self.rows = rows
+
+    def last_timestamp(self):
+        """Newest stored timestamp in ns, or None when empty"""
+        self._refresh()
+        return int(self._column(TIMESTAMP)[self.rows - 1]) if self.rows else None
+
+    def _context(self):
+        """The last N_LAGS stored candles, as input columns, to continue the lag features"""
+        start = max(self.rows - N_LAGS, 0)
+        return pd.DataFrame({raw: np.array(self._column(name)[start:self.rows])
+                             for name, raw in _CONTEXT_COLUMNS.items()})
+
+    def append(self, candles, timestamps):
+        """Engineer and store the features of consecutive new candles; returns rows appended
+
+        ``candles`` uses the prediction input column names. Candles not newer
+        than the last stored one are skipped, so re-appending a file that
+        overlaps the store is harmless.
+        """
+        self._refresh()
+        timestamps = to_nanoseconds(timestamps)
+        if len(timestamps) != len(candles):
+            raise ValueError("need one timestamp per candle")
+        if np.any(np.diff(timestamps) <= 0):
+            raise ValueError("candle timestamps must be strictly increasing")
+        last = self.last_timestamp()
+        if last is not None:
+            new = timestamps > last
+            candles, timestamps = candles[new], timestamps[new]
+        n_new = len(timestamps)
+        if not n_new:
+            return 0
+
+        context = self._context() if self.rows else None
+        frame = candles.reset_index(drop=True)
+        if context is not None and len(context):
+            frame = pd.concat([context, frame], ignore_index=True)
+        features = engineer_features_batch(frame)
+
+        self._reserve(self.rows + n_new)
+        end = self.rows + n_new
+        self._maps[TIMESTAMP][self.rows:end] = timestamps
+        for name in self.columns:
+            self._maps[name][self.rows:end] = features[name][-n_new:]
+        self._commit(end)
+        return n_new
+
+    def append_file(self, path, chunk_rows=CHUNK_ROWS):
+        """Append a CSV/Parquet candle file that has a ``timestamp`` column"""
+        appended = 0
+        _, chunks = read_chunks(path, chunk_rows, keep=(TIMESTAMP,))
+        for candles, passthrough in chunks:
+            appended += self.append(candles, passthrough[TIMESTAMP].to_numpy())
+        return appended
+
+    def _bounds(self, start, end):
+        timestamps = self._column(TIMESTAMP)[:self.rows]
+        lo = 0 if start is None else int(np.searchsorted(timestamps, _timestamp(start), side='left'))
+        hi = self.rows if end is None else int(np.searchsorted(timestamps, _timestamp(end), side='left'))
+        return lo, max(lo, hi)
+
+    def timestamps(self, start=None, end=None):
+        """Stored timestamps (int64 ns) in ``[start, end)``, as a read-only view"""
+        self._refresh()
+        if not self.rows:
+            return np.empty(0, dtype=np.int64)
+        lo, hi = self._bounds(start, end)
+        return self._column(TIMESTAMP)[lo:hi]
+
+    def read(self, start=None, end=None, columns=None):
+        """``{name: column}`` views of the candles in ``[start, end)``; nothing is copied
+
+        ``start`` and ``end`` are timestamps (strings, datetimes or epoch ns);
+        None reads from the first or to the last stored candle.
+        """
+        self._refresh()
+        columns = self.columns if columns is None else columns
+        if not self.rows:
+            return {name: np.empty(0) for name in columns}
+        lo, hi = self._bounds(start, end)
+        return {name: self._column(name)[lo:hi] for name in columns}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect a columnar feature store")
+    parser.add_argument('store', help="feature store directory")
+    parser.add_argument('--append', metavar='INPUT', nargs='*', default=[],
+                        help="CSV/Parquet candle files (with a timestamp column) to append, oldest first")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    store = FeatureStore(args.store)
+    for path in args.append:
+        start = time.perf_counter()
+        appended = store.append_file(path, args.chunk_rows)
+        print(f"Appended {appended:,} candles from {path} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    timestamps = store.timestamps()
+    if len(timestamps):
+        first, last = (pd.Timestamp(int(value), tz='UTC') for value in (timestamps[0], timestamps[-1]))
+        print(f"{args.store}: {len(timestamps):,} candles, {first} .. {last}, {len(store.columns)} feature columns")
+    else:
+        print(f"{args.store}: empty")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""Rolling per-symbol OHLCV history that feeds the lag features"""
+import re
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_SYMBOL = 'BTC-USD'
+
+# Column order of every row in a history buffer
+HISTORY_COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'sentiment')
+_OPEN, _HIGH, _LOW, _CLOSE, _VOLUME, _SENTIMENT = range(len(HISTORY_COLUMNS))
+
+# Number of previous candles exposed as *_Lag_1 .. *_Lag_N features
+N_LAGS = 3
+
+
+def candle_row(data):
+    """Convert a prediction input dict into a history row"""
+    open_price = data['open_price']
+    return (
+        open_price,
+        data['high_price'],
+        data['low_price'],
+        data.get('close_price', open_price),
+        data['volume'],
+        data.get('sentiment_score', 0.0),
+    )
+
+
+def _lags(ring, data):
+    fallback = candle_row(data)
+    features = {}
+    for i in range(1, N_LAGS + 1):
+        row = ring.previous(i)
+        if row is not None:
+            fallback = row
+        features[f'Close_Lag_{i}'] = float(fallback[_CLOSE])
+        features[f'Open_Lag_{i}'] = float(fallback[_OPEN])
+        features[f'Volume_Lag_{i}'] = float(fallback[_VOLUME])
+        features[f'Sentiment_Lag_{i}'] = float(fallback[_SENTIMENT])
+    return features
+
+
+class _Ring:
+    """Fixed-capacity ring of candle rows plus its (head, count) state"""
+
+    def __init__(self, rows, state):
+        self.rows = rows
+        self.state = state
+        self.capacity = rows.shape[0]
+
+    def append(self, row):
+        head, count = int(self.state[0]), int(self.state[1])
+        self.rows[head] = row
+        # Publish the row before advancing the pointer so a crash never exposes a torn candle
+        self.state[1] = min(count + 1, self.capacity)
+        self.state[0] = (head + 1) % self.capacity
+
+    def previous(self, lag):
+        """Row ``lag`` candles back (1 = most recent), or None if not recorded yet"""
+        head, count = int(self.state[0]), int(self.state[1])
+        if lag > count:
+            return None
+        return self.rows[(head - lag) % self.capacity]
+
+    def flush(self):
+        for array in (self.rows, self.state):
+            if isinstance(array, np.memmap):
+                array.flush()
+
+
+class CandleHistory:
+    """Per-symbol ring buffers of recent candles backed by NumPy arrays
+
+    With a ``directory`` each symbol's buffer lives in a memory-mapped ``.npy``
+    file, so a restarted server picks up its lag history immediately.
+    """
+
+    def __init__(self, capacity=256, directory=None):
+        if capacity < N_LAGS:
+            raise ValueError(f"capacity must be at least {N_LAGS}")
+        self.capacity = capacity
+        self.directory = Path(directory) if directory is not None else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._rings = {}
+        self._lock = threading.Lock()
+
+    def _ring(self, symbol):
+        ring = self._rings.get(symbol)
+        if ring is None:
+            with self._lock:
+                ring = self._rings.get(symbol)
+                if ring is None:
+                    ring = self._rings[symbol] = self._open(symbol)
+        return ring
+
+    def _open(self, symbol):
+        shape = (self.capacity, len(HISTORY_COLUMNS))
+        if self.directory is None:
+            return _Ring(np.zeros(shape), np.zeros(2, dtype=np.int64))
+
+        stem = re.sub(r'[^A-Za-z0-9_.-]', '_', symbol)
+        rows_path = self.directory / f"{stem}.npy"
+        state_path = self.directory / f"{stem}.state.npy"
+        if rows_path.exists() and state_path.exists():
+            rows = np.load(rows_path, mmap_mode='r+')
+            state = np.load(state_path, mmap_mode='r+')
+            if rows.shape == shape and state.shape == (2,):
+                return _Ring(rows, state)
+            print(f"Warning: History for {symbol} has capacity {rows.shape[0]}, "
+                  f"expected {self.capacity}; starting a new buffer", file=sys.stderr)
+            del rows, state
+
+        rows = np.lib.format.open_memmap(rows_path, mode='w+', dtype=np.float64, shape=shape)
+        state = np.lib.format.open_memmap(state_path, mode='w+', dtype=np.int64, shape=(2,))
+        return _Ring(rows, state)
+
+    def append(self, symbol, data):
+        """Record a closed candle (a prediction input dict) for ``symbol``"""
+        ring = self._ring(symbol)
+        with self._lock:
+            ring.append(candle_row(data))
+
+    def lag_features(self, symbol, data):
+        """Lag features for ``data`` from the candles recorded before it
+
+        Lags that are not recorded yet repeat the oldest available candle, or the
+        current candle when the history is empty.
+        """
+        ring = self._ring(symbol)
+        with self._lock:
+            return _lags(ring, data)
+
+    def claim(self, symbol, data, record=True):
+        """Lag features for ``data`` and (with ``record``) its append, as one step
+
+        Returns a FixedLags that stands in for this history when the candle is
+        scored later, so candles claimed in order get lags in that order however
+        their scoring is scheduled.
+        """
+        ring = self._ring(symbol)
+        with self._lock:
+            lags = _lags(ring, data)
+            if record:
+                ring.append(candle_row(data))
+        return FixedLags(lags)
+
+    def flush(self):
+        """Write memory-mapped buffers back to disk"""
+        with self._lock:
+            for ring in self._rings.values():
+                ring.flush()
+
+
+class FixedLags:
+    """Lag features claimed from a CandleHistory, used in its place by predict_one()"""
+
+    def __init__(self, lags):
+        self.lags = lags
+
+    def lag_features(self, symbol, data):
+        return dict(self.lags)
+
+    def append(self, symbol, data):
+        # Recorded when the lags were claimed
+        pass
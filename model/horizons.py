@@ -0,0 +1,181 @@
+"""Forecasts for several horizons (1h, 4h, 24h, 7d, ...) from one request
+
+The model set next to the manifest predicts the next hourly candle (``1h``).
+Every other horizon is a model set of its own, with its own manifest, in
+``horizons/<label>/`` beside it (e.g. ``horizons/24h/manifest.json``), or a
+directory of versions with a ``CURRENT`` pointer; each is loaded and
+hot-reloaded by its own registry. Horizon directories are
+discovered when first used, so adding one needs a restart.
+
+The candles' features are engineered once and shared by every horizon: sets
+with the same feature layout also share the filled feature matrix, and
+headline embeddings are computed once per distinct text stage. Each horizon's
+ensemble then scores the whole batch in one call. Results are a structured
+array with one record per (row, horizon), which ``to_columns`` turns into a
+JSON object of parallel lists.
+"""
+import re
+import threading
+
+import numpy as np
+
+from model.manifest import MANIFEST_NAME
+from model.predict import calculate_confidence_batch, engineer_features, engineer_features_batch, make_predictions_batch
+from model.registry import CURRENT_NAME, get_registry, make_registry
+from model.schema import BASE_MODELS, schema_for
+from model.text_features import has_text_stage, text_feature_columns
+
+HORIZONS_DIR = 'horizons'
+
+# Horizon of the model set the manifest itself describes. It is a fixed label,
+# not read from the manifest: the base models are trained on hourly candles to
+# predict the next close, so requests are assumed to carry hourly candles
+BASE_HORIZON = '1h'
+
+HORIZON_DTYPE = np.dtype(
+    [('horizon', 'U8'), ('hours', np.int32), ('prediction', np.float64), ('confidence', np.float64)]
+    + [(name, np.float64) for name in BASE_MODELS]
+    + [('version', 'U16')]
+)
+
+_HORIZON_PATTERN = re.compile(r'^(\d+)([hd])$')
+
+_registries = None
+_registries_lock = threading.Lock()
+
+
+def horizon_hours(label):
+    """Length of a horizon label such as ``4h`` or ``7d`` in hours"""
+    match = _HORIZON_PATTERN.match(label)
+    if match is None:
+        raise ValueError(f"invalid horizon {label!r}: expected hours or days such as '4h' or '7d'")
+    return int(match.group(1)) * (24 if match.group(2) == 'd' else 1)
+
+
+def _discover():
+    base = get_registry()
+    registries = {BASE_HORIZON: base}
+    root = base.manifest_path.parent / HORIZONS_DIR
+    if root.is_dir():
+        for directory in root.iterdir():
+            if directory.name == BASE_HORIZON:
+                continue
+            if not ((directory / MANIFEST_NAME).exists() or (directory / CURRENT_NAME).exists()):
+                continue
+            horizon_hours(directory.name)
+            registries[directory.name] = make_registry(directory)
+    return dict(sorted(registries.items(), key=lambda item: horizon_hours(item[0])))
+
+
+def horizon_registries():
+    """``{label: registry}`` of every available horizon, shortest first"""
+    global _registries
+    if _registries is None:
+        with _registries_lock:
+            if _registries is None:
+                _registries = _discover()
+    return _registries
+
+
+def available_horizons():
+    return list(horizon_registries())
+
+
+def load_horizon_models(horizons=None):
+    """Current model snapshot of each requested horizon (all of them by default)"""
+    registries = horizon_registries()
+    if isinstance(horizons, str):
+        horizons = [horizons]
+    if horizons is None:
+        horizons = list(registries)
+    unknown = [label for label in horizons if label not in registries]
+    if unknown:
+        raise ValueError(f"no model set for horizon(s) {', '.join(unknown)}; "
+                         f"available: {', '.join(registries)}")
+    return {label: registries[label].models() for label in horizons}
+
+
+def score_horizons(horizon_models, features, headlines=None, execution=None, scored=None):
+    """Score an engineered feature batch with every horizon's model set
+
+    ``features`` are the columns from engineer_features_batch(), computed once
+    for all horizons; ``headlines`` (optional) are embedded by each distinct
+    text stage. ``scored`` maps horizons the caller has already scored to
+    their ``(predictions, confidence)``, which are used as they are. Returns
+    an array of shape ``(rows, horizons)`` of HORIZON_DTYPE records.
+    """
+    n_rows = len(features['Close'])
+    out = np.zeros((n_rows, len(horizon_models)), dtype=HORIZON_DTYPE)
+    # Keyed by text stage (None without one) and by (schema columns, text stage)
+    stage_columns = {None: features}
+    matrices = {}
+    for j, (label, models) in enumerate(horizon_models.items()):
+        record = out[:, j]
+        record['horizon'] = label
+        record['hours'] = horizon_hours(label)
+        record['version'] = models.get('version') or ''
+        if scored and label in scored:
+            predictions, record['confidence'] = scored[label]
+            record['prediction'] = predictions['meta_model']
+            for name in BASE_MODELS:
+                record[name] = predictions[name]
+            continue
+
+        stage = None
+        if headlines is not None and has_text_stage(models):
+            stage = (id(models['tfidf_vectorizer']), id(models['svd']))
+            if stage not in stage_columns:
+                stage_columns[stage] = dict(features, **text_feature_columns(models, headlines))
+        columns = stage_columns[stage]
+
+        X = None
+        if any(models.get(name) is not None for name in BASE_MODELS):
+            schema = schema_for(models)
+            key = (schema.names, stage)
+            if key not in matrices:
+                matrices[key] = schema.fill_batch(columns, n_rows)
+            X = matrices[key]
+        predictions = make_predictions_batch(models, columns, execution=execution, X=X)
+
+        record['prediction'] = predictions['meta_model']
+        record['confidence'] = calculate_confidence_batch(predictions, columns)
+        for name in BASE_MODELS:
+            record[name] = predictions[name]
+    return out
+
+
+def predict_horizons(input_data, horizons=None, history=None, features=None, base=None):
+    """Forecasts of one candle for each horizon, as a ``(horizons,)`` record array
+
+    ``features`` are the candle's engineered features when the caller already
+    has them (without text features); otherwise they are engineered here.
+    ``base`` is ``(models, predictions, confidence)`` from a caller that has
+    already scored the candle; when ``models`` is the snapshot the base
+    horizon serves, its row reuses those scores.
+    """
+    horizon_models = load_horizon_models(horizons)
+    if features is None:
+        features = engineer_features(input_data, history)
+    columns = {name: np.array([value], dtype=np.float64) for name, value in features.items()}
+    headline = input_data.get('news_headline')
+    scored = None
+    if base is not None and BASE_HORIZON in horizon_models:
+        models, predictions, confidence = base
+        version = horizon_models[BASE_HORIZON].get('version')
+        if version is not None and models.get('version') == version:
+            scored = {BASE_HORIZON: (predictions, confidence)}
+    return score_horizons(horizon_models, columns, headlines=[headline] if headline else None,
+                          scored=scored)[0]
+
+
+def predict_horizons_batch(df, horizons=None, execution=None):
+    """Forecasts for every row of a candle DataFrame: a ``(rows, horizons)`` record array"""
+    horizon_models = load_horizon_models(horizons)
+    features = engineer_features_batch(df)
+    headlines = df['news_headline'].tolist() if 'news_headline' in df else None
+    return score_horizons(horizon_models, features, headlines=headlines, execution=execution)
+
+
+def to_columns(records):
+    """JSON-ready ``{field: [values]}`` of a one-dimensional record array"""
+    return {field: records[field].tolist() for field in records.dtype.names}
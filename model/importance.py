@@ -0,0 +1,227 @@
+"""Feature importances per base model, computed once per loaded model version
+
+Importances only change when the models do, so the registry compiles them
+into each published model snapshot (``models['importances']``) and responses
+just hand out the prebuilt list.
+
+Native importances come from the estimators themselves (impurity/gain for
+the tree models, normalised absolute coefficients for linear ones). Better
+estimates can be computed offline with permutation importance::
+
+    python -m model.importance candles.parquet --record
+
+which stores them in ``importances.json`` next to the manifest, keyed by
+model version; stored importances take precedence over native ones and a
+running registry picks up a rewritten file on its next check.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from model.schema import BASE_MODELS
+
+IMPORTANCES_NAME = 'importances.json'
+
+# Models tried, in order, for the single importance list in responses
+PRIMARY_ORDER = ('random_forest', 'xgboost', 'ridge', 'ensemble')
+
+TOP_FEATURES = 10
+
+# Shown when no loaded model exposes importances
+DEFAULT_IMPORTANCE = [
+    {'feature': 'Open Price', 'importance': 0.25},
+    {'feature': 'Volume', 'importance': 0.20},
+    {'feature': 'Price Range', 'importance': 0.15},
+    {'feature': 'High Price', 'importance': 0.12},
+    {'feature': 'Low Price', 'importance': 0.10},
+    {'feature': 'Sentiment', 'importance': 0.08},
+    {'feature': 'Price Change', 'importance': 0.06},
+    {'feature': 'Volume Price Ratio', 'importance': 0.04}
+]
+
+
+def _normalise(values):
+    values = np.abs(np.asarray(values, dtype=np.float64))
+    total = values.sum()
+    return values / total if total > 0 else values
+
+
+def native_importances(name, model, schema):
+    """``{feature: importance}`` from the estimator itself, or None if it has none"""
+    layout = schema.layouts.get(name)
+    if model is None or layout is None:
+        return None
+    features = [schema.names[i] for i in layout.columns]
+    if hasattr(model, 'feature_importances_'):
+        source = model
+    else:
+        # A flattened forest keeps the scikit-learn forest it came from
+        source = getattr(model, 'original', None)
+    try:
+        if source is not None and hasattr(source, 'feature_importances_'):
+            values = np.asarray(source.feature_importances_, dtype=np.float64)
+        elif getattr(model, 'coef_', None) is not None and np.ndim(model.coef_) == 1:
+            # Scale-dependent: inputs with large magnitudes get small coefficients
+            values = _normalise(model.coef_)
+        else:
+            return None
+    except Exception as e:
+        print(f"Warning: cannot read {name} feature importances: {e}", file=sys.stderr)
+        return None
+    if len(values) != len(features):
+        return None
+    return {feature: float(value) for feature, value in zip(features, values)}
+
+
+def _ensemble(per_model, schema):
+    """Base-model importances weighted by the meta model's (linear) weights, else equally"""
+    weights = {name: 1.0 for name in per_model}
+    linear = getattr(schema, 'linear', None)
+    if linear is not None and linear.meta:
+        weights = {name: abs(float(linear.meta_coef[BASE_MODELS.index(name)])) for name in per_model}
+    combined = {}
+    for name, importances in per_model.items():
+        scale = weights[name] / (sum(importances.values()) or 1.0)
+        for feature, value in importances.items():
+            combined[feature] = combined.get(feature, 0.0) + value * scale
+    total = sum(combined.values()) or 1.0
+    return {feature: value / total for feature, value in combined.items()}
+
+
+def top_features(importances, n=TOP_FEATURES):
+    ranked = sorted(importances.items(), key=lambda item: item[1], reverse=True)[:n]
+    return [{'feature': feature, 'importance': float(value)} for feature, value in ranked]
+
+
+class ImportanceTable:
+    """Importances of one model set: ``by_model[name]`` and the ready-made top lists"""
+
+    def __init__(self, by_model, methods):
+        self.by_model = by_model
+        self.methods = methods
+        self.top = {name: top_features(importances) for name, importances in by_model.items()}
+        primary = next((name for name in PRIMARY_ORDER if name in self.top), None)
+        self.primary = self.top[primary] if primary else DEFAULT_IMPORTANCE
+
+
+def read_stored(path, version):
+    """Stored importances for ``version`` from an importances file, or {}"""
+    if path is None or version is None or not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f).get(version, {})
+    except (OSError, ValueError) as e:
+        print(f"Warning: cannot read {path}: {e}", file=sys.stderr)
+        return {}
+
+
+def compile_importances(models, schema, stored=None):
+    """Build the importance table for a model set; ``stored`` overrides native importances"""
+    stored = stored or {}
+    by_model, methods = {}, {}
+    for name in BASE_MODELS:
+        if name in stored:
+            by_model[name] = stored[name]['importances']
+            methods[name] = stored[name].get('method', 'stored')
+            continue
+        importances = native_importances(name, models.get(name), schema)
+        if importances is not None:
+            by_model[name] = importances
+            methods[name] = 'native'
+    if 'ensemble' in stored:
+        by_model['ensemble'] = stored['ensemble']['importances']
+        methods['ensemble'] = stored['ensemble'].get('method', 'stored')
+    elif by_model:
+        by_model['ensemble'] = _ensemble({name: by_model[name] for name in BASE_MODELS if name in by_model}, schema)
+        methods['ensemble'] = 'weighted'
+    return ImportanceTable(by_model, methods)
+
+
+def permutation_importances(models, features, n_rows, target, repeats=3, seed=0):
+    """Mean increase in squared error when each feature column is shuffled
+
+    Computed for every base model and for the stacked prediction
+    (``ensemble``); returns ``{model: {feature: importance}}``.
+    """
+    from model.predict import make_predictions_batch
+    from model.schema import schema_for
+
+    schema = schema_for(models)
+    X = schema.fill_batch(features, n_rows)
+    rng = np.random.default_rng(seed)
+
+    def errors(matrix):
+        columns = {name: matrix[:, i] for i, name in enumerate(schema.names)}
+        predictions = make_predictions_batch(models, columns)
+        return {
+            ('ensemble' if name == 'meta_model' else name): float(np.mean((values - target) ** 2))
+            for name, values in predictions.items()
+        }
+
+    baseline = errors(X)
+    out = {name: {} for name in baseline}
+    for i, feature in enumerate(schema.names):
+        increase = {name: 0.0 for name in baseline}
+        original = X[:, i].copy()
+        for _ in range(repeats):
+            X[:, i] = rng.permutation(original)
+            for name, error in errors(X).items():
+                increase[name] += (error - baseline[name]) / repeats
+        X[:, i] = original
+        for name, value in increase.items():
+            out[name][feature] = max(value, 0.0)
+    return {name: dict(zip(values, _normalise(list(values.values())))) for name, values in out.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute permutation feature importances offline")
+    parser.add_argument('input', help="CSV/Parquet file of consecutive candles")
+    parser.add_argument('--rows', type=int, default=20000, help="most recent candles to evaluate on")
+    parser.add_argument('--repeats', type=int, default=3, help="shuffles per feature")
+    parser.add_argument('--record', action='store_true',
+                        help="store the importances for the current model version (used by responses)")
+    args = parser.parse_args(argv)
+
+    from model.backtest import Backtest, load_candles
+    from model.predict import load_models
+    from model.registry import get_registry
+
+    models = load_models()
+    candles = load_candles(args.input).iloc[-(args.rows + 1):]
+    backtest = Backtest(candles)
+    n_rows = len(backtest.target)
+    features = {name: np.asarray(column[:n_rows]) for name, column in backtest.features.items()}
+    start = time.perf_counter()
+    importances = permutation_importances(models, features, n_rows, backtest.target, repeats=args.repeats)
+    print(f"Permutation importances over {n_rows:,} candles in {time.perf_counter() - start:.1f}s",
+          file=sys.stderr)
+    for name, values in importances.items():
+        top = ', '.join(f"{item['feature']} {item['importance']:.3f}" for item in top_features(values, 5))
+        print(f"{name:<14}{top}")
+
+    if args.record:
+        version = models.get('version')
+        if version is None:
+            parser.error("--record needs registry-loaded models")
+        path = get_registry().manifest_path.parent / IMPORTANCES_NAME
+        records = {}
+        if path.exists():
+            with open(path) as f:
+                records = json.load(f)
+        records[version] = {name: {'method': 'permutation', 'importances': values}
+                            for name, values in importances.items()}
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(records, f, indent=2)
+            f.write('\n')
+        os.replace(tmp, path)
+        print(f"Recorded importances for model version {version} in {path}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
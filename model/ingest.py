@@ -0,0 +1,436 @@
+"""Live candle ingestion: score every candle as soon as it closes
+
+Candles arrive as lines, from one of these sources:
+
+- a file another process appends to (``--tail``), followed like ``tail -F``
+- a local TCP or Unix socket feed (``--socket``), reconnected when it drops
+- a CSV/Parquet file replayed in-process (``--replay``)
+
+Lines are either JSON objects or CSV rows under a header line. Fields use the
+prediction input names, or the usual OHLCV aliases (``open``, ``close``,
+...). A JSON line may also carry ``symbol``, ``timestamp``, ``news_headline``
+and ``sent_at`` (the publisher's wall-clock time). Every record is a closed
+candle unless it has ``"closed": false``. Those in-progress updates are
+skipped, as are repeated or late timestamps of a symbol. Timestamps are
+compared as instants, so ISO strings and epoch numbers (seconds,
+milliseconds, microseconds or nanoseconds) can be mixed in one feed.
+
+Features are updated incrementally. Each symbol's recent candles live in a
+CandleHistory ring buffer, so a closing candle only computes its own features
+and reads its lags from the buffer before scoring. One JSON line per
+prediction goes to stdout (or ``--output``), and the receive-to-prediction
+latency percentiles are reported every ``--report-seconds`` and at exit.
+With ``--store`` each scored candle is also appended to a FeatureStore.
+
+``python -m model.ingest replay FILE`` is the local stand-in for a live
+feed. It publishes a candle file on a socket or appends it to a file at a
+fixed rate:
+
+    python -m model.ingest replay candles.csv --port 9100 --rate 20 &
+    python -m model.ingest consume --socket 127.0.0.1:9100
+"""
+import argparse
+import csv
+import json
+import math
+import numbers
+import os
+import socket
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from model import tracing
+from model.backfill import COLUMN_ALIASES, INPUT_COLUMNS, file_format, read_chunks
+from model.feature_store import FeatureStore, to_nanoseconds
+from model.history import DEFAULT_SYMBOL, CandleHistory
+from model.predict import load_models, predict_one
+from model.tracing import Histogram
+
+POLL_SECONDS = 0.05
+RECONNECT_SECONDS = 1.0
+REPORT_SECONDS = 30.0
+
+# Passed through from a record to its prediction line
+PASSTHROUGH_FIELDS = ('symbol', 'timestamp')
+
+_NUMERIC_COLUMNS = tuple(column for column in INPUT_COLUMNS if column != 'news_headline')
+
+# Epoch timestamps below each bound are in that unit; larger ones are nanoseconds
+_EPOCH_UNITS = ((1e11, 's'), (1e14, 'ms'), (1e17, 'us'))
+
+
+def parse_address(value):
+    """``host:port`` -> ``(host, port)``; anything else is a Unix socket path"""
+    host, sep, port = value.rpartition(':')
+    if sep and port.isdigit():
+        return host or '127.0.0.1', int(port)
+    return value
+
+
+def normalise(record):
+    """Candle input dict from a parsed record, or None for an in-progress candle"""
+    candle = {}
+    for key, value in record.items():
+        name = str(key).strip().lower()
+        name = COLUMN_ALIASES.get(name, name)
+        if name in _NUMERIC_COLUMNS:
+            candle[name] = float(value) if value not in (None, '') else None
+        else:
+            candle[name] = value
+    if str(candle.pop('closed', True)).lower() in ('false', '0', 'no'):
+        return None
+    missing = [name for name in ('open_price', 'high_price', 'low_price', 'volume') if candle.get(name) is None]
+    if missing:
+        raise ValueError(f"candle is missing {', '.join(missing)}")
+    if candle.get('close_price') is None:
+        candle['close_price'] = candle['open_price']
+    if candle.get('sentiment_score') is None:
+        candle.pop('sentiment_score', None)
+    if 'sent_at' in candle:
+        candle['sent_at'] = float(candle['sent_at'])
+    return candle
+
+
+def candle_time(value):
+    """A record's timestamp as int64 ns since the epoch, UTC
+
+    Epoch numbers (or numeric strings, as CSV lines carry them) may be in
+    seconds, milliseconds, microseconds or nanoseconds; the unit follows from
+    their magnitude. Anything else goes through feature_store.to_nanoseconds().
+    """
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            pass
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        unit = next((unit for bound, unit in _EPOCH_UNITS if abs(value) < bound), 'ns')
+        return int(pd.Timestamp(value, unit=unit).value)
+    return int(to_nanoseconds([value])[0])
+
+
+class LineParser:
+    """Parses JSON lines, or CSV rows once a CSV header line has been seen"""
+
+    def __init__(self):
+        self.header = None
+
+    def parse(self, line):
+        """Record dict for one line, or None for a header/blank line"""
+        line = line.strip()
+        if not line:
+            return None
+        if line.startswith('{'):
+            return json.loads(line)
+        row = next(csv.reader([line]))
+        if self.header is None or row == self.header:
+            self.header = row
+            return None
+        return dict(zip(self.header, row))
+
+
+def tail_lines(path, from_start=False, stop=None, poll=POLL_SECONDS):
+    """Yield ``(line, received)`` as lines are appended to ``path``
+
+    Follows the file across truncation and rotation (a new file at the same
+    path). A trailing partial line is held back until its newline arrives.
+    """
+    stop = stop or threading.Event()
+    f, inode, partial = None, None, ''
+    try:
+        while not stop.is_set():
+            if f is None:
+                try:
+                    f = open(path)
+                except FileNotFoundError:
+                    stop.wait(poll)
+                    continue
+                inode = os.fstat(f.fileno()).st_ino
+                if not from_start:
+                    f.seek(0, os.SEEK_END)
+                from_start = True  # later (re)opened files are read from their start
+            chunk = f.readline()
+            if chunk:
+                partial += chunk
+                if partial.endswith('\n'):
+                    yield partial, time.perf_counter()
+                    partial = ''
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None
+            if stat is None or stat.st_ino != inode or stat.st_size < f.tell():
+                f.close()
+                f, partial = None, ''
+                continue
+            stop.wait(poll)
+    finally:
+        if f is not None:
+            f.close()
+
+
+def socket_lines(address, stop=None, reconnect=RECONNECT_SECONDS):
+    """Yield ``(line, received)`` from a newline-delimited socket feed, reconnecting when it drops"""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        try:
+            with socket.socket(family, socket.SOCK_STREAM) as sock:
+                sock.connect(address)
+                sock.settimeout(POLL_SECONDS * 10)
+                buffer = b''
+                while not stop.is_set():
+                    try:
+                        data = sock.recv(1 << 16)
+                    except socket.timeout:
+                        continue
+                    if not data:
+                        break
+                    buffer += data
+                    *lines, buffer = buffer.split(b'\n')
+                    received = time.perf_counter()
+                    for line in lines:
+                        yield line.decode(), received
+        except OSError as e:
+            print(f"Warning: candle feed {address}: {e}", file=sys.stderr)
+        if not stop.is_set():
+            stop.wait(reconnect)
+
+
+def _passthrough_columns(path):
+    """Columns of a candle file that are copied into its replayed records"""
+    if file_format(path) == 'parquet':
+        import pyarrow.parquet as pq
+        names = pq.ParquetFile(path).schema_arrow.names
+    else:
+        names = pd.read_csv(path, nrows=0).columns
+    return [name for name in names if str(name).strip().lower() in PASSTHROUGH_FIELDS]
+
+
+def replay_records(path, rate=None):
+    """Yield every candle of a CSV/Parquet file as a record, ``rate`` per second if given"""
+    start = time.perf_counter()
+    i = 0
+    keep = _passthrough_columns(path)
+    _, chunks = read_chunks(path, keep=keep)
+    for candles, passthrough in chunks:
+        extra = passthrough.rename(columns=lambda name: str(name).strip().lower()).to_dict('records')
+        for record, fields in zip(candles.to_dict('records'), extra):
+            if rate:
+                delay = start + i / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            record = {key: value for key, value in dict(record, **fields).items()
+                      if not (isinstance(value, float) and math.isnan(value))}
+            record['sent_at'] = time.time()
+            yield record
+            i += 1
+
+
+def lines_to_records(lines):
+    """``(record, received)`` pairs from ``(line, received)`` pairs; bad lines are reported and skipped"""
+    parser = LineParser()
+    for line, received in lines:
+        try:
+            record = parser.parse(line)
+        except ValueError as e:
+            print(f"Warning: skipping unparseable candle line: {e}", file=sys.stderr)
+            continue
+        if record is not None:
+            yield record, received
+
+
+class Pipeline:
+    """Scores closed candles in arrival order and tracks ingest-to-prediction latency"""
+
+    def __init__(self, history=None, horizons=None, sink=None, store=None, store_symbol=DEFAULT_SYMBOL):
+        self.history = history if history is not None else CandleHistory()
+        self.horizons = horizons
+        self.sink = sink
+        self.store = store
+        self.store_symbol = store_symbol
+        self.latency = Histogram()
+        self.feed_latency = Histogram()
+        self.scored = 0
+        self.skipped = 0
+        self.errors = 0
+        self._last_timestamp = {}
+
+    def _is_new(self, candle):
+        timestamp = candle.get('timestamp')
+        if timestamp is None:
+            return True
+        try:
+            # Feeds mix ISO strings and epoch numbers, so compare instants rather than raw values
+            timestamp = candle_time(timestamp)
+        except (TypeError, ValueError, OverflowError) as e:
+            print(f"Warning: cannot order candle timestamp {timestamp!r}: {e}", file=sys.stderr)
+            return True
+        symbol = candle.get('symbol', DEFAULT_SYMBOL)
+        last = self._last_timestamp.get(symbol)
+        if last is not None and timestamp <= last:
+            return False
+        self._last_timestamp[symbol] = timestamp
+        return True
+
+    def ingest(self, record, received=None):
+        """Score one record; returns the prediction line, or None if it was skipped"""
+        received = time.perf_counter() if received is None else received
+        try:
+            candle = normalise(record)
+        except (TypeError, ValueError) as e:
+            print(f"Warning: skipping candle: {e}", file=sys.stderr)
+            self.errors += 1
+            return None
+        if candle is None or not self._is_new(candle):
+            self.skipped += 1
+            return None
+        if self.horizons:
+            candle['horizons'] = self.horizons
+        try:
+            result = predict_one(candle, history=self.history)
+        except Exception as e:
+            print(f"Warning: scoring failed: {e}", file=sys.stderr)
+            self.errors += 1
+            return None
+
+        elapsed = time.perf_counter() - received
+        self.latency.observe(elapsed)
+        tracing.observe('ingest', elapsed)
+        line = {field: candle[field] for field in PASSTHROUGH_FIELDS if field in candle}
+        line.update(close=candle['close_price'], prediction=result['prediction'],
+                    confidence=float(result['confidence']), latency_ms=elapsed * 1000)
+        if 'sent_at' in candle:
+            feed = max(time.time() - candle['sent_at'], 0.0)
+            self.feed_latency.observe(feed)
+            line['feed_latency_ms'] = feed * 1000
+        if 'horizons' in result:
+            line['horizons'] = result['horizons']
+        self.scored += 1
+        if self.sink is not None:
+            self.sink.write(json.dumps(line, default=str) + '\n')
+            self.sink.flush()
+        if self.store is not None and candle.get('symbol', DEFAULT_SYMBOL) == self.store_symbol:
+            self._store(candle)
+        return line
+
+    def _store(self, candle):
+        """Append the scored candle's features to the feature store"""
+        frame = pd.DataFrame([{name: candle[name] for name in _NUMERIC_COLUMNS if name in candle}])
+        try:
+            timestamp = candle_time(candle['timestamp']) if 'timestamp' in candle else time.time_ns()
+            self.store.append(frame, [timestamp])
+        except ValueError as e:
+            print(f"Warning: not stored in the feature store: {e}", file=sys.stderr)
+
+    def run(self, records, limit=None, report_seconds=REPORT_SECONDS):
+        """Ingest ``(record, received)`` pairs until the source ends or ``limit`` candles are scored"""
+        next_report = time.monotonic() + report_seconds
+        for record, received in records:
+            self.ingest(record, received)
+            if limit is not None and self.scored >= limit:
+                break
+            if time.monotonic() >= next_report:
+                self.report()
+                next_report = time.monotonic() + report_seconds
+        self.history.flush()
+
+    def report(self, file=sys.stderr):
+        def quantiles(hist):
+            return ' '.join(f"p{round(q * 100)} {hist.quantile(q) * 1000:.2f} ms" for q in tracing.QUANTILES)
+
+        print(f"Ingested {self.scored:,} candles ({self.skipped:,} skipped, {self.errors:,} errors)", file=file)
+        if self.latency.count:
+            print(f"  receive -> prediction: {quantiles(self.latency)}", file=file)
+        if self.feed_latency.count:
+            print(f"  publish -> prediction: {quantiles(self.feed_latency)}", file=file)
+
+
+def publish(path, address=None, append_to=None, rate=None):
+    """Replay a candle file as a live feed: NDJSON on a socket or appended to a file"""
+    if append_to is not None:
+        with open(append_to, 'a') as f:
+            for record in replay_records(path, rate):
+                f.write(json.dumps(record, default=str) + '\n')
+                f.flush()
+        return
+
+    family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+    with socket.socket(family, socket.SOCK_STREAM) as server:
+        if family == socket.AF_INET:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(address)
+        server.listen(1)
+        print(f"Replaying {path} on {address}", file=sys.stderr)
+        connection, _ = server.accept()
+        with connection:
+            for record in replay_records(path, rate):
+                connection.sendall((json.dumps(record, default=str) + '\n').encode())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score live candles as they close")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    consume = commands.add_parser('consume', help="ingest candles and score each one")
+    source = consume.add_mutually_exclusive_group(required=True)
+    source.add_argument('--tail', metavar='FILE', help="follow a file of JSON or CSV candle lines")
+    source.add_argument('--socket', metavar='ADDRESS', help="read a feed from HOST:PORT or a Unix socket path")
+    source.add_argument('--replay', metavar='FILE', help="replay a CSV/Parquet candle file in-process")
+    consume.add_argument('--from-start', action='store_true', help="with --tail, read lines already in the file")
+    consume.add_argument('--rate', type=float, help="with --replay, candles per second (default: as fast as possible)")
+    consume.add_argument('--limit', type=int, help="stop after scoring this many candles")
+    consume.add_argument('--output', help="append prediction lines here instead of stdout")
+    consume.add_argument('--history-dir', help="persist the per-symbol lag history in memory-mapped files here")
+    consume.add_argument('--store', help="append each scored candle's features to this feature store")
+    consume.add_argument('--store-symbol', default=DEFAULT_SYMBOL, help="symbol whose candles go to --store")
+    consume.add_argument('--horizons', nargs='*', help="also forecast these horizons (no value: all of them)")
+    consume.add_argument('--report-seconds', type=float, default=REPORT_SECONDS)
+
+    replay = commands.add_parser('replay', help="publish a candle file as a live feed (local stand-in)")
+    replay.add_argument('input', help="CSV/Parquet file of consecutive candles")
+    target = replay.add_mutually_exclusive_group(required=True)
+    target.add_argument('--port', type=int, help="serve NDJSON candles on 127.0.0.1:PORT")
+    target.add_argument('--unix-socket', help="serve NDJSON candles on a Unix socket path")
+    target.add_argument('--append-to', metavar='FILE', help="append NDJSON candles to a file (for --tail)")
+    replay.add_argument('--rate', type=float, default=1.0, help="candles per second")
+    args = parser.parse_args(argv)
+
+    if args.command == 'replay':
+        address = ('127.0.0.1', args.port) if args.port else args.unix_socket
+        try:
+            publish(args.input, address=address, append_to=args.append_to, rate=args.rate)
+        except (KeyboardInterrupt, BrokenPipeError, ConnectionResetError):
+            pass
+        return
+
+    if args.tail:
+        records = lines_to_records(tail_lines(args.tail, from_start=args.from_start))
+    elif args.socket:
+        records = lines_to_records(socket_lines(parse_address(args.socket)))
+    else:
+        records = ((record, time.perf_counter()) for record in replay_records(args.replay, args.rate))
+
+    # Loaded before the first candle so its latency does not include unpickling
+    load_models()
+    sink = open(args.output, 'a') if args.output else sys.stdout
+    history = CandleHistory(directory=args.history_dir) if args.history_dir else None
+    horizons = (args.horizons or True) if args.horizons is not None else None
+    store = FeatureStore(args.store) if args.store else None
+    pipeline = Pipeline(history=history, horizons=horizons, sink=sink, store=store, store_symbol=args.store_symbol)
+    try:
+        pipeline.run(records, limit=args.limit, report_seconds=args.report_seconds)
+    except KeyboardInterrupt:
+        pipeline.history.flush()
+    finally:
+        pipeline.report()
+        if sink is not sys.stdout:
+            sink.close()
+
+
+if __name__ == '__main__':
+    main()
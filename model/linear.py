@@ -0,0 +1,130 @@
+"""Closed-form evaluation of the linear parts of the ensemble
+
+Ridge and (when it is linear) the meta model are evaluated from their
+coefficients instead of through scikit-learn's ``predict``, which validates
+its input on every call. The Ridge weights are expanded to the full schema
+row with any standardisation in its layout folded in, and the meta model's
+Ridge term is folded into a second column, so one product ``X @ weights``
+yields both the Ridge prediction and the Ridge share of the stacked output.
+"""
+import sys
+
+import numpy as np
+
+# Estimators whose predict() is exactly X @ coef_ + intercept_
+LINEAR_MODELS = frozenset({
+    'LinearRegression', 'Ridge', 'RidgeCV', 'Lasso', 'LassoCV', 'ElasticNet', 'ElasticNetCV',
+    'Lars', 'LarsCV', 'LassoLars', 'LassoLarsCV', 'LassoLarsIC', 'OrthogonalMatchingPursuit',
+    'OrthogonalMatchingPursuitCV', 'BayesianRidge', 'ARDRegression', 'HuberRegressor',
+    'SGDRegressor', 'QuantileRegressor', 'TheilSenRegressor', 'LinearModel',
+})
+
+# Stacking order of the meta model's inputs
+STACK_ORDER = ('random_forest', 'ridge', 'xgboost')
+
+# Largest relative difference from scikit-learn accepted when compiling
+TOLERANCE = 1e-9
+
+
+def linear_params(model):
+    """``(coef, intercept)`` of a single-output linear regressor, or None"""
+    if model is None or type(model).__name__ not in LINEAR_MODELS:
+        return None
+    coef = np.asarray(getattr(model, 'coef_', None), dtype=np.float64)
+    intercept = np.ravel(np.asarray(getattr(model, 'intercept_', 0.0), dtype=np.float64))
+    if coef.ndim != 1 or intercept.size != 1:
+        return None
+    return coef, float(intercept[0])
+
+
+class FusedLinear:
+    """Ridge and a linear meta model compiled against one feature schema
+
+    ``ridge`` / ``meta`` say which of the two are evaluated here; the other
+    keeps going through its estimator.
+    """
+
+    def __init__(self, width, ridge=None, ridge_layout=None, meta=None):
+        self.ridge = ridge is not None
+        self.meta = meta is not None
+        columns, bias = [], []
+        if self.ridge:
+            coef, intercept = ridge
+            weights = np.zeros(width, dtype=np.float64)
+            if ridge_layout.mean is not None:
+                # (x - mean) / scale @ coef + b == x @ (coef / scale) + (b - mean / scale @ coef)
+                intercept -= float(ridge_layout.mean / ridge_layout.scale @ coef)
+                coef = coef / ridge_layout.scale
+            np.add.at(weights, ridge_layout.columns, coef)
+            columns.append(weights)
+            bias.append(intercept)
+        if self.meta:
+            self.meta_coef, self.meta_intercept = meta
+            if self.ridge:
+                ridge_share = self.meta_coef[STACK_ORDER.index('ridge')]
+                columns.append(columns[0] * ridge_share)
+                bias.append(bias[0] * ridge_share + self.meta_intercept)
+        self.weights = np.column_stack(columns) if columns else None
+        self.bias = np.asarray(bias, dtype=np.float64)
+
+    def apply(self, X):
+        """``X @ weights + bias``: column 0 is Ridge, column 1 (if both are fused) its meta share"""
+        if self.weights is None:
+            return None
+        return X @ self.weights + self.bias
+
+    def stack(self, predictions, fused):
+        """Meta prediction from the base predictions and the output of apply()"""
+        if self.ridge:
+            meta = fused[:, 1].copy()
+            for i, name in enumerate(STACK_ORDER):
+                if name != 'ridge':
+                    meta += self.meta_coef[i] * predictions[name]
+            return meta
+        meta = np.full(len(predictions[STACK_ORDER[0]]), self.meta_intercept)
+        for i, name in enumerate(STACK_ORDER):
+            meta += self.meta_coef[i] * predictions[name]
+        return meta
+
+
+def _close(expected, actual):
+    expected = np.asarray(expected, dtype=np.float64).reshape(-1)
+    return bool(np.all(np.abs(expected - actual) <= TOLERANCE * np.maximum(np.abs(expected), 1.0)))
+
+
+def compile_linear(models, schema):
+    """Fuse the linear estimators of a model set, or return None if none qualify
+
+    Each candidate is checked against its own ``predict`` on a few probe rows;
+    anything that is not linear (or does not match) stays with scikit-learn.
+    """
+    ridge = linear_params(models.get('ridge'))
+    layout = schema.layouts.get('ridge')
+    if ridge is not None and (layout is None or layout.transformer is not None or len(ridge[0]) != len(layout.columns)):
+        ridge = None
+    meta = linear_params(models.get('meta_model'))
+    if meta is not None and len(meta[0]) != len(STACK_ORDER):
+        meta = None
+    if ridge is None and meta is None:
+        return None
+
+    probe = np.random.default_rng(0).normal(size=(8, schema.width))
+    fused = FusedLinear(schema.width, ridge, layout, meta)
+    out = fused.apply(probe)
+    try:
+        if fused.ridge and not _close(models['ridge'].predict(layout.take(probe)), out[:, 0]):
+            print("Warning: Ridge coefficients do not reproduce its predictions; not fusing it", file=sys.stderr)
+            return compile_linear(dict(models, ridge=None), schema)
+        if fused.meta:
+            base = {name: probe[:, i] * 1000.0 for i, name in enumerate(STACK_ORDER)}
+            if fused.ridge:
+                base['ridge'] = out[:, 0]
+            expected = models['meta_model'].predict(np.column_stack([base[name] for name in STACK_ORDER]))
+            if not _close(expected, fused.stack(base, out)):
+                print("Warning: meta model coefficients do not reproduce its predictions; not fusing it",
+                      file=sys.stderr)
+                return compile_linear(dict(models, meta_model=None), schema)
+    except Exception as e:
+        print(f"Warning: cannot check the linear fast path ({e}); using scikit-learn", file=sys.stderr)
+        return None
+    return fused
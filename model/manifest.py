@@ -0,0 +1,147 @@
+"""Artifact manifest: which files make up a model set and how to verify them
+
+``model/manifest.json`` lists every artifact by registry name with its path
+(relative to the manifest), format, SHA-256, size, whether it is required, and
+the input features it expects (``null`` when not pinned). Regenerate it after
+retraining with::
+
+    python -m model.manifest
+"""
+import argparse
+import hashlib
+import json
+import pickle
+import sys
+from pathlib import Path
+
+from model.portable import load_forest, load_linear, load_scaler, load_xgboost
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_PATH = Path(__file__).parent / MANIFEST_NAME
+
+LFS_POINTER_PREFIX = b'version https://git-lfs'
+
+
+class ManifestError(RuntimeError):
+    """An artifact is missing, corrupt, or does not match the manifest"""
+
+
+def read_manifest(path=MANIFEST_PATH):
+    """Read and validate the manifest; returns ``{name: artifact spec}``"""
+    path = Path(path)
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ManifestError(f"cannot read model manifest {path}: {e}") from e
+
+    artifacts = manifest.get('artifacts')
+    if not isinstance(artifacts, dict) or not artifacts:
+        raise ManifestError(f"model manifest {path} lists no artifacts")
+    for name, spec in artifacts.items():
+        if 'path' not in spec:
+            raise ManifestError(f"manifest entry {name!r} has no path")
+        spec.setdefault('format', 'pickle')
+        spec.setdefault('required', True)
+        if spec['format'] not in LOADERS:
+            raise ManifestError(f"manifest entry {name!r} has unknown format {spec['format']!r}")
+    return artifacts
+
+
+def file_sha256(path):
+    """Hash a file in chunks so large forests are not read into memory twice"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def verify_file(name, path, spec, size, sha256):
+    """Check an artifact's size and hash against its manifest entry"""
+    expected_size = spec.get('size')
+    if expected_size is not None and size != expected_size:
+        with open(path, 'rb') as f:
+            if f.read(len(LFS_POINTER_PREFIX)) == LFS_POINTER_PREFIX:
+                raise ManifestError(f"{name}: {path} is a Git LFS pointer, run 'git lfs pull'")
+        raise ManifestError(f"{name}: {path} is {size} bytes, manifest expects {expected_size}")
+    expected_sha = spec.get('sha256')
+    if expected_sha is not None and sha256 != expected_sha:
+        raise ManifestError(f"{name}: {path} has SHA-256 {sha256}, manifest expects {expected_sha}")
+
+
+def validate_features(name, model, spec):
+    """Check the loaded estimator against the manifest's expected input features"""
+    expected = spec.get('features')
+    if expected is None:
+        return
+    names = getattr(model, 'feature_names_in_', None)
+    if names is not None:
+        if list(names) != list(expected):
+            raise ManifestError(f"{name}: fitted on features {list(names)}, manifest expects {expected}")
+        return
+    n_features = getattr(model, 'n_features_in_', None)
+    if n_features is not None and n_features != len(expected):
+        raise ManifestError(f"{name}: fitted on {n_features} features, manifest expects {len(expected)}")
+
+
+def _load_pickle(path, spec=None):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+# Artifact format -> loader taking the resolved path and the manifest entry
+LOADERS = {
+    'pickle': _load_pickle,
+    'linear-npy': load_linear,
+    'scaler-npy': load_scaler,
+    'forest-npy': load_forest,
+    'xgboost-ubj': load_xgboost,
+    'xgboost-json': load_xgboost,
+}
+
+
+def load_artifact(name, path, spec):
+    """Load one verified artifact with the loader for its format"""
+    try:
+        model = LOADERS[spec['format']](path, spec)
+    except Exception as e:
+        raise ManifestError(f"{name}: cannot load {path}: {e}") from e
+    validate_features(name, model, spec)
+    return model
+
+
+def write_manifest(path=MANIFEST_PATH, record_features=True):
+    """Refresh checksums, sizes and (optionally) feature lists from the artifacts on disk"""
+    path = Path(path)
+    with open(path) as f:
+        manifest = json.load(f)
+    for name, spec in manifest['artifacts'].items():
+        artifact = path.parent / spec['path']
+        if not artifact.exists():
+            print(f"Warning: {name}: {artifact} does not exist, leaving its entry unchanged", file=sys.stderr)
+            continue
+        spec['size'] = artifact.stat().st_size
+        spec['sha256'] = file_sha256(artifact)
+        if record_features:
+            model = LOADERS[spec.get('format', 'pickle')](artifact, spec)
+            names = getattr(model, 'feature_names_in_', None)
+            if names is not None:
+                spec['features'] = [str(feature) for feature in names]
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update model/manifest.json from the artifacts on disk")
+    parser.add_argument('--manifest', default=str(MANIFEST_PATH))
+    parser.add_argument('--no-features', action='store_true',
+                        help="only refresh sizes and checksums, do not unpickle artifacts")
+    args = parser.parse_args(argv)
+    write_manifest(args.manifest, record_features=not args.no_features)
+
+
+if __name__ == '__main__':
+    main()
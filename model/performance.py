@@ -0,0 +1,59 @@
+"""Measured model performance, recorded per model version by the backtester
+
+``python -m model.backtest candles.csv --record`` stores the stacked model's
+walk-forward metrics in ``performance.json`` next to the manifest, keyed by the
+registry's model version. Responses report the metrics of the version that
+served them, or nulls when that version has not been backtested.
+"""
+import json
+import os
+import sys
+import threading
+
+from model.registry import get_registry
+
+PERFORMANCE_NAME = 'performance.json'
+
+METRICS = ('rmse', 'mae', 'r2', 'directional_accuracy')
+
+_lock = threading.Lock()
+_loaded = {'path': None, 'mtime': None, 'records': {}}
+
+
+def performance_path():
+    return get_registry().manifest_path.parent / PERFORMANCE_NAME
+
+
+def _records(path):
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    with _lock:
+        if _loaded['path'] != path or _loaded['mtime'] != mtime:
+            try:
+                with open(path) as f:
+                    records = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: cannot read {path}: {e}", file=sys.stderr)
+                records = {}
+            _loaded.update(path=path, mtime=mtime, records=records)
+        return _loaded['records']
+
+
+def model_performance(models):
+    """Backtested metrics of this model set, with None for anything not measured"""
+    record = _records(performance_path()).get(models.get('version') or '', {})
+    return {metric: record.get(metric) for metric in METRICS}
+
+
+def record_performance(version, metrics, path=None, **details):
+    """Store ``metrics`` (plus ``details`` such as row counts) for a model version"""
+    path = performance_path() if path is None else path
+    records = dict(_records(path))
+    records[version] = dict({metric: metrics[metric] for metric in METRICS}, **details)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(records, f, indent=2)
+        f.write('\n')
+    os.replace(tmp, path)
@@ -0,0 +1,259 @@
+"""Portable, memory-mappable artifact formats
+
+Pickles need the whole object graph unpickled (and trusted) before a model can
+serve. These formats store what prediction actually needs:
+
+- ``linear-npy``: coefficients of a linear model, intercept last
+- ``scaler-npy``: a StandardScaler's mean (row 0) and scale (row 1)
+- ``forest-npy``: every tree of a forest regressor as one padded node table
+- ``xgboost-ubj`` / ``xgboost-json``: XGBoost's own model format
+
+The ``.npy`` formats are opened with ``mmap_mode='r'`` and never unpickled, so
+loading is close to free, untouched nodes are never paged in, and worker
+processes loading the same file share its pages through the page cache.
+Feature names are not stored in the arrays; they come from the manifest
+entry's ``features`` list (and ``n_features`` when there are none).
+"""
+import sys
+
+import numpy as np
+
+# One forest node; padding slots beyond a tree's last node are unreachable leaves
+NODE_DTYPE = np.dtype([
+    ('feature', np.int32),
+    ('left', np.int32),
+    ('right', np.int32),
+    ('threshold', np.float64),
+    ('value', np.float64),
+], align=True)
+
+LEAF = -1
+
+# Above this many rows a flattened forest hands the batch to the scikit-learn
+# forest it was built from (when kept): the per-row NumPy traversal wins on
+# call overhead but loses to compiled loops on large batches. Without one the
+# batch is walked in blocks of this many rows
+FLAT_MAX_ROWS = 256
+
+
+def _open_npy(path):
+    return np.load(path, mmap_mode='r', allow_pickle=False)
+
+
+def _apply_spec(model, spec, n_features):
+    features = spec.get('features')
+    if features is not None:
+        model.feature_names_in_ = np.asarray(features, dtype=object)
+    model.n_features_in_ = len(features) if features is not None else spec.get('n_features', n_features)
+    return model
+
+
+class LinearModel:
+    """``predict(X) = X @ coef_ + intercept_`` for coefficients exported from a linear estimator"""
+
+    def __init__(self, coef, intercept):
+        self.coef_ = coef
+        self.intercept_ = float(intercept)
+        self.n_features_in_ = len(coef)
+
+    def predict(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercept_
+
+
+class StandardScale:
+    """The ``transform`` of a fitted StandardScaler, from its mean and scale"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+        self.n_features_in_ = len(mean)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class FlatForest:
+    """A forest regressor evaluated from an ``(n_trees, max_nodes)`` node table
+
+    Each row holds one tree with its root at column 0 and children indexed
+    within the row. Every row of ``X`` walks all trees at once: each step is a
+    handful of gathers over the flat node arrays for the (row, tree) pairs
+    still at a split, so one row costs ~depth NumPy calls rather than a call
+    per tree. Prediction is the mean of the trees' leaf values, matching
+    scikit-learn's RandomForestRegressor (inputs are compared as float32, as
+    scikit-learn's trees do).
+
+    ``original``, if given, is the scikit-learn forest the table was built
+    from; batches larger than ``FLAT_MAX_ROWS`` are passed to it. Without it
+    (a forest loaded from ``forest-npy``) large batches are walked in blocks
+    of ``FLAT_MAX_ROWS`` rows, which bounds the ``(rows, trees)`` index arrays.
+    """
+
+    def __init__(self, nodes, original=None):
+        self.nodes = nodes
+        self.original = original
+        self.n_trees, self.max_nodes = nodes.shape
+        # Field views over the same (possibly memory-mapped) buffer, indexed by
+        # tree * max_nodes + node
+        flat = nodes.reshape(-1)
+        self.feature = flat['feature']
+        self.left = flat['left']
+        self.right = flat['right']
+        self.threshold = flat['threshold']
+        self.value = flat['value']
+        self.roots = np.arange(self.n_trees, dtype=np.intp) * self.max_nodes
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Flatten a fitted single-output scikit-learn forest regressor"""
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("only single-output forests can be flattened")
+        nodes = np.zeros((len(trees), max(tree.node_count for tree in trees)), dtype=NODE_DTYPE)
+        nodes['feature'] = -2
+        nodes['left'] = LEAF
+        nodes['right'] = LEAF
+        for i, tree in enumerate(trees):
+            row = nodes[i, :tree.node_count]
+            row['feature'] = tree.feature
+            row['left'] = tree.children_left
+            row['right'] = tree.children_right
+            row['threshold'] = tree.threshold
+            row['value'] = tree.value[:, 0, 0]
+        return cls(nodes)
+
+    def apply(self, X):
+        """Flat index of the leaf reached in every tree, shape ``(n_rows, n_trees)``"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        X_flat = X.reshape(-1)
+        node = np.tile(self.roots, n_rows)
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, self.n_trees)
+        active = np.flatnonzero(self.left[node] != LEAF)
+        while active.size:
+            current = node[active]
+            go_left = X_flat[row_offset[active] + self.feature[current]] <= self.threshold[current]
+            child = np.where(go_left, self.left[current], self.right[current])
+            current += child - current % self.max_nodes
+            node[active] = current
+            active = active[self.left[current] != LEAF]
+        return node.reshape(n_rows, self.n_trees)
+
+    def predict(self, X):
+        if len(X) <= FLAT_MAX_ROWS:
+            return self.value[self.apply(X)].mean(axis=1)
+        if self.original is not None:
+            return self.original.predict(X)
+        X = np.asarray(X)
+        return np.concatenate([self.value[self.apply(X[start:start + FLAT_MAX_ROWS])].mean(axis=1)
+                               for start in range(0, len(X), FLAT_MAX_ROWS)])
+
+
+def verification_rows(flat, n_features, n_rows=512, seed=0):
+    """Inputs spread over each feature's split thresholds, so most branches are taken"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features))
+    splits = flat.feature >= 0
+    for f in range(n_features):
+        thresholds = flat.threshold[splits & (flat.feature == f)]
+        if thresholds.size:
+            low, high = thresholds.min(), thresholds.max()
+            pad = max(high - low, 1.0) * 0.1
+            X[:, f] = rng.uniform(low - pad, high + pad, n_rows)
+    return X
+
+
+def is_forest_regressor(model):
+    """True for a fitted single-output scikit-learn forest regressor"""
+    estimators = getattr(model, 'estimators_', None)
+    return (isinstance(estimators, list) and bool(estimators) and all(hasattr(e, 'tree_') for e in estimators)
+            and getattr(model, 'n_outputs_', 1) == 1 and not hasattr(model, 'classes_'))
+
+
+def flatten_forest(name, forest, tolerance=1e-9, keep_original=True):
+    """Flatten a fitted forest and check it against scikit-learn; returns None if they disagree
+
+    With ``keep_original`` the scikit-learn forest stays referenced for large
+    batches, at the cost of holding both copies of the trees in memory.
+    """
+    try:
+        flat = FlatForest.from_sklearn(forest)
+    except (AttributeError, ValueError) as e:
+        print(f"Warning: cannot flatten {name}: {e}", file=sys.stderr)
+        return None
+    names = getattr(forest, 'feature_names_in_', None)
+    if names is not None:
+        flat.feature_names_in_ = names
+    flat.n_features_in_ = forest.n_features_in_
+    X = verification_rows(flat, forest.n_features_in_)
+    X_sklearn = X
+    if names is not None:
+        import pandas as pd
+        X_sklearn = pd.DataFrame(X, columns=names)
+    expected = forest.predict(X_sklearn)
+    error = float(np.max(np.abs(expected - flat.predict(X)) / np.maximum(np.abs(expected), 1.0)))
+    if error > tolerance:
+        print(f"Warning: flattened {name} differs from scikit-learn by {error:.3g}; "
+              f"keeping the scikit-learn forest", file=sys.stderr)
+        return None
+    if keep_original:
+        flat.original = forest
+    return flat
+
+
+def save_linear(model, path):
+    coef = np.asarray(model.coef_, dtype=np.float64).reshape(-1)
+    np.save(path, np.append(coef, float(np.ravel(model.intercept_)[0])))
+
+
+def load_linear(path, spec):
+    params = _open_npy(path)
+    return _apply_spec(LinearModel(params[:-1], params[-1]), spec, len(params) - 1)
+
+
+def save_scaler(scaler, path):
+    np.save(path, np.vstack([scaler.mean_, scaler.scale_]).astype(np.float64))
+
+
+def load_scaler(path, spec):
+    params = _open_npy(path)
+    return _apply_spec(StandardScale(params[0], params[1]), spec, params.shape[1])
+
+
+def save_forest(forest, path):
+    np.save(path, FlatForest.from_sklearn(forest).nodes)
+
+
+def load_forest(path, spec):
+    nodes = _open_npy(path)
+    if nodes.dtype != NODE_DTYPE or nodes.ndim != 2:
+        raise ValueError(f"not a forest node table (dtype {nodes.dtype}, shape {nodes.shape})")
+    return _apply_spec(FlatForest(nodes), spec, None)
+
+
+def save_xgboost(model, path):
+    model.save_model(path)
+
+
+def load_xgboost(path, spec):
+    from xgboost import XGBRegressor
+    model = XGBRegressor()
+    model.load_model(path)
+    return model
+
+
+def portable_format(model):
+    """``(format, file suffix, save function)`` for an estimator, or None to keep it pickled"""
+    if hasattr(model, 'get_booster') and hasattr(model, 'save_model'):
+        return 'xgboost-ubj', '.ubj', save_xgboost
+    if is_forest_regressor(model):
+        return 'forest-npy', '.forest.npy', save_forest
+    coef = getattr(model, 'coef_', None)
+    if coef is not None and hasattr(model, 'intercept_') and np.ndim(coef) == 1 and hasattr(model, 'predict'):
+        if not hasattr(model, 'classes_'):
+            return 'linear-npy', '.npy', save_linear
+        return None
+    if type(model).__name__ == 'StandardScaler' and getattr(model, 'mean_', None) is not None \
+            and getattr(model, 'scale_', None) is not None:
+        return 'scaler-npy', '.npy', save_scaler
+    return None
@@ -1,61 +1,40 @@
+import argparse
 import json
 import sys
-import pickle
+import time
 import numpy as np
-import pandas as pd
 import os
 from pathlib import Path
 
+if __package__ in (None, ""):
+    # Allow running as ``python model/predict.py`` as well as ``python -m model.predict``
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from model.cache import PredictionCache, canonical_key
+from model.execution import run_base_models
+from model.history import DEFAULT_SYMBOL, N_LAGS
+from model.manifest import ManifestError
+from model.importance import compile_importances
+from model.performance import model_performance
+from model.registry import get_registry
+from model.schema import BASE_MODELS, schema_for
+from model.shadow import get_shadow
+from model.tracing import enabled as tracing_enabled, observe, trace
+from model.text_features import text_feature_columns, text_features
+
+# Full prediction results shared by every caller in this process
+result_cache = PredictionCache()
+
 def load_models():
-    """Load all trained models from the models directory"""
-    models_dir = Path(__file__).parent
-    models = {}
-    
-    # Initialize with None
-    models['random_forest'] = None
-    models['ridge'] = None
-    models['xgboost'] = None
-    models['meta_model'] = None
-    models['scaler'] = None
-    
-    if not models_dir.exists():
-        print(f"Warning: Models directory not found at {models_dir}", file=sys.stderr)
-        return models
-    
-    try:
-        rf_path = models_dir / "random_forest_model.pkl"
-        if rf_path.exists():
-            with open(rf_path, "rb") as f:
-                models['random_forest'] = pickle.load(f)
-        
-        ridge_path = models_dir / "ridge_model.pkl"
-        if ridge_path.exists():
-            with open(ridge_path, "rb") as f:
-                models['ridge'] = pickle.load(f)
-        
-        xgb_path = models_dir / "xgboost_model.pkl"
-        if xgb_path.exists():
-            with open(xgb_path, "rb") as f:
-                models['xgboost'] = pickle.load(f)
-        
-        meta_path = models_dir / "meta_model.pkl"
-        if meta_path.exists():
-            with open(meta_path, "rb") as f:
-                models['meta_model'] = pickle.load(f)
-        
-        scaler_path = models_dir / "scaler.pkl"
-        if scaler_path.exists():
-            with open(scaler_path, "rb") as f:
-                models['scaler'] = pickle.load(f)
-        
-        return models
-    
-    except Exception as e:
-        print(f"Warning: Error loading some models: {e}", file=sys.stderr)
-        return models
+    """Return the trained models from the process-wide registry"""
+    return dict(get_registry().models())
 
-def engineer_features(data):
-    """Engineer features to match training data format"""
+def engineer_features(data, history=None):
+    """Engineer features to match training data format
+    
+    ``history`` is an optional CandleHistory; when given, the lag features are
+    the candles previously recorded for ``data['symbol']``.
+    """
     features = {}
     
     # Basic price features
@@ -79,11 +58,15 @@ def engineer_features(data):
     features['Sentiment_Direction'] = 1 if sentiment > 0 else (-1 if sentiment < 0 else 0)
     features['Sentiment_Volatility_Interaction'] = sentiment * features['Range_Pct']
     
-    for i in range(1, 4):
-        features[f'Close_Lag_{i}'] = data['close_price'] * (1 + np.random.normal(0, 0.01))
-        features[f'Open_Lag_{i}'] = data['open_price'] * (1 + np.random.normal(0, 0.01))
-        features[f'Volume_Lag_{i}'] = data['volume'] * (1 + np.random.normal(0, 0.05))
-        features[f'Sentiment_Lag_{i}'] = data.get('sentiment_score', 0.0)
+    if history is not None:
+        features.update(history.lag_features(data.get('symbol', DEFAULT_SYMBOL), data))
+    else:
+        # Without recorded candles the best estimate of the previous period is the current one
+        for i in range(1, N_LAGS + 1):
+            features[f'Close_Lag_{i}'] = data['close_price']
+            features[f'Open_Lag_{i}'] = data['open_price']
+            features[f'Volume_Lag_{i}'] = data['volume']
+            features[f'Sentiment_Lag_{i}'] = data.get('sentiment_score', 0.0)
     
     # Technical indicators
     features['Price_Momentum'] = features['Price_Change'] / data['open_price'] if data['open_price'] != 0 else 0
@@ -116,8 +99,29 @@ def create_fallback_prediction(data):
     
     return max(prediction, low_price * 0.9)  # Don't predict below 90% of low price
 
-def make_predictions(models, features_dict):
-    """Make predictions using all loaded models"""
+def _run_base_and_linear(models, schema, X, default, execution, timings):
+    """Base-model predictions, with Ridge from the fused linear product when it is linear
+    
+    Returns the predictions and the fused product (passed on to the meta stacking).
+    """
+    linear = schema.linear
+    names = [name for name in BASE_MODELS if not (linear is not None and linear.ridge and name == 'ridge')]
+    base = run_base_models(models, schema, X, default, mode=execution, timings=timings, names=names)
+    fused = None
+    if linear is not None:
+        start = time.perf_counter()
+        fused = linear.apply(X)
+        if linear.ridge:
+            base['ridge'] = fused[:, 0]
+            if timings is not None:
+                timings['ridge'] = time.perf_counter() - start
+    return {name: base[name] for name in BASE_MODELS}, fused
+
+def make_predictions(models, features_dict, timings=None):
+    """Make predictions using all loaded models
+    
+    ``timings``, if given, receives each model's prediction time in seconds.
+    """
     predictions = {}
     
     has_models = any(model is not None for model in [models['random_forest'], models['ridge'], models['xgboost']])
@@ -139,48 +143,20 @@ def make_predictions(models, features_dict):
         
         return predictions
     
-    features_df = pd.DataFrame([features_dict])
-    
-    if models['random_forest'] is not None:
-        try:
-            expected_features = models['random_forest'].feature_names_in_
-            for feature in expected_features:
-                if feature not in features_df.columns:
-                    features_df[feature] = 0.0
-            
-            features_model = features_df[expected_features]
-            
-            if models['scaler'] is not None:
-                features_scaled = models['scaler'].transform(features_model)
-                features_model = pd.DataFrame(features_scaled, columns=expected_features)
-            
-            predictions['random_forest'] = float(models['random_forest'].predict(features_model)[0])
-        except Exception as e:
-            print(f"Warning: Random Forest prediction failed: {e}", file=sys.stderr)
-            predictions['random_forest'] = features_dict['Close']
-    else:
-        predictions['random_forest'] = features_dict['Close']
+    schema = schema_for(models)
+    X = schema.fill(features_dict)
+    close = np.array([features_dict['Close']])
     
-    if models['ridge'] is not None:
-        try:
-            predictions['ridge'] = float(models['ridge'].predict(features_df.values.reshape(1, -1))[0])
-        except Exception as e:
-            print(f"Warning: Ridge prediction failed: {e}", file=sys.stderr)
-            predictions['ridge'] = features_dict['Close']
-    else:
-        predictions['ridge'] = features_dict['Close']
-    
-    if models['xgboost'] is not None:
-        try:
-            predictions['xgboost'] = float(models['xgboost'].predict(features_df.values.reshape(1, -1))[0])
-        except Exception as e:
-            print(f"Warning: XGBoost prediction failed: {e}", file=sys.stderr)
-            predictions['xgboost'] = features_dict['Close']
-    else:
-        predictions['xgboost'] = features_dict['Close']
+    # A single row is too small to be worth a pool hand-off
+    base, fused = _run_base_and_linear(models, schema, X, close, 'serial', timings)
+    for name in BASE_MODELS:
+        predictions[name] = float(base[name][0])
     
     # Meta model prediction
-    if models['meta_model'] is not None:
+    meta_start = time.perf_counter()
+    if schema.linear is not None and schema.linear.meta:
+        predictions['meta_model'] = float(schema.linear.stack(base, fused)[0])
+    elif models['meta_model'] is not None:
         try:
             meta_features = np.array([
                 [
@@ -195,6 +171,8 @@ def make_predictions(models, features_dict):
             predictions['meta_model'] = np.mean(list(predictions.values()))
     else:
         predictions['meta_model'] = np.mean(list(predictions.values()))
+    if timings is not None:
+        timings['meta_model'] = time.perf_counter() - meta_start
     
     return predictions
 
@@ -217,87 +195,344 @@ def calculate_confidence(predictions, features):
     confidence = (agreement_score * 0.7 + quality_score * 0.3)
     return max(0.5, min(0.95, confidence))
 
+def importance_table(models):
+    """Feature importances compiled with the model snapshot (compiled here for ad-hoc model dicts)"""
+    table = models.get('importances')
+    if table is None:
+        table = compile_importances(models, schema_for(models))
+    return table
+
 def get_feature_importance(models):
-    """Get feature importance from the models"""
-    try:
-        # Try to get feature importance from Random Forest
-        if hasattr(models['random_forest'], 'feature_importances_'):
-            importances = models['random_forest'].feature_importances_
-            feature_names = models['random_forest'].feature_names_in_
-            
-            # Create feature importance list
-            feature_importance = [
-                {
-                    'feature': name,
-                    'importance': float(importance)
-                }
-                for name, importance in zip(feature_names, importances)
-            ]
-            
-            # Sort by importance and take top 10
-            feature_importance = sorted(feature_importance, key=lambda x: x['importance'], reverse=True)[:10]
-            return feature_importance
-        
-    except Exception as e:
-        pass
-    
-    return [
-        {'feature': 'Open Price', 'importance': 0.25},
-        {'feature': 'Volume', 'importance': 0.20},
-        {'feature': 'Price Range', 'importance': 0.15},
-        {'feature': 'High Price', 'importance': 0.12},
-        {'feature': 'Low Price', 'importance': 0.10},
-        {'feature': 'Sentiment', 'importance': 0.08},
-        {'feature': 'Price Change', 'importance': 0.06},
-        {'feature': 'Volume Price Ratio', 'importance': 0.04}
-    ]
+    """Top features of the primary model (Random Forest when loaded)"""
+    return importance_table(models).primary
 
-def main():
-    try:
-        # Read input from stdin
-        input_data = json.loads(sys.stdin.read())
-        
-        # Load models
+def _safe_divide(numerator, denominator, default=0.0):
+    """Element-wise division that yields ``default`` where the denominator is zero"""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    out = np.full(np.broadcast(numerator, denominator).shape, default, dtype=np.float64)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+def _shift(values, periods):
+    """Previous-row values; rows without enough history repeat the first row, as CandleHistory does"""
+    shifted = np.empty_like(values)
+    if len(values):
+        shifted[periods:] = values[:-periods]
+        shifted[:periods] = values[0]
+    return shifted
+
+def engineer_features_batch(df):
+    """Engineer the feature columns for every row of a candle DataFrame at once
+    
+    ``df`` uses the same column names as the single-row input (``open_price``,
+    ``high_price``, ``low_price``, ``close_price``, ``volume`` and optionally
+    ``sentiment_score``). Rows are assumed to be consecutive candles, so the lag
+    features are taken from the preceding rows.
+    """
+    n_rows = len(df)
+    open_ = df['open_price'].to_numpy(dtype=np.float64)
+    high = df['high_price'].to_numpy(dtype=np.float64)
+    low = df['low_price'].to_numpy(dtype=np.float64)
+    close = df['close_price'].to_numpy(dtype=np.float64) if 'close_price' in df else open_.copy()
+    volume = df['volume'].to_numpy(dtype=np.float64)
+    if 'sentiment_score' in df:
+        sentiment = df['sentiment_score'].fillna(0.0).to_numpy(dtype=np.float64)
+    else:
+        sentiment = np.zeros(n_rows)
+    
+    features = {}
+    
+    # Basic price features
+    features['Open'] = open_
+    features['High'] = high
+    features['Low'] = low
+    features['Close'] = close
+    features['Volume'] = volume
+    
+    # Engineered features
+    features['Price_Change'] = close - open_
+    features['Range'] = high - low
+    features['Range_Pct'] = _safe_divide(high - low, open_)
+    features['Volume_Price_Ratio'] = _safe_divide(volume, open_)
+    
+    # Sentiment features
+    features['Sentiment'] = sentiment
+    features['Sentiment_Strength'] = np.abs(sentiment)
+    features['Sentiment_Direction'] = np.sign(sentiment)
+    features['Sentiment_Volatility_Interaction'] = sentiment * features['Range_Pct']
+    
+    for i in range(1, N_LAGS + 1):
+        features[f'Close_Lag_{i}'] = _shift(close, i)
+        features[f'Open_Lag_{i}'] = _shift(open_, i)
+        features[f'Volume_Lag_{i}'] = _shift(volume, i)
+        features[f'Sentiment_Lag_{i}'] = _shift(sentiment, i)
+    
+    # Technical indicators
+    features['Price_Momentum'] = _safe_divide(features['Price_Change'], open_)
+    features['Volatility'] = features['Range_Pct']
+    features['High_Low_Ratio'] = _safe_divide(high, low, default=1.0)
+    
+    return features
+
+def _fallback_batch(features):
+    """Vectorized equivalent of create_fallback_prediction"""
+    open_ = features['Open']
+    close = features['Close']
+    positive_open = np.where(open_ > 0, open_, 1.0)
+    volatility = np.where(open_ > 0, (features['High'] - features['Low']) / positive_open, 0.0)
+    trend_factor = np.where(open_ > 0, (close - open_) / positive_open, 0.0)
+    prediction = close * (1 + trend_factor + features['Sentiment'] * 0.1 - volatility * 0.05)
+    return np.maximum(prediction, features['Low'] * 0.9)
+
+def make_predictions_batch(models, features, execution=None, timings=None, X=None):
+    """Score every row of an engineered feature batch, calling each model once
+    
+    ``execution`` picks how the base models run (``serial``, ``thread`` or
+    ``process``; see model/execution.py) and ``timings``, if given, receives
+    each model's time in seconds. ``X`` is the batch already filled into this
+    model set's schema, for callers scoring several model sets on one batch.
+    """
+    close = features['Close']
+    
+    has_models = any(model is not None for model in [models['random_forest'], models['ridge'], models['xgboost']])
+    
+    if not has_models:
+        fallback_pred = _fallback_batch(features)
+        return {
+            'random_forest': fallback_pred,
+            'ridge': fallback_pred * 0.98,
+            'xgboost': fallback_pred * 1.02,
+            'meta_model': fallback_pred,
+        }
+    
+    schema = schema_for(models)
+    if X is None:
+        X = schema.fill_batch(features, len(close))
+    predictions, fused = _run_base_and_linear(models, schema, X, close, execution, timings)
+    
+    base = np.column_stack([predictions['random_forest'], predictions['ridge'], predictions['xgboost']])
+    meta_start = time.perf_counter()
+    meta = None
+    if schema.linear is not None and schema.linear.meta:
+        meta = schema.linear.stack(predictions, fused)
+    elif models['meta_model'] is not None:
+        try:
+            meta = np.asarray(models['meta_model'].predict(base), dtype=np.float64).reshape(-1)
+        except Exception as e:
+            print(f"Warning: Meta model prediction failed: {e}", file=sys.stderr)
+    predictions['meta_model'] = meta if meta is not None else base.mean(axis=1)
+    if timings is not None:
+        timings['meta_model'] = time.perf_counter() - meta_start
+    
+    return predictions
+
+def calculate_confidence_batch(predictions, features):
+    """Vectorized equivalent of calculate_confidence for a batch of rows"""
+    pred_values = np.column_stack(list(predictions.values()))
+    
+    # Model agreement
+    pred_std = pred_values.std(axis=1)
+    pred_mean = pred_values.mean(axis=1)
+    agreement_score = np.where(pred_mean != 0, np.maximum(0, 1 - _safe_divide(pred_std, pred_mean)), 0.5)
+    
+    # Input quality score
+    relative_range = _safe_divide(features['High'] - features['Low'], features['Open'])
+    quality_score = np.clip(1.0 - relative_range * 5, 0.3, 1.0)
+    
+    confidence = agreement_score * 0.7 + quality_score * 0.3
+    return np.clip(confidence, 0.5, 0.95)
+
+def predict_batch(df, models=None, execution=None, timings=None):
+    """Predict the next-period price for every row of a candle DataFrame
+    
+    An optional ``news_headline`` column is embedded through the TF-IDF/SVD
+    text stage in batches. Returns a DataFrame indexed like ``df`` with one
+    column per model plus ``prediction`` (the meta model output) and
+    ``confidence``. ``execution`` and ``timings`` are passed to
+    make_predictions_batch.
+    """
+    if models is None:
         models = load_models()
-        
-        # Engineer features
-        features = engineer_features(input_data)
-        
-        # Make predictions
-        predictions = make_predictions(models, features)
-        
-        # Calculate confidence
+    
+    features = engineer_features_batch(df)
+    if 'news_headline' in df:
+        features.update(text_feature_columns(models, df['news_headline'].tolist()))
+    predictions = make_predictions_batch(models, features, execution=execution, timings=timings)
+    confidence = calculate_confidence_batch(predictions, features)
+    
+    # Imported here: pandas is most of this module's import time and single predictions never need it
+    import pandas as pd
+    result = pd.DataFrame(predictions, index=df.index)
+    result['prediction'] = result['meta_model']
+    result['confidence'] = confidence
+    return result
+
+def _score(models, features, timing=None):
+    """Predictions, confidence and feature importance, each traced as its own stage
+
+    ``timing``, if given, receives the seconds spent in make_predictions()
+    under ``'predictions'``.
+    """
+    timings = {} if tracing_enabled() else None
+    start = time.perf_counter()
+    predictions = make_predictions(models, features, timings)
+    if timing is not None:
+        timing['predictions'] = time.perf_counter() - start
+    if timings:
+        for name, seconds in timings.items():
+            observe(f'model.{name}', seconds)
+    with trace('calculate_confidence'):
         confidence = calculate_confidence(predictions, features)
-        
-        # Get feature importance
+    with trace('feature_importance'):
         feature_importance = get_feature_importance(models)
+    return predictions, confidence, feature_importance
+
+def cached_scores(models, features, cache=None, timing=None):
+    """Predictions, confidence and feature importance for engineered features
+    
+    Results are memoised per registry model version on a canonical hash of the
+    features, so repeated submissions of the same candle skip every model call.
+    ``timing`` is passed to _score(), so it stays empty on a cache hit.
+    """
+    version = models.get('version')
+    if version is None:
+        # Ad-hoc model dicts have no identity the cache could key on
+        return _score(models, features, timing)
+    
+    cache = result_cache if cache is None else cache
+    key = canonical_key(features, version)
+    cached = cache.get(key)
+    if cached is None:
+        cached = _score(models, features, timing)
+        cache.put(key, cached)
+    predictions, confidence, feature_importance = cached
+    # Callers own their copy; the cached objects are never handed out
+    return dict(predictions), confidence, [dict(item) for item in feature_importance]
+
+def predict_one(input_data, models=None, history=None):
+    """Run the full pipeline for one input object and build the response dict
+    
+    With a CandleHistory the lag features come from earlier candles of the same
+    symbol, and the candle is recorded afterwards unless ``"record": false``.
+    ``"horizons": true`` (or a list such as ``["1h", "24h"]``) adds forecasts
+    from every horizon's model set (model/horizons.py) under ``horizons``.
+    With PREDICTOR_SHADOW_DIR set the candle is also queued for the shadow
+    candidate (model/shadow.py), off the request path.
+    """
+    # Load models
+    if models is None:
+        models = load_models()
+    
+    # Engineer features
+    with trace('engineer_features'):
+        features = engineer_features(input_data, history)
+    horizons = input_data.get('horizons')
+    shadow = get_shadow()
+    # The numeric features are reused by every horizon's model set and the shadow candidate
+    numeric_features = dict(features) if horizons or shadow is not None else None
+    if input_data.get('news_headline'):
+        with trace('text_features'):
+            features.update(text_features(models, input_data['news_headline']))
+    if history is not None and input_data.get('record', True):
+        history.append(input_data.get('symbol', DEFAULT_SYMBOL), input_data)
+    
+    # Model time only, on the same scope the shadow times its candidate; absent on a cache hit
+    timing = {} if shadow is not None else None
+    predictions, confidence, feature_importance = cached_scores(models, features, timing=timing)
+    if shadow is not None:
+        shadow.submit(numeric_features, input_data.get('news_headline'), dict(predictions),
+                      timing.get('predictions'), models.get('version'))
+    
+    using_fallback = all(model is None for model in [models['random_forest'], models['ridge'], models['xgboost']])
+    
+    # Prepare response
+    response = {
+        'prediction': predictions['meta_model'],
+        'confidence': confidence * 0.7 if using_fallback else confidence,
+        'individual_predictions': predictions,
+        'feature_importance': feature_importance,
+        'feature_importance_by_model': {
+            name: [dict(item) for item in items] for name, items in importance_table(models).top.items()
+        },
+        # Walk-forward backtest of this model version (model/backtest.py), null if never run
+        'model_performance': model_performance(models),
+        'using_fallback': using_fallback,
+        'status': 'success'
+    }
+    if horizons:
+        from model.horizons import predict_horizons, to_columns
+        with trace('horizons'):
+            # The 1h row reuses the scores above rather than running the same models again
+            records = predict_horizons(input_data, horizons=None if horizons is True else horizons,
+                                       features=numeric_features, base=(models, predictions, confidence))
+        response['horizons'] = to_columns(records)
+    return response
+
+def error_response(e):
+    """Build the JSON-serialisable error payload for an exception"""
+    return {
+        'error': str(e),
+        'status': 'error',
+        'traceback': str(e.__class__.__name__)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bitcoin price prediction ensemble")
+    parser.add_argument('--model-stats', action='store_true',
+                        help="print per-model load time and resident size as JSON and exit")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="disable the prediction result cache")
+    parser.add_argument('--serve', choices=['stdio', 'socket', 'http'],
+                        help="keep models warm and serve newline-delimited JSON (stdio/socket) or HTTP requests")
+    parser.add_argument('--host', default='127.0.0.1', help="bind address for --serve socket/http")
+    parser.add_argument('--port', type=int, default=8765, help="bind port for --serve socket/http")
+    parser.add_argument('--unix-socket', help="serve on a Unix domain socket path instead of TCP")
+    parser.add_argument('--history-dir', help="persist the per-symbol lag history in memory-mapped files here")
+    parser.add_argument('--backfill', metavar='INPUT',
+                        help="score a CSV/Parquet file of consecutive candles in chunks (needs --output)")
+    parser.add_argument('--output', help="CSV/Parquet file the --backfill predictions are written to")
+    parser.add_argument('--chunk-rows', type=int, default=100_000, help="candles scored per --backfill chunk")
+    parser.add_argument('--keep', nargs='*', default=[],
+                        help="input columns copied into the --backfill output (e.g. a timestamp)")
+    parser.add_argument('--execution', choices=['serial', 'thread', 'process'],
+                        help="how --backfill runs the base models (default: PREDICTOR_EXECUTION)")
+    args = parser.parse_args(argv)
+    
+    if args.model_stats:
+        registry = get_registry()
+        try:
+            registry.refresh()
+        except ManifestError as e:
+            print(f"Error: {e}", file=sys.stderr)
+        print(json.dumps(registry.stats(), indent=2))
+        return
+    
+    if args.no_cache:
+        result_cache.maxsize = 0
+    
+    if args.backfill:
+        if not args.output:
+            parser.error("--backfill needs --output")
+        from model import backfill
+        backfill.run(args.backfill, args.output, chunk_rows=args.chunk_rows, keep=args.keep,
+                     execution=args.execution)
+        return
+    
+    if args.serve:
+        from model import server
+        server.run(args.serve, host=args.host, port=args.port, unix_socket=args.unix_socket,
+                   history_dir=args.history_dir)
+        return
+    
+    try:
+        # Read input from stdin
+        input_data = json.loads(sys.stdin.read())
         
-        using_fallback = all(model is None for model in [models['random_forest'], models['ridge'], models['xgboost']])
-        
-        # Prepare response
-        result = {
-            'prediction': predictions['meta_model'],
-            'confidence': confidence * 0.7 if using_fallback else confidence,
-            'individual_predictions': predictions,
-            'feature_importance': feature_importance,
-            'model_performance': {
-                'rmse': 97.08 if using_fallback else 97.08,
-                'mae': 52.16 if using_fallback else 52.16,
-                'r2': 0.995 if using_fallback else 0.995
-            },
-            'using_fallback': using_fallback,
-            'status': 'success'
-        }
-        
-        print(json.dumps(result))
+        print(json.dumps(predict_one(input_data)))
         
     except Exception as e:
-        error_result = {
-            'error': str(e),
-            'status': 'error',
-            'traceback': str(e.__class__.__name__)
-        }
-        print(json.dumps(error_result))
+        print(json.dumps(error_response(e)))
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -0,0 +1,494 @@
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from model.importance import IMPORTANCES_NAME, compile_importances, read_stored
+from model.manifest import MANIFEST_NAME, ManifestError, file_sha256, load_artifact, read_manifest, verify_file
+from model.portable import flatten_forest, is_forest_regressor
+from model.schema import compile_schema
+
+MODELS_DIR = Path(__file__).parent
+
+# Threads used to hash and verify artifacts concurrently
+LOAD_WORKERS = 4
+
+# File in a versions directory naming the version to serve
+CURRENT_NAME = 'CURRENT'
+
+# Largest change of the stacked prediction (relative to the close) a new version
+# may show on the smoke-test candles compared with the version it replaces
+MAX_SMOKE_DIVERGENCE = 0.2
+
+# Canned candles every version must score sensibly before it is swapped in
+SMOKE_CANDLES = {
+    'open_price': [45000.0, 45210.0, 44980.0, 45350.0, 45620.0, 45400.0, 45150.0, 45500.0],
+    'high_price': [45400.0, 45380.0, 45500.0, 45800.0, 45700.0, 45450.0, 45600.0, 45900.0],
+    'low_price': [44850.0, 44900.0, 44800.0, 45200.0, 45300.0, 45050.0, 45000.0, 45350.0],
+    'close_price': [45210.0, 44980.0, 45350.0, 45620.0, 45400.0, 45150.0, 45500.0, 45780.0],
+    'volume': [1500.0, 1320.0, 2100.0, 1750.0, 980.0, 1640.0, 1890.0, 1210.0],
+    'sentiment_score': [0.2, -0.1, 0.0, 0.5, -0.3, 0.1, 0.0, 0.4],
+}
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _resident_bytes():
+    """Current resident set size of this process, or None if unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _allow_fallback():
+    """Serving the heuristic fallback must be opted into explicitly"""
+    return os.environ.get('PREDICTOR_ALLOW_FALLBACK', '').lower() in ('1', 'true', 'yes')
+
+
+def _flat_forests():
+    """Serve pickled forests through the flattened evaluator in model/portable.py"""
+    return os.environ.get('PREDICTOR_FLAT_FOREST', '').lower() in ('1', 'true', 'yes')
+
+
+class ModelRegistry:
+    """Loads the model artifacts once per process and reloads them when they change.
+
+    The artifacts come from the manifest (``model/manifest.json``). Changed files
+    are hashed and verified against it in parallel, then unpickled one at a time
+    so each model's load time and resident size can be attributed to it. A file
+    whose mtime changed but whose content did not is kept as is.
+
+    The dict returned by ``models()`` is a snapshot: it is never mutated after
+    it has been handed out, so concurrent readers keep a consistent set of
+    models while a reload builds and publishes a new snapshot.
+
+    Unless ``strict`` is False (or ``PREDICTOR_ALLOW_FALLBACK=1``), a required
+    artifact that cannot be loaded raises ManifestError instead of letting the
+    heuristic fallback serve predictions. An artifact that breaks after it was
+    loaded keeps serving its last good version and the error is reported.
+
+    With ``flat_forests`` (or ``PREDICTOR_FLAT_FOREST=1``) a pickled Random
+    Forest is flattened into node arrays after loading and served by the
+    vectorized evaluator, once its predictions match scikit-learn's.
+    """
+
+    def __init__(self, models_dir=MODELS_DIR, manifest_path=None, artifacts=None,
+                 check_interval=2.0, strict=None, max_workers=LOAD_WORKERS, flat_forests=None):
+        self.models_dir = Path(models_dir)
+        self.manifest_path = Path(manifest_path) if manifest_path else self.models_dir / MANIFEST_NAME
+        self.check_interval = check_interval
+        self.strict = (not _allow_fallback()) if strict is None else strict
+        self.max_workers = max_workers
+        self.flat_forests = _flat_forests() if flat_forests is None else flat_forests
+        self._fixed_artifacts = artifacts
+        self._artifacts = artifacts
+        self._manifest_mtime = None
+        self._lock = threading.RLock()
+        self._models = {'schema': None, 'version': None, 'importances': None}
+        self._importances_mtime = None
+        self._entries = {}
+        self._last_check = None
+        # Why the last strict refresh failed; raised by every models() call until one succeeds
+        self._failure = None
+
+    def models(self):
+        """Return the current model snapshot, refreshing it if the check interval elapsed"""
+        last_check = self._last_check
+        if last_check is None or time.monotonic() - last_check >= self.check_interval:
+            self.refresh()
+        elif self._failure is not None:
+            raise ManifestError(self._failure)
+        return self._models
+
+    def _artifact_specs(self):
+        """Artifact specs from the manifest, re-read whenever the manifest changes"""
+        if self._fixed_artifacts is not None:
+            return self._fixed_artifacts
+        try:
+            mtime = self.manifest_path.stat().st_mtime_ns
+        except OSError as e:
+            raise ManifestError(f"model manifest {self.manifest_path} not found") from e
+        if mtime != self._manifest_mtime:
+            self._artifacts = read_manifest(self.manifest_path)
+            self._manifest_mtime = mtime
+        return self._artifacts
+
+    def _artifact_path(self, spec):
+        base = self.models_dir if self._fixed_artifacts is not None else self.manifest_path.parent
+        return base / spec['path']
+
+    def refresh(self, force=False):
+        """Reload every artifact whose file or manifest entry changed"""
+        with self._lock:
+            specs = self._artifact_specs()
+            updated = dict(self._models)
+            changed = False
+
+            for name in list(self._entries):
+                if name not in specs:
+                    del self._entries[name]
+                    updated.pop(name, None)
+                    changed = True
+
+            pending = []
+            for name, spec in specs.items():
+                if name not in updated:
+                    updated[name] = None
+                    changed = True
+                path = self._artifact_path(spec)
+                entry = self._entries.get(name)
+                try:
+                    stat = path.stat()
+                except OSError:
+                    if entry is None or entry['status'] != 'missing':
+                        if updated.get(name) is not None:
+                            print(f"Warning: Model file {path} disappeared, unloading {name}", file=sys.stderr)
+                        self._entries[name] = {'path': str(path), 'status': 'missing',
+                                               'error': f"{path} does not exist"}
+                        updated[name] = None
+                        changed = True
+                    continue
+                if (force or entry is None or entry.get('spec') != spec
+                        or entry.get('mtime_ns') != stat.st_mtime_ns or entry.get('file_bytes') != stat.st_size):
+                    pending.append((name, spec, path, stat))
+
+            # Hashing dominates for large artifacts and releases the GIL
+            if pending:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                    verified = list(pool.map(lambda args: self._verify(*args), pending))
+                for (name, spec, path, stat), (sha256, error) in zip(pending, verified):
+                    if self._load(name, spec, path, stat, sha256, error, updated, force):
+                        changed = True
+
+            if changed:
+                # Column layouts are compiled once per published model set
+                updated['schema'] = compile_schema(updated)
+                updated['version'] = self._version(updated)
+            importances_path = self.manifest_path.parent / IMPORTANCES_NAME
+            try:
+                importances_mtime = importances_path.stat().st_mtime_ns
+            except OSError:
+                importances_mtime = None
+            if changed or importances_mtime != self._importances_mtime:
+                updated['importances'] = compile_importances(
+                    updated, updated['schema'], read_stored(importances_path, updated['version']))
+                self._importances_mtime = importances_mtime
+                self._models = updated
+            self._last_check = time.monotonic()
+
+            self._failure = None
+            if self.strict:
+                failed = [self._entries.get(name, {}).get('error', f"{name}: not loaded")
+                          for name, spec in specs.items()
+                          if spec.get('required', True) and updated.get(name) is None]
+                if failed:
+                    self._failure = "required model artifacts are unavailable:\n  " + "\n  ".join(failed)
+                    raise ManifestError(self._failure)
+            return self._models
+
+    def _verify(self, name, spec, path, stat):
+        """Hash the file and check it against the manifest; returns ``(sha256, error)``"""
+        try:
+            sha256 = file_sha256(path)
+        except OSError as e:
+            return None, ManifestError(f"{name}: cannot read {path}: {e}")
+        try:
+            verify_file(name, path, spec, stat.st_size, sha256)
+        except ManifestError as e:
+            return sha256, e
+        return sha256, None
+
+    def _load(self, name, spec, path, stat, sha256, error, updated, force):
+        entry = self._entries.get(name)
+        if (error is None and not force and entry is not None and entry['status'] == 'loaded'
+                and entry.get('sha256') == sha256 and entry.get('spec') == spec):
+            # Touched but identical: remember the new mtime and keep the loaded object
+            entry['mtime_ns'] = stat.st_mtime_ns
+            return False
+
+        if error is None:
+            rss_before = _resident_bytes()
+            start = time.perf_counter()
+            try:
+                model = load_artifact(name, path, spec)
+                if self.flat_forests and is_forest_regressor(model):
+                    # Checked against scikit-learn first; on a mismatch the original is kept
+                    model = flatten_forest(name, model) or model
+            except ManifestError as e:
+                error = e
+            load_seconds = time.perf_counter() - start
+            rss_after = _resident_bytes()
+
+        if error is not None:
+            print(f"Warning: {error}", file=sys.stderr)
+            self._entries[name] = {
+                'path': str(path),
+                'status': 'error',
+                'error': str(error),
+                'spec': spec,
+                'mtime_ns': stat.st_mtime_ns,
+                'file_bytes': stat.st_size,
+                'sha256': sha256,
+                # The last good version (if any) stays in the snapshot
+                'serving_sha256': entry.get('serving_sha256') if entry else None,
+            }
+            return False
+
+        updated[name] = model
+        self._entries[name] = {
+            'path': str(path),
+            'status': 'loaded',
+            'spec': spec,
+            'mtime_ns': stat.st_mtime_ns,
+            'file_bytes': stat.st_size,
+            'sha256': sha256,
+            'serving_sha256': sha256,
+            'load_seconds': load_seconds,
+            'resident_bytes': (rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+            'loaded_at': time.time(),
+        }
+        return True
+
+    def _version(self, models):
+        """Short content hash identifying the loaded model set"""
+        digest = hashlib.sha256()
+        for name in sorted(self._entries):
+            serving = self._entries[name].get('serving_sha256') if models.get(name) is not None else None
+            digest.update(f"{name}:{serving};".encode())
+        return digest.hexdigest()[:16]
+
+    def stats(self):
+        """Per-model load status, load time and resident size"""
+        with self._lock:
+            return {
+                name: {key: value for key, value in entry.items() if key != 'spec'}
+                for name, entry in self._entries.items()
+            }
+
+    def status(self):
+        """Version of the model set being served"""
+        return {'serving': self._models.get('version')}
+
+
+def read_current(models_dir):
+    """Name of the version directory ``models_dir/CURRENT`` points at"""
+    path = Path(models_dir) / CURRENT_NAME
+    try:
+        version = path.read_text().strip()
+    except OSError as e:
+        raise ManifestError(f"cannot read model version pointer {path}: {e}") from e
+    if not version:
+        raise ManifestError(f"model version pointer {path} is empty")
+    return version
+
+
+def set_current(models_dir, version):
+    """Atomically point ``models_dir/CURRENT`` at the version directory ``version``"""
+    models_dir = Path(models_dir)
+    if not (models_dir / version / MANIFEST_NAME).exists():
+        raise ManifestError(f"{models_dir / version} is not a model version directory")
+    tmp = models_dir / f"{CURRENT_NAME}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(version + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, models_dir / CURRENT_NAME)
+
+
+def smoke_test(models, reference=None):
+    """Raise ManifestError unless ``models`` scores the canned candles sensibly
+
+    Every prediction must be finite and the stacked one within a factor of two
+    of the close; with a ``reference`` model set (the version being replaced)
+    the stacked predictions may not move by more than MAX_SMOKE_DIVERGENCE of
+    the close.
+    """
+    import pandas as pd
+    from model.predict import engineer_features_batch, make_predictions_batch
+
+    features = engineer_features_batch(pd.DataFrame(SMOKE_CANDLES))
+    close = features['Close']
+    try:
+        predictions = make_predictions_batch(models, features)
+    except Exception as e:
+        raise ManifestError(f"smoke test: scoring failed: {e}") from e
+    for name, values in predictions.items():
+        if not np.all(np.isfinite(values)):
+            raise ManifestError(f"smoke test: {name} predicted non-finite values")
+    ratio = predictions['meta_model'] / close
+    if np.any(ratio < 0.5) or np.any(ratio > 2.0):
+        raise ManifestError(f"smoke test: stacked predictions are {ratio.min():.2f}-{ratio.max():.2f}x the close")
+    if reference is not None:
+        divergence = float(np.max(np.abs(predictions['meta_model'] - make_predictions_batch(reference, features)
+                                          ['meta_model']) / close))
+        if divergence > MAX_SMOKE_DIVERGENCE:
+            raise ManifestError(f"smoke test: predictions moved {divergence:.1%} of the close from the serving version")
+
+
+class VersionedRegistry:
+    """Serves the model version a ``CURRENT`` pointer names, swapping versions without downtime
+
+    ``models_dir`` holds immutable version directories (each with its own
+    manifest, e.g. written by model/train.py) and a ``CURRENT`` file naming
+    the one to serve; set_current() rewrites it atomically. When the pointer
+    changes, the new version is loaded and verified on a background thread
+    while requests keep getting the old one. It is swapped in by replacing a
+    single reference, and only after it passes smoke_test(). Requests already
+    holding the old snapshot finish on it. A version that fails to load or
+    fails the smoke test is reported and not retried until the pointer is
+    written again.
+    """
+
+    def __init__(self, models_dir, check_interval=2.0, strict=None, flat_forests=None):
+        self.models_dir = Path(models_dir)
+        self.check_interval = check_interval
+        self.strict = (not _allow_fallback()) if strict is None else strict
+        self.flat_forests = flat_forests
+        self._lock = threading.Lock()
+        self._active = None
+        self._active_version = None
+        self._loading = None
+        self._failed = {}
+        self._pointer_mtime = None
+        self._last_check = None
+        self._swapped_at = None
+
+    @property
+    def manifest_path(self):
+        active = self._active
+        if active is not None:
+            return active.manifest_path
+        return self.models_dir / read_current(self.models_dir) / MANIFEST_NAME
+
+    def _registry_for(self, version, strict=True):
+        return ModelRegistry(self.models_dir / version, check_interval=self.check_interval, strict=strict,
+                             flat_forests=self.flat_forests)
+
+    def models(self):
+        """Snapshot of the serving version, checking the pointer once per check interval"""
+        last_check = self._last_check
+        if last_check is None or time.monotonic() - last_check >= self.check_interval:
+            self.refresh()
+        return self._active.models()
+
+    def refresh(self, force=False):
+        """Start loading the version ``CURRENT`` names if it is not the one being served"""
+        with self._lock:
+            self._last_check = time.monotonic()
+            try:
+                mtime = (self.models_dir / CURRENT_NAME).stat().st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime != self._pointer_mtime:
+                # A rewritten pointer gives failed versions another chance
+                self._failed.clear()
+                self._pointer_mtime = mtime
+            target = read_current(self.models_dir)
+            if self._active is None:
+                # Nothing to serve yet, so the first version loads on this thread
+                registry = self._registry_for(target, strict=self.strict)
+                models = registry.refresh()
+                if self.strict:
+                    smoke_test(models)
+                self._active, self._active_version = registry, target
+                self._swapped_at = time.time()
+            elif target not in (self._active_version, self._loading) and target not in self._failed:
+                self._loading = target
+                threading.Thread(target=self._load_in_background, args=(target,),
+                                 name=f"load-{target}", daemon=True).start()
+            active = self._active
+        return active.refresh(force=True) if force else active.models()
+
+    def _load_in_background(self, version):
+        try:
+            registry = self._registry_for(version)
+            smoke_test(registry.refresh(), reference=self._active.models())
+        except Exception as e:
+            print(f"Warning: model version {version} was not swapped in: {e}", file=sys.stderr)
+            with self._lock:
+                self._failed[version] = str(e)
+                self._loading = None
+            return
+        with self._lock:
+            self._active, self._active_version = registry, version
+            self._loading = None
+            self._swapped_at = time.time()
+        print(f"Serving model version {version}", file=sys.stderr)
+
+    def wait_until_loaded(self, timeout=None):
+        """Block until no version is loading in the background; True if none is"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._loading is not None:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stats(self):
+        return self._active.stats() if self._active is not None else {}
+
+    def status(self):
+        """Which version is served, which is loading, and which were rejected"""
+        with self._lock:
+            return {
+                'serving': self._active_version,
+                'serving_since': self._swapped_at,
+                'loading': self._loading,
+                'failed': dict(self._failed),
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def make_registry(models_dir):
+    """A VersionedRegistry when ``models_dir`` has a CURRENT pointer, else a ModelRegistry"""
+    models_dir = Path(models_dir)
+    if (models_dir / CURRENT_NAME).exists():
+        return VersionedRegistry(models_dir)
+    return ModelRegistry(models_dir)
+
+
+def get_registry():
+    """Return the process-wide model registry, creating it on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                # Worker processes inherit the environment, so they load the same set
+                _registry = make_registry(os.environ.get('PREDICTOR_MODELS_DIR') or MODELS_DIR)
+    return _registry
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List model versions or change the one being served")
+    parser.add_argument('models_dir', help="directory of model version directories")
+    parser.add_argument('--promote', metavar='VERSION', help="point CURRENT at this version")
+    args = parser.parse_args(argv)
+
+    models_dir = Path(args.models_dir)
+    if args.promote:
+        try:
+            smoke_test(ModelRegistry(models_dir / args.promote, flat_forests=False).refresh())
+            set_current(models_dir, args.promote)
+        except ManifestError as e:
+            parser.error(str(e))
+    try:
+        current = read_current(models_dir)
+    except ManifestError:
+        current = None
+    for directory in sorted(path for path in models_dir.iterdir() if (path / MANIFEST_NAME).exists()):
+        print(f"{'*' if directory.name == current else ' '} {directory.name}")
+
+
+if __name__ == '__main__':
+    main()
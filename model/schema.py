@@ -0,0 +1,162 @@
+"""Compiled feature layout shared by every estimator in the ensemble"""
+import sys
+import threading
+import warnings
+
+import numpy as np
+
+from model.linear import compile_linear
+from model.text_features import has_text_stage, text_feature_names
+
+# Column order produced by engineer_features(); estimators fitted on plain
+# arrays (no feature_names_in_) were trained on exactly this order.
+FEATURE_NAMES = (
+    'Open', 'High', 'Low', 'Close', 'Volume',
+    'Price_Change', 'Range', 'Range_Pct', 'Volume_Price_Ratio',
+    'Sentiment', 'Sentiment_Strength', 'Sentiment_Direction', 'Sentiment_Volatility_Interaction',
+    'Close_Lag_1', 'Open_Lag_1', 'Volume_Lag_1', 'Sentiment_Lag_1',
+    'Close_Lag_2', 'Open_Lag_2', 'Volume_Lag_2', 'Sentiment_Lag_2',
+    'Close_Lag_3', 'Open_Lag_3', 'Volume_Lag_3', 'Sentiment_Lag_3',
+    'Price_Momentum', 'Volatility', 'High_Low_Ratio',
+)
+
+# Base estimators that consume the feature matrix, in ensemble order
+BASE_MODELS = ('random_forest', 'ridge', 'xgboost')
+
+# Estimators fitted on DataFrames warn when given the schema's plain arrays;
+# the schema has already put the columns in the order they were fitted on.
+# Set here so every process that scores (including spawned workers) has it.
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+
+class SchemaError(ValueError):
+    """An estimator expects features that the schema cannot provide in order"""
+
+
+class EstimatorLayout:
+    """Column selection (and optional standardisation) for one estimator's input"""
+
+    def __init__(self, columns, width, mean=None, scale=None, transformer=None):
+        self.columns = np.asarray(columns, dtype=np.intp)
+        # Skip the gather entirely when the estimator already matches schema order
+        self.identity = len(self.columns) == width and bool(np.all(self.columns == np.arange(width)))
+        self.mean = mean
+        self.scale = scale
+        self.transformer = transformer
+
+    def take(self, X):
+        """Return ``X`` (rows in schema order) reordered and scaled for this estimator"""
+        X_model = X if self.identity else X[:, self.columns]
+        if self.mean is not None:
+            X_model = (X_model - self.mean) / self.scale
+        elif self.transformer is not None:
+            X_model = self.transformer.transform(X_model)
+        return X_model
+
+
+class FeatureSchema:
+    """Maps feature names to fixed column indices of a float64 feature matrix
+
+    Built once per model load. ``fill()`` writes an engineered feature dict into a
+    preallocated row and ``layouts`` gives every base estimator the column order
+    it was fitted on, so no per-call DataFrame or reindexing is needed.
+    """
+
+    def __init__(self, names=FEATURE_NAMES, unnamed_orders=(FEATURE_NAMES,)):
+        self.names = tuple(names)
+        # Column orders an estimator without feature_names_in_ may have been fitted on
+        self.unnamed_orders = tuple(tuple(order) for order in unnamed_orders)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.width = len(self.names)
+        self.layouts = {}
+        # Closed-form Ridge / meta model (model/linear.py), None when neither is linear
+        self.linear = None
+        self._local = threading.local()
+
+    def fill(self, features):
+        """Write one engineered feature dict into this thread's preallocated (1, width) row"""
+        row = getattr(self._local, 'row', None)
+        if row is None:
+            row = self._local.row = np.zeros((1, self.width), dtype=np.float64)
+        values = row[0]
+        get = features.get
+        for i, name in enumerate(self.names):
+            values[i] = get(name, 0.0)
+        return row
+
+    def fill_batch(self, columns, n_rows):
+        """Stack a dict of feature columns into an (n_rows, width) matrix in schema order"""
+        X = np.zeros((n_rows, self.width), dtype=np.float64)
+        for name, column in columns.items():
+            i = self.index.get(name)
+            if i is not None:
+                X[:, i] = column
+        return X
+
+    def layout_for(self, name, estimator, scaler=None):
+        """Validate ``estimator``'s expected input and compile its column layout"""
+        expected = getattr(estimator, 'feature_names_in_', None)
+        if expected is not None:
+            columns = [self.index[feature] for feature in expected]
+        else:
+            n_features = getattr(estimator, 'n_features_in_', len(self.unnamed_orders[0]))
+            for order in self.unnamed_orders:
+                if len(order) == n_features:
+                    columns = [self.index[feature] for feature in order]
+                    break
+            else:
+                widths = ', '.join(str(len(order)) for order in self.unnamed_orders)
+                raise SchemaError(f"{name} expects {n_features} unnamed features but the schema provides {widths}")
+
+        mean = scale = transformer = None
+        if scaler is not None:
+            n_scaled = getattr(scaler, 'n_features_in_', len(columns))
+            if n_scaled != len(columns):
+                raise SchemaError(f"scaler expects {n_scaled} features but {name} takes {len(columns)}")
+            if hasattr(scaler, 'mean_') and hasattr(scaler, 'scale_'):
+                mean = np.asarray(scaler.mean_, dtype=np.float64)
+                scale = np.asarray(scaler.scale_, dtype=np.float64)
+            else:
+                transformer = scaler
+
+        return EstimatorLayout(columns, self.width, mean=mean, scale=scale, transformer=transformer)
+
+
+def compile_schema(models):
+    """Build the feature schema and per-estimator layouts for a loaded model set"""
+    names = list(FEATURE_NAMES)
+    for name in BASE_MODELS:
+        for feature in getattr(models.get(name), 'feature_names_in_', ()):
+            if feature not in names:
+                # Features the estimator knows but engineer_features() never produces stay zero
+                names.append(feature)
+
+    unnamed_orders = [FEATURE_NAMES]
+    if has_text_stage(models):
+        # Estimators fitted on plain arrays that include the headline embedding
+        # expect it appended after the engineered features
+        text_names = tuple(text_feature_names(models))
+        names.extend(name for name in text_names if name not in names)
+        unnamed_orders.append(FEATURE_NAMES + text_names)
+
+    schema = FeatureSchema(names, unnamed_orders)
+    for name in BASE_MODELS:
+        estimator = models.get(name)
+        if estimator is None:
+            continue
+        # The scaler was fitted on the Random Forest's input columns
+        scaler = models.get('scaler') if name == 'random_forest' else None
+        try:
+            schema.layouts[name] = schema.layout_for(name, estimator, scaler)
+        except SchemaError as e:
+            print(f"Warning: {e}; {name} will not be used", file=sys.stderr)
+    schema.linear = compile_linear(models, schema)
+    return schema
+
+
+def schema_for(models):
+    """Return the schema compiled at load time, compiling one for ad-hoc model dicts"""
+    schema = models.get('schema')
+    if schema is None:
+        schema = compile_schema(models)
+    return schema
@@ -0,0 +1,129 @@
+"""Keyword sentiment scoring for news headlines
+
+Headlines are tokenized once and matched against precompiled frozenset
+lexicons, so scoring is a single pass over the text and words only match
+whole tokens ('up' no longer matches inside 'support').
+"""
+import re
+import zlib
+
+import numpy as np
+
+POSITIVE_WORDS = frozenset([
+    'bull', 'bullish', 'rise', 'rising', 'increase', 'up', 'gain', 'gains',
+    'growth', 'positive', 'surge', 'rally', 'boom', 'breakthrough', 'adoption',
+    'institutional', 'investment', 'buy', 'buying', 'support', 'strong',
+    'record', 'high', 'milestone', 'success', 'approve', 'approved'
+])
+
+NEGATIVE_WORDS = frozenset([
+    'bear', 'bearish', 'fall', 'falling', 'decrease', 'down', 'drop', 'crash',
+    'decline', 'negative', 'sell', 'selling', 'dump', 'fear', 'uncertainty',
+    'regulation', 'ban', 'banned', 'hack', 'hacked', 'scam', 'fraud',
+    'low', 'bottom', 'concern', 'warning', 'risk', 'volatile', 'bubble'
+])
+
+# Crypto-specific keywords
+CRYPTO_POSITIVE = frozenset(['bitcoin', 'btc', 'cryptocurrency', 'blockchain', 'etf', 'halving'])
+CRYPTO_NEGATIVE = frozenset(['regulation', 'tax', 'government', 'central bank'])
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# First words of multi-word terms; bigrams are only built when one is present
+_PHRASE_HEADS = frozenset(
+    term.split()[0]
+    for lexicon in (POSITIVE_WORDS, NEGATIVE_WORDS, CRYPTO_POSITIVE, CRYPTO_NEGATIVE)
+    for term in lexicon if ' ' in term
+)
+
+
+def tokenize(headline):
+    """Lower-cased word tokens of a headline"""
+    return _TOKEN.findall(headline.lower())
+
+
+def match_terms(headline):
+    """Set of tokens (and two-word phrases) in ``headline`` that any lexicon may match"""
+    tokens = tokenize(headline)
+    terms = set(tokens)
+    if not terms.isdisjoint(_PHRASE_HEADS):
+        terms.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return terms
+
+
+def _score_terms(terms, headline, market_data, deterministic):
+    score = 0
+
+    positive_count = len(terms & POSITIVE_WORDS)
+    negative_count = len(terms & NEGATIVE_WORDS)
+
+    word_sentiment = (positive_count - negative_count) * 0.2
+    score += word_sentiment
+
+    if market_data is not None:
+        # Market momentum analysis
+        price_range = market_data['high_price'] - market_data['low_price']
+        relative_range = price_range / market_data['open_price'] if market_data['open_price'] > 0 else 0
+
+        if relative_range > 0.05:
+            score += -0.1 if 'volatile' in terms else 0.05
+
+        # Volume analysis
+        volume_factor = min(market_data['volume'] / 10000, 0.1)
+        if positive_count > negative_count:
+            score += volume_factor
+        elif negative_count > positive_count:
+            score -= volume_factor
+
+    if positive_count > 0:
+        score += 0.1 * len(terms & CRYPTO_POSITIVE)
+    score -= 0.15 * len(terms & CRYPTO_NEGATIVE)
+
+    # Normalize to [-1, 1]
+    score = max(min(score, 1), -1)
+
+    # Add randomization for non-perfect scores
+    if abs(score) == 1.0:
+        if deterministic:
+            # Uniform draw in [0, 1) derived from the headline itself
+            draw = zlib.crc32(headline.encode()) / 2**32
+        else:
+            draw = np.random.random()
+        randomFactor = 0.85 + draw * 0.14
+        score *= randomFactor
+
+    return round(score, 2)
+
+
+def calculate_sentiment_score(news_headline, market_data, deterministic=True):
+    """Calculate sentiment score based on news headline and market data
+
+    In deterministic mode the jitter applied to saturated scores is seeded from the
+    headline, so the same inputs always give the same score (and can be cached).
+    """
+    if not news_headline or news_headline.strip() == "":
+        return 0.0
+
+    headline = news_headline.lower()
+    return _score_terms(match_terms(headline), headline, market_data, deterministic)
+
+
+def score_headlines(headlines, market_data=None, deterministic=True):
+    """Score many headlines at once
+
+    ``market_data`` may be None (lexicon-only scores), one dict shared by every
+    headline, or a sequence with one dict per headline.
+    """
+    if market_data is None or isinstance(market_data, dict):
+        market_data = [market_data] * len(headlines)
+    elif len(market_data) != len(headlines):
+        raise ValueError(f"got {len(market_data)} market_data entries for {len(headlines)} headlines")
+
+    scores = []
+    for news_headline, market in zip(headlines, market_data):
+        if not news_headline or not news_headline.strip():
+            scores.append(0.0)
+            continue
+        headline = news_headline.lower()
+        scores.append(_score_terms(match_terms(headline), headline, market, deterministic))
+    return scores
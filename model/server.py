@@ -0,0 +1,234 @@
+"""Long-running prediction server that keeps the models warm between requests
+
+Three transports share the same request handling:
+
+- ``stdio``: one JSON object per line on stdin, one JSON result per line on stdout
+- ``socket``: the same newline-delimited JSON over a TCP or Unix domain socket
+- ``http``: ``POST /predict`` with a JSON body, ``GET /health``, and
+  ``GET /metrics`` (per-stage latency histograms, cache and model load stats
+  in Prometheus text format; tracing is switched on while serving)
+
+Socket and HTTP connections are pipelined: a client may send several requests
+without waiting, they are scored concurrently and the responses are written
+back in request order. Each candle's lag features are taken from the shared
+history, and the candle recorded, on the event loop as its request is read,
+so consecutive candles get their lags in arrival order.
+
+The lag history is shared by every connection and keyed by ``symbol`` only:
+candles recorded by one client are the lags of the next client's candle for
+that symbol. Feed each symbol from one source, and have other clients (e.g.
+what-if queries) send ``"record": false``.
+"""
+import asyncio
+import json
+import sys
+from functools import partial
+from http import HTTPStatus
+
+from model.history import DEFAULT_SYMBOL, CandleHistory
+from model import tracing
+from model.predict import error_response, load_models, predict_one, result_cache
+from model.registry import get_registry
+from model.shadow import get_shadow
+
+# Requests that may be in flight on one connection before reading pauses
+MAX_PIPELINE = 64
+MAX_BODY_BYTES = 1 << 20
+
+
+def handle_request(raw, history=None):
+    """Score one JSON request and return ``(ok, encoded JSON result)``"""
+    with tracing.trace('request'):
+        try:
+            result = predict_one(json.loads(raw), history=history)
+        except Exception as e:
+            result = error_response(e)
+        return result.get('status') == 'success', json.dumps(result).encode()
+
+
+# Lag history shared by every connection; replaced in run() when persisted to disk
+_history = CandleHistory()
+
+
+def _claim_lags(raw):
+    """Take a request's lags from the shared history now, before it is scored concurrently"""
+    try:
+        data = json.loads(raw)
+        return _history.claim(data.get('symbol', DEFAULT_SYMBOL), data, data.get('record', True))
+    except Exception:
+        # Malformed requests are reported when handle_request() parses them
+        return None
+
+
+def _ndjson_response(line, history):
+    return handle_request(line, history)[1] + b'\n'
+
+
+def _http_response(status, body, keep_alive, content_type='application/json', head_only=False):
+    """Encode a response; ``head_only`` (for HEAD requests) sends the headers without the body"""
+    status = HTTPStatus(status)
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode('latin-1') + (b'' if head_only else body)
+
+
+def _http_predict(body, keep_alive, history):
+    ok, payload = handle_request(body, history)
+    return _http_response(200 if ok else 400, payload, keep_alive)
+
+
+def _http_health(keep_alive, head_only=False):
+    health = {'status': 'ok', 'cache': result_cache.stats(), 'models': get_registry().status()}
+    shadow = get_shadow()
+    if shadow is not None:
+        health['shadow'] = shadow.stats()
+    body = json.dumps(health).encode()
+    return _http_response(200, body, keep_alive, head_only=head_only)
+
+
+def _http_metrics(keep_alive, head_only=False):
+    body = tracing.prometheus_text(result_cache.stats(), get_registry().stats()).encode()
+    return _http_response(200, body, keep_alive, content_type='text/plain; version=0.0.4', head_only=head_only)
+
+
+def _http_error(status, message):
+    return _http_response(status, json.dumps({'status': 'error', 'error': message}).encode(), False)
+
+
+async def _read_ndjson_request(reader):
+    """Read one line; returns ``(job, keep_alive)`` or None at end of stream"""
+    while True:
+        line = await reader.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if line:
+            return partial(_ndjson_response, line, _claim_lags(line)), True
+
+
+async def _read_http_request(reader):
+    """Parse one HTTP/1.1 request; returns ``(job, keep_alive)`` or None at end of stream"""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError as e:
+        if e.partial.strip():
+            return partial(_http_error, 400, "incomplete request"), False
+        return None
+    except asyncio.LimitOverrunError:
+        return partial(_http_error, 431, "request header too large"), False
+
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ', 2)
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        return partial(_http_error, 400, "malformed request"), False
+
+    if length > MAX_BODY_BYTES:
+        return partial(_http_error, 413, "request body too large"), False
+    body = await reader.readexactly(length) if length else b''
+
+    connection = headers.get('connection', '').lower()
+    keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+    path = target.split('?', 1)[0]
+
+    if path == '/predict':
+        if method != 'POST':
+            return partial(_http_error, 405, "use POST /predict"), False
+        return partial(_http_predict, body, keep_alive, _claim_lags(body)), keep_alive
+    if path == '/health' and method in ('GET', 'HEAD'):
+        return partial(_http_health, keep_alive, method == 'HEAD'), keep_alive
+    if path == '/metrics' and method in ('GET', 'HEAD'):
+        return partial(_http_metrics, keep_alive, method == 'HEAD'), keep_alive
+    return partial(_http_error, 404, f"no route for {method} {path}"), False
+
+
+async def _write_in_order(queue, writer):
+    while True:
+        pending = await queue.get()
+        if pending is None:
+            return
+        writer.write(await pending)
+        await writer.drain()
+
+
+async def _serve_connection(read_request, reader, writer):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(MAX_PIPELINE)
+    responder = asyncio.create_task(_write_in_order(queue, writer))
+    try:
+        while not responder.done():
+            request = await read_request(reader)
+            if request is None:
+                break
+            job, keep_alive = request
+            await queue.put(loop.run_in_executor(None, job))
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        if not responder.done():
+            await queue.put(None)
+        try:
+            await responder
+        except ConnectionError:
+            pass
+        writer.close()
+
+
+async def _serve(mode, host, port, unix_socket):
+    read_request = _read_http_request if mode == 'http' else _read_ndjson_request
+    handler = partial(_serve_connection, read_request)
+    if unix_socket:
+        server = await asyncio.start_unix_server(handler, path=unix_socket)
+        where = unix_socket
+    else:
+        server = await asyncio.start_server(handler, host, port)
+        where = f"{host}:{port}"
+    print(f"Serving predictions ({mode}) on {where}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def serve_stdio(stdin=None, stdout=None):
+    """Answer newline-delimited JSON requests from stdin until it is closed"""
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        stdout.write(handle_request(line, _history)[1].decode() + '\n')
+        stdout.flush()
+
+
+def run(mode, host='127.0.0.1', port=8765, unix_socket=None, history_dir=None):
+    """Warm the models and serve requests until interrupted
+
+    Every scored candle is recorded in a per-symbol lag history; with
+    ``history_dir`` that history is memory-mapped and survives restarts.
+    """
+    global _history
+    tracing.enable()
+    if history_dir is not None:
+        _history = CandleHistory(directory=history_dir)
+    load_models()
+    try:
+        if mode == 'stdio':
+            serve_stdio()
+        else:
+            asyncio.run(_serve(mode, host, port, unix_socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        _history.flush()
@@ -0,0 +1,229 @@
+"""Shadow evaluation of a candidate model set on live traffic
+
+    PREDICTOR_SHADOW_DIR=model/versions/v20240601T000000Z streamlit run streamlit_app.py
+    python -m model.shadow shadow.jsonl
+
+With ``PREDICTOR_SHADOW_DIR`` set (a model directory, or a versions directory
+with a ``CURRENT`` pointer) predict_one() hands the features it engineered for
+each request to a background worker after scoring it with the production
+models. The worker scores the same features with the candidate and records
+how far each model's prediction moved and how long each side's
+make_predictions() took. Production answers served from the result cache
+are compared but left out of the latency figures (``production_cached``). The
+response always comes from production. Submitting is a non-blocking put on
+a bounded queue; when the worker falls behind, requests are dropped from the
+comparison rather than slowed down.
+
+``PREDICTOR_SHADOW_SAMPLE`` (0-1, default 1) is the fraction of requests
+compared. With ``PREDICTOR_SHADOW_LOG`` every comparison is appended to that
+file as one JSON line, which ``python -m model.shadow LOG`` summarises per
+(production, candidate) version pair. Running totals are in ``stats()`` and
+the server's ``GET /health``.
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+from model.registry import make_registry
+from model.tracing import QUANTILES, Histogram
+
+QUEUE_SIZE = 1024
+
+_shadow = None
+_shadow_lock = threading.Lock()
+
+
+class ShadowEvaluator:
+    """Scores requests with a candidate model set on a background thread"""
+
+    def __init__(self, models_dir, log_path=None, sample=1.0, queue_size=QUEUE_SIZE):
+        self.registry = make_registry(models_dir)
+        self.log_path = log_path
+        self.sample = sample
+        self.production_latency = Histogram()
+        self.candidate_latency = Histogram()
+        self.compared = 0
+        self.production_cached = 0
+        self.dropped = 0
+        self.errors = 0
+        self._abs_difference = {}
+        self._max_abs_difference = 0.0
+        self._queue = queue.Queue(queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, features, headline, production, production_seconds, production_version):
+        """Queue one production-scored request for the candidate; never blocks
+
+        ``features`` are the numeric features from engineer_features(); the
+        candidate adds its own text features from ``headline``.
+        ``production_seconds`` is None when production hit the result cache.
+        """
+        if self.sample < 1.0 and random.random() >= self.sample:
+            return
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='shadow', daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait((time.time(), features, headline, production, production_seconds,
+                                    production_version))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self._compare(*item)
+            except Exception as e:
+                self.errors += 1
+                if self.errors == 1:
+                    print(f"Warning: shadow scoring failed: {e}", file=sys.stderr)
+            finally:
+                self._queue.task_done()
+
+    def _compare(self, submitted_at, features, headline, production, production_seconds, production_version):
+        from model.predict import make_predictions
+        from model.text_features import text_features
+
+        models = self.registry.models()
+        if headline:
+            features = dict(features, **text_features(models, headline))
+        start = time.perf_counter()
+        candidate = make_predictions(models, features)
+        candidate_seconds = time.perf_counter() - start
+
+        difference = {name: candidate[name] - production[name] for name in candidate if name in production}
+        if production_seconds is not None:
+            self.production_latency.observe(production_seconds)
+        self.candidate_latency.observe(candidate_seconds)
+        with self._lock:
+            self.compared += 1
+            self.production_cached += production_seconds is None
+            for name, value in difference.items():
+                self._abs_difference[name] = self._abs_difference.get(name, 0.0) + abs(value)
+            self._max_abs_difference = max(self._max_abs_difference, abs(difference.get('meta_model', 0.0)))
+        if self.log_path:
+            record = {
+                'time': submitted_at,
+                'production_version': production_version,
+                'candidate_version': models.get('version'),
+                'close': features.get('Close'),
+                'production': production,
+                'candidate': candidate,
+                'difference': difference,
+                'production_cached': production_seconds is None,
+                'production_ms': None if production_seconds is None else production_seconds * 1000,
+                'candidate_ms': candidate_seconds * 1000,
+            }
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def drain(self):
+        """Block until every queued request has been compared"""
+        self._queue.join()
+
+    def stats(self):
+        """Comparisons so far: mean absolute prediction differences and latency quantiles"""
+        with self._lock:
+            compared = self.compared
+            mean_abs = {name: total / compared for name, total in self._abs_difference.items()} if compared else {}
+            max_abs = self._max_abs_difference
+        latency = {}
+        for side, hist in (('production', self.production_latency), ('candidate', self.candidate_latency)):
+            for q in QUANTILES:
+                value = hist.quantile(q)
+                latency[f'{side}_p{round(q * 100)}_ms'] = None if value is None else value * 1000
+        return {
+            'candidate_dir': str(self.registry.manifest_path.parent),
+            'compared': compared,
+            'production_cached': self.production_cached,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'queued': self._queue.qsize(),
+            'mean_abs_difference': mean_abs,
+            'max_abs_difference': max_abs,
+            'latency': latency,
+        }
+
+
+def get_shadow():
+    """The process-wide shadow evaluator, or None unless PREDICTOR_SHADOW_DIR is set"""
+    global _shadow
+    if _shadow is None:
+        models_dir = os.environ.get('PREDICTOR_SHADOW_DIR')
+        if not models_dir:
+            return None
+        with _shadow_lock:
+            if _shadow is None:
+                _shadow = ShadowEvaluator(models_dir, log_path=os.environ.get('PREDICTOR_SHADOW_LOG'),
+                                          sample=float(os.environ.get('PREDICTOR_SHADOW_SAMPLE', '1')))
+    return _shadow
+
+
+def summarise(path):
+    """``{(production, candidate): summary}`` of a shadow log"""
+    import numpy as np
+
+    groups = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            groups.setdefault((record['production_version'], record['candidate_version']), []).append(record)
+    summaries = {}
+    for key, records in groups.items():
+        difference = np.array([record['difference']['meta_model'] for record in records])
+        close = np.array([record['close'] for record in records], dtype=np.float64)
+        production_ms = np.array([record['production_ms'] for record in records
+                                  if record.get('production_ms') is not None])
+        candidate_ms = np.array([record['candidate_ms'] for record in records])
+        summaries[key] = {
+            'requests': len(records),
+            'production_cached': len(records) - len(production_ms),
+            'mean_difference': float(difference.mean()),
+            'mean_abs_difference': float(np.abs(difference).mean()),
+            'max_abs_difference': float(np.abs(difference).max()),
+            'mean_abs_difference_pct': float(np.nanmean(np.abs(difference) / close) * 100),
+            'base_mean_abs_difference': {
+                name: float(np.mean([abs(record['difference'][name]) for record in records]))
+                for name in records[0]['difference'] if name != 'meta_model'
+            },
+            'production_ms': {f'p{round(q * 100)}': float(np.quantile(production_ms, q))
+                              for q in QUANTILES} if len(production_ms) else {},
+            'candidate_ms': {f'p{round(q * 100)}': float(np.quantile(candidate_ms, q)) for q in QUANTILES},
+        }
+    return summaries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise a shadow evaluation log")
+    parser.add_argument('log', help="JSON-lines file written via PREDICTOR_SHADOW_LOG")
+    args = parser.parse_args(argv)
+
+    summaries = summarise(args.log)
+    if not summaries:
+        print(f"{args.log}: no comparisons")
+    for (production, candidate), summary in summaries.items():
+        print(f"{production} -> {candidate}: {summary['requests']:,} requests "
+              f"({summary['production_cached']:,} answered from the production cache)")
+        print(f"  stacked prediction  mean {summary['mean_difference']:+.2f}  "
+              f"mean |diff| {summary['mean_abs_difference']:.2f} ({summary['mean_abs_difference_pct']:.3f}%)  "
+              f"max |diff| {summary['max_abs_difference']:.2f}")
+        for name, value in summary['base_mean_abs_difference'].items():
+            print(f"  {name:<20}mean |diff| {value:.2f}")
+        for side in ('production', 'candidate'):
+            quantiles = '  '.join(f"{label} {ms:.2f} ms" for label, ms in summary[f'{side}_ms'].items())
+            print(f"  {side + ' latency':<20}{quantiles}")
+
+
+if __name__ == '__main__':
+    main()
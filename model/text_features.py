@@ -0,0 +1,52 @@
+"""Headline embeddings from the shipped TF-IDF vectorizer and TruncatedSVD models"""
+import numpy as np
+
+# Embedding component i is exposed to the ensemble as f'{TEXT_FEATURE_PREFIX}{i}'
+TEXT_FEATURE_PREFIX = 'Text_SVD_'
+
+# Headlines transformed per TF-IDF -> SVD pass; bounds the sparse intermediate
+BATCH_SIZE = 8192
+
+
+def has_text_stage(models):
+    """True when both text artifacts are loaded"""
+    return models.get('tfidf_vectorizer') is not None and models.get('svd') is not None
+
+
+def text_feature_names(models):
+    """Names of the embedding features produced for this model set"""
+    return [f'{TEXT_FEATURE_PREFIX}{i}' for i in range(models['svd'].components_.shape[0])]
+
+
+def embed_headlines(models, headlines, batch_size=BATCH_SIZE):
+    """Embed headlines into an (n, n_components) float64 array
+
+    Each batch goes through the sparse TF-IDF matrix straight into
+    TruncatedSVD, which multiplies the sparse rows by its components, so only
+    the small dense output is ever materialised.
+    """
+    vectorizer = models['tfidf_vectorizer']
+    svd = models['svd']
+    # Missing headlines (None, or NaN from a CSV column) embed as empty text, not as 'nan'
+    headlines = [headline if isinstance(headline, str) else '' for headline in headlines]
+    out = np.empty((len(headlines), svd.components_.shape[0]), dtype=np.float64)
+    for start in range(0, len(headlines), batch_size):
+        batch = headlines[start:start + batch_size]
+        out[start:start + len(batch)] = svd.transform(vectorizer.transform(batch))
+    return out
+
+
+def text_features(models, headline):
+    """Embedding features of one headline, or an empty dict without the text stage"""
+    if not has_text_stage(models):
+        return {}
+    embedding = embed_headlines(models, [headline or ''])[0]
+    return {name: float(value) for name, value in zip(text_feature_names(models), embedding)}
+
+
+def text_feature_columns(models, headlines, batch_size=BATCH_SIZE):
+    """Embedding feature columns for a batch of headlines"""
+    if not has_text_stage(models):
+        return {}
+    embedding = embed_headlines(models, headlines, batch_size)
+    return {name: embedding[:, i] for i, name in enumerate(text_feature_names(models))}
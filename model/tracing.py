@@ -0,0 +1,174 @@
+"""Per-stage latency histograms for the prediction pipeline
+
+Wrap a stage in ``with trace('engineer_features'):`` or report a duration that
+was already measured with ``observe(stage, seconds)``. Tracing is off unless
+``PREDICTOR_TRACING=1`` or something calls ``enable()`` (the server does); when
+off, ``trace()`` returns a shared no-op context manager and ``observe()``
+returns immediately, so instrumented code pays one flag check per stage.
+
+Each stage keeps a fixed-bucket histogram (log-spaced, 10 µs to 10 s), from
+which p50/p95/p99 are interpolated and the Prometheus exposition is rendered.
+"""
+import bisect
+import contextlib
+import os
+import threading
+import time
+
+# Upper bounds in seconds: four buckets per decade from 10 µs to 10 s
+BUCKETS = tuple(round(10.0 ** (exponent / 4), 10) for exponent in range(-20, 5))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+_enabled = os.environ.get('PREDICTOR_TRACING', '').lower() in ('1', 'true', 'yes')
+_histograms = {}
+_histograms_lock = threading.Lock()
+_NO_TRACE = contextlib.nullcontext()
+
+
+class Histogram:
+    """Counts of observations per latency bucket, plus their sum"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def quantile(self, q):
+        """Estimate the ``q`` quantile by interpolating within its bucket"""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return None
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return BUCKETS[-1]
+
+
+class _Span:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        histogram(self.stage).observe(time.perf_counter() - self.start)
+        return False
+
+
+def enabled():
+    return _enabled
+
+
+def enable(on=True):
+    """Turn tracing on (or off) for the whole process"""
+    global _enabled
+    _enabled = on
+
+
+def histogram(stage):
+    hist = _histograms.get(stage)
+    if hist is None:
+        with _histograms_lock:
+            hist = _histograms.setdefault(stage, Histogram())
+    return hist
+
+
+def trace(stage):
+    """Context manager timing one run of ``stage``; a no-op while tracing is off"""
+    return _Span(stage) if _enabled else _NO_TRACE
+
+
+def observe(stage, seconds):
+    """Record an already-measured duration for ``stage``"""
+    if _enabled:
+        histogram(stage).observe(seconds)
+
+
+def reset():
+    with _histograms_lock:
+        _histograms.clear()
+
+
+def snapshot():
+    """``{stage: {'count', 'mean', 'p50', 'p95', 'p99'}}`` in seconds"""
+    with _histograms_lock:
+        stages = dict(_histograms)
+    out = {}
+    for stage, hist in sorted(stages.items()):
+        summary = {'count': hist.count, 'mean': hist.sum / hist.count if hist.count else None}
+        for q in QUANTILES:
+            summary[f'p{round(q * 100)}'] = hist.quantile(q)
+        out[stage] = summary
+    return out
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(cache_stats=None, model_stats=None):
+    """Stage histograms, cache counters and model load stats in Prometheus text format"""
+    lines = [
+        '# HELP predictor_stage_seconds Time spent in each prediction pipeline stage.',
+        '# TYPE predictor_stage_seconds histogram',
+    ]
+    with _histograms_lock:
+        stages = sorted(_histograms.items())
+    quantile_lines = []
+    for stage, hist in stages:
+        with hist._lock:
+            counts, count, total = list(hist.counts), hist.count, hist.sum
+        stage = _label(stage)
+        cumulative = 0
+        for bound, n in zip(BUCKETS, counts):
+            cumulative += n
+            lines.append(f'predictor_stage_seconds_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+        lines.append(f'predictor_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+        lines.append(f'predictor_stage_seconds_sum{{stage="{stage}"}} {total:.9g}')
+        lines.append(f'predictor_stage_seconds_count{{stage="{stage}"}} {count}')
+        for q in QUANTILES:
+            value = hist.quantile(q)
+            if value is not None:
+                quantile_lines.append(f'predictor_stage_seconds_quantile{{stage="{stage}",quantile="{q:g}"}} {value:.9g}')
+    if quantile_lines:
+        lines.append('# HELP predictor_stage_seconds_quantile Bucket-interpolated latency quantiles per stage.')
+        lines.append('# TYPE predictor_stage_seconds_quantile gauge')
+        lines.extend(quantile_lines)
+
+    if cache_stats is not None:
+        for key, kind in (('hits', 'counter'), ('misses', 'counter'), ('evictions', 'counter'), ('size', 'gauge')):
+            if key in cache_stats:
+                name = f'predictor_cache_{key}' + ('_total' if kind == 'counter' else '')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name} {cache_stats[key]}')
+
+    if model_stats:
+        for field, name in (('load_seconds', 'predictor_model_load_seconds'),
+                            ('resident_bytes', 'predictor_model_resident_bytes')):
+            lines.append(f'# TYPE {name} gauge')
+            for model, entry in sorted(model_stats.items()):
+                if entry.get(field) is not None:
+                    lines.append(f'{name}{{model="{_label(model)}"}} {entry[field]:.9g}')
+        lines.append('# TYPE predictor_model_loaded gauge')
+        for model, entry in sorted(model_stats.items()):
+            lines.append(f'predictor_model_loaded{{model="{_label(model)}"}} {int(entry.get("status") == "loaded")}')
+    return '\n'.join(lines) + '\n'
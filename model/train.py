@@ -0,0 +1,304 @@
+"""Train (or incrementally update) the ensemble from a feature store
+
+    python -m model.train --store features/                       # full training run
+    python -m model.train --store features/ --warm-start          # update the latest version
+    python -m model.train --store features/ --horizon 24h --out model/horizons/24h/versions
+    python -m model.train --store features/ --warm-start --promote    # ... and serve it
+
+The scaler, the three base learners and the stacking meta model are trained
+on a time range of the feature store (model/feature_store.py) to predict the
+close ``horizon`` ahead (the next candle by default). The base learners train
+concurrently: the Random Forest and XGBoost use every core and release the
+GIL while fitting. The last ``--meta-fraction`` of the range is held out, and
+the meta model is fitted on the base learners' predictions for it, so it
+learns how far to trust each one on unseen candles.
+
+With ``--warm-start`` only candles after the previous version's training data
+are used. The forest grows ``--new-trees`` trees on them, XGBoost adds
+``--new-rounds`` boosting rounds, and the previous scaler is kept because the
+existing trees depend on it. Ridge has a closed form, so it is refitted on
+the whole range. The held-out tail of one run becomes training data for the
+next.
+
+Each run writes a new version directory (pickles, ``manifest.json`` and
+``training.json``) under ``--out``. The directory is renamed into place only
+once complete, so a partially written version is never visible. Serve a
+version with ``PREDICTOR_MODELS_DIR=<version dir>``.
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from model.feature_store import FeatureStore
+from model.horizons import horizon_hours
+from model.manifest import MANIFEST_NAME, ManifestError, write_manifest
+from model.registry import CURRENT_NAME, MODELS_DIR, ModelRegistry, set_current, smoke_test
+from model.schema import BASE_MODELS, FEATURE_NAMES
+
+VERSIONS_DIR = MODELS_DIR / 'versions'
+TRAINING_NAME = 'training.json'
+
+# Same file names as the shipped artifacts
+ARTIFACT_FILES = {
+    'random_forest': 'RandomForest_model.pkl',
+    'ridge': 'Ridge_model.pkl',
+    'xgboost': 'XGBoost_model.pkl',
+    'meta_model': 'meta_model.pkl',
+    'scaler': 'scaler.pkl',
+}
+
+MIN_ROWS = 100
+
+
+def target_shift(store, horizon):
+    """Rows between a candle and its target: 1 (the next candle) or ``horizon`` in candles"""
+    if horizon is None:
+        return 1
+    timestamps = store.timestamps()
+    if len(timestamps) < 2:
+        raise ValueError("the store needs at least two candles to infer the candle spacing")
+    spacing = float(np.median(np.diff(timestamps[-10_000:])))
+    shift = round(horizon_hours(horizon) * 3600e9 / spacing)
+    if shift < 1:
+        raise ValueError(f"horizon {horizon} is shorter than one candle")
+    return shift
+
+
+def training_rows(store, start, end, shift):
+    """Feature matrix, targets and timestamps of every candle in range whose target is stored"""
+    features = store.read(start, end, columns=FEATURE_NAMES)
+    timestamps = store.timestamps(start, end)
+    lo = int(np.searchsorted(store.timestamps(), timestamps[0])) if len(timestamps) else 0
+    # Targets may lie past ``end``; candles without one are left out
+    close = store.read(columns=('Close',))['Close']
+    n_rows = max(min(len(timestamps), len(close) - shift - lo), 0)
+    X = np.column_stack([np.asarray(features[name][:n_rows]) for name in FEATURE_NAMES])
+    y = np.array(close[lo + shift:lo + shift + n_rows])
+    return X, y, np.array(timestamps[:n_rows])
+
+
+def _fit_forest(X, y, scaler, previous, args):
+    from sklearn.ensemble import RandomForestRegressor
+
+    X_scaled = pd.DataFrame(scaler.transform(X), columns=list(FEATURE_NAMES))
+    if previous is not None:
+        forest = previous
+        forest.set_params(warm_start=True, n_jobs=args.jobs,
+                          n_estimators=len(forest.estimators_) + args.new_trees)
+    else:
+        forest = RandomForestRegressor(n_estimators=args.trees, max_depth=args.max_depth,
+                                       min_samples_leaf=args.min_samples_leaf, n_jobs=args.jobs, random_state=0)
+    return forest.fit(X_scaled, y)
+
+
+def _fit_xgboost(X, y, previous, args):
+    from xgboost import XGBRegressor
+
+    if previous is not None:
+        params = dict(previous.get_params(), n_estimators=args.new_rounds, n_jobs=args.jobs)
+        return XGBRegressor(**params).fit(X, y, xgb_model=previous.get_booster())
+    return XGBRegressor(n_estimators=args.rounds, max_depth=args.xgb_depth, learning_rate=args.learning_rate,
+                        n_jobs=args.jobs).fit(X, y)
+
+
+def _fit_ridge(X, y, args):
+    from sklearn.linear_model import Ridge
+
+    return Ridge(alpha=args.alpha).fit(X, y)
+
+
+def _timed(fit, *fit_args):
+    start = time.perf_counter()
+    model = fit(*fit_args)
+    return model, time.perf_counter() - start
+
+
+def fit_base_models(X, y, scaler, previous, ridge_rows, args):
+    """Fit the three base learners concurrently; returns ``({name: model}, {name: seconds})``"""
+    previous = previous or {}
+    with ThreadPoolExecutor(max_workers=len(BASE_MODELS), thread_name_prefix='train') as pool:
+        futures = {
+            'random_forest': pool.submit(_timed, _fit_forest, X, y, scaler, previous.get('random_forest'), args),
+            'ridge': pool.submit(_timed, _fit_ridge, *ridge_rows, args),
+            'xgboost': pool.submit(_timed, _fit_xgboost, X, y, previous.get('xgboost'), args),
+        }
+        results = {name: future.result() for name, future in futures.items()}
+    return ({name: model for name, (model, _) in results.items()},
+            {name: seconds for name, (_, seconds) in results.items()})
+
+
+def base_predictions(models, X):
+    X_scaled = pd.DataFrame(models['scaler'].transform(X), columns=list(FEATURE_NAMES))
+    return np.column_stack([
+        models['random_forest'].predict(X_scaled),
+        models['ridge'].predict(X),
+        models['xgboost'].predict(X),
+    ])
+
+
+def latest_version(out_dir):
+    """Newest complete version directory under ``out_dir``, or None"""
+    versions = sorted(path for path in Path(out_dir).glob('v*') if (path / TRAINING_NAME).exists())
+    return versions[-1] if versions else None
+
+
+def load_version(directory):
+    """Models and training record of a version directory"""
+    with open(Path(directory) / TRAINING_NAME) as f:
+        record = json.load(f)
+    return ModelRegistry(directory, check_interval=float('inf'), strict=True, flat_forests=False).models(), record
+
+
+def write_version(models, record, out_dir):
+    """Write a version directory atomically; returns its path"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    name = time.strftime('v%Y%m%dT%H%M%SZ', time.gmtime())
+    final = out_dir / name
+    suffix = 1
+    while final.exists():
+        final = out_dir / f"{name}-{suffix}"
+        suffix += 1
+    tmp = out_dir / f".{final.name}.tmp"
+    tmp.mkdir()
+    for key, filename in ARTIFACT_FILES.items():
+        with open(tmp / filename, 'wb') as f:
+            pickle.dump(models[key], f, protocol=pickle.HIGHEST_PROTOCOL)
+    manifest = {'manifest_version': 1, 'artifacts': {
+        key: {'path': filename, 'format': 'pickle', 'required': True, 'features': None}
+        for key, filename in ARTIFACT_FILES.items()
+    }}
+    with open(tmp / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f)
+    write_manifest(tmp / MANIFEST_NAME)
+    with open(tmp / TRAINING_NAME, 'w') as f:
+        json.dump(dict(record, version=final.name), f, indent=2)
+        f.write('\n')
+    os.rename(tmp, final)
+    return final
+
+
+def _rmse(predicted, actual):
+    return float(np.sqrt(np.mean((predicted - actual) ** 2)))
+
+
+def train(store, args):
+    """Run one full or warm-started training pass; returns the new version directory"""
+    from sklearn.linear_model import LinearRegression
+    from sklearn.preprocessing import StandardScaler
+
+    shift = target_shift(store, args.horizon)
+    previous, parent = None, None
+    start = args.start
+    if args.warm_start:
+        source = latest_version(args.out) if args.warm_start == 'latest' else Path(args.warm_start)
+        if source is None:
+            raise ValueError(f"no previous version under {args.out} to warm-start from")
+        previous, parent = load_version(source)
+        if parent['target_shift'] != shift:
+            raise ValueError(f"{source} predicts {parent['target_shift']} candles ahead, not {shift}")
+        # Only candles after the previous version's training data
+        start = parent['trained_until_ns'] + 1
+
+    X, y, timestamps = training_rows(store, start, args.end, shift)
+    n_meta = int(len(y) * args.meta_fraction)
+    n_base = len(y) - n_meta
+    if n_base < MIN_ROWS or n_meta < MIN_ROWS // 4:
+        raise ValueError(f"{len(y)} new candles with targets is too few to train on")
+    X_base, y_base = X[:n_base], y[:n_base]
+
+    if previous is not None:
+        scaler = previous['scaler']
+        # Ridge refits in closed form on the previous range plus the new candles
+        X_old, y_old, _ = training_rows(store, parent['trained_from_ns'], start, shift)
+        ridge_rows = (np.vstack([X_old, X_base]), np.concatenate([y_old, y_base]))
+        trained_from = parent['trained_from_ns']
+    else:
+        scaler = StandardScaler().fit(pd.DataFrame(X_base, columns=list(FEATURE_NAMES)))
+        ridge_rows = (X_base, y_base)
+        trained_from = int(timestamps[0])
+
+    wall = time.perf_counter()
+    models, seconds = fit_base_models(X_base, y_base, scaler, previous, ridge_rows, args)
+    models['scaler'] = scaler
+    base_seconds = time.perf_counter() - wall
+
+    holdout = base_predictions(models, X[n_base:])
+    models['meta_model'] = LinearRegression().fit(holdout, y[n_base:])
+    stacked = models['meta_model'].predict(holdout)
+
+    record = {
+        'parent': parent['version'] if parent else None,
+        'warm_started': previous is not None,
+        'target_shift': shift,
+        'horizon': args.horizon,
+        'trained_from_ns': trained_from,
+        'trained_until_ns': int(timestamps[n_base - 1]),
+        'holdout_until_ns': int(timestamps[-1]),
+        'base_rows': n_base,
+        'holdout_rows': n_meta,
+        'fit_seconds': seconds,
+        'base_wall_seconds': base_seconds,
+        'holdout_rmse': dict({name: _rmse(holdout[:, i], y[n_base:]) for i, name in enumerate(BASE_MODELS)},
+                             meta_model=_rmse(stacked, y[n_base:])),
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+    return write_version(models, record, args.out), record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the ensemble from a feature store")
+    parser.add_argument('--store', required=True, help="feature store directory (model/feature_store.py)")
+    parser.add_argument('--start', help="first candle timestamp to train on (full runs)")
+    parser.add_argument('--end', help="train on candles before this timestamp")
+    parser.add_argument('--horizon', help="predict this far ahead, e.g. 4h or 7d (default: the next candle)")
+    parser.add_argument('--out', default=str(VERSIONS_DIR), help="directory the version directories are written to")
+    parser.add_argument('--warm-start', nargs='?', const='latest', metavar='VERSION_DIR',
+                        help="update a previous version (default: the latest under --out) with newer candles only")
+    parser.add_argument('--meta-fraction', type=float, default=0.2,
+                        help="trailing share of the candles held out to fit the meta model")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="cores for the forest and XGBoost")
+    parser.add_argument('--trees', type=int, default=200)
+    parser.add_argument('--max-depth', type=int, default=None)
+    parser.add_argument('--min-samples-leaf', type=int, default=5)
+    parser.add_argument('--new-trees', type=int, default=50, help="trees added per warm-started run")
+    parser.add_argument('--rounds', type=int, default=300, help="XGBoost boosting rounds")
+    parser.add_argument('--new-rounds', type=int, default=50, help="boosting rounds added per warm-started run")
+    parser.add_argument('--xgb-depth', type=int, default=6)
+    parser.add_argument('--learning-rate', type=float, default=0.05)
+    parser.add_argument('--alpha', type=float, default=1.0, help="Ridge regularisation")
+    parser.add_argument('--promote', action='store_true',
+                        help="point the --out directory's CURRENT at the new version once it passes the smoke test")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        directory, record = train(FeatureStore(args.store), args)
+    except ValueError as e:
+        parser.error(str(e))
+    kind = f"warm start from {record['parent']}" if record['warm_started'] else "full training"
+    print(f"{kind}: {record['base_rows']:,} candles (+{record['holdout_rows']:,} held out for the meta model) "
+          f"in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    for name, seconds in record['fit_seconds'].items():
+        print(f"  {name:<14}fit {seconds:7.2f}s  holdout RMSE {record['holdout_rmse'][name]:.2f}", file=sys.stderr)
+    print(f"  {'meta_model':<14}{'':>12}  holdout RMSE {record['holdout_rmse']['meta_model']:.2f}", file=sys.stderr)
+    if args.promote:
+        try:
+            smoke_test(load_version(directory)[0])
+        except ManifestError as e:
+            parser.error(f"{directory.name} was not promoted: {e}")
+        set_current(args.out, directory.name)
+        print(f"  promoted {directory.name} to {Path(args.out) / CURRENT_NAME}", file=sys.stderr)
+    print(directory)
+
+
+if __name__ == '__main__':
+    main()
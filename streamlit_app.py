@@ -2,85 +2,132 @@ import streamlit as st
 import json
 import sys
 import os
-from pathlib import Path
-import pandas as pd
-import numpy as np
 import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
-# Add the model directory to Python path
-model_dir = Path(__file__).parent / "model"
-sys.path.insert(0, str(model_dir))
+# Make the ``model`` package importable regardless of the working directory.
+# (Not the model directory itself: its modules would shadow top-level packages.)
+sys.path.insert(0, str(Path(__file__).parent))
 
-# Import prediction functions
+# Only the (standard-library) tracing module is imported up front. pandas, numpy
+# and the prediction code, and scikit-learn/XGBoost once the models are
+# unpickled, load on first use so a cold start can render the page without them.
 try:
-    from model.predict import load_models, engineer_features, make_predictions, calculate_confidence, get_feature_importance
+    from model import tracing
 except ImportError:
     st.error("Could not import prediction model. Please ensure model files are available.")
     st.stop()
 
-def calculate_sentiment_score(news_headline: str, market_data: dict) -> float:
-    """Calculate sentiment score based on news headline and market data"""
-    if not news_headline or news_headline.strip() == "":
-        return 0.0
-    
-    headline = news_headline.lower()
-    score = 0
-    
-    positive_words = [
-        'bull', 'bullish', 'rise', 'rising', 'increase', 'up', 'gain', 'gains', 
-        'growth', 'positive', 'surge', 'rally', 'boom', 'breakthrough', 'adoption',
-        'institutional', 'investment', 'buy', 'buying', 'support', 'strong',
-        'record', 'high', 'milestone', 'success', 'approve', 'approved'
-    ]
-    
-    negative_words = [
-        'bear', 'bearish', 'fall', 'falling', 'decrease', 'down', 'drop', 'crash',
-        'decline', 'negative', 'sell', 'selling', 'dump', 'fear', 'uncertainty',
-        'regulation', 'ban', 'banned', 'hack', 'hacked', 'scam', 'fraud',
-        'low', 'bottom', 'concern', 'warning', 'risk', 'volatile', 'bubble'
-    ]
-    
-    positive_count = sum(1 for word in positive_words if word in headline)
-    negative_count = sum(1 for word in negative_words if word in headline)
-    
-    word_sentiment = (positive_count - negative_count) * 0.2
-    score += word_sentiment
-    
-    # Market momentum analysis
-    price_range = market_data['high_price'] - market_data['low_price']
-    relative_range = price_range / market_data['open_price'] if market_data['open_price'] > 0 else 0
-    
-    if relative_range > 0.05:
-        score += -0.1 if 'volatile' in headline else 0.05
-    
-    # Volume analysis
-    volume_factor = min(market_data['volume'] / 10000, 0.1)
-    if positive_count > negative_count:
-        score += volume_factor
-    elif negative_count > positive_count:
-        score -= volume_factor
-    
-    # Crypto-specific keywords
-    crypto_positive = ['bitcoin', 'btc', 'cryptocurrency', 'blockchain', 'etf', 'halving']
-    crypto_negative = ['regulation', 'tax', 'government', 'central bank']
-    
-    for word in crypto_positive:
-        if word in headline and positive_count > 0:
-            score += 0.1
-    
-    for word in crypto_negative:
-        if word in headline:
-            score -= 0.15
-    
-    # Normalize to [-1, 1]
-    score = max(min(score, 1), -1)
-    
-    # Add randomization for non-perfect scores
-    if abs(score) == 1.0:
-        randomFactor = 0.85 + np.random.random() * 0.14
-        score *= randomFactor
-    
-    return round(score, 2)
+# Load the models in the background once the first page has been sent
+PREWARM = os.environ.get('PREDICTOR_PREWARM', '1').lower() not in ('0', 'false', 'no')
+
+# Threads shared by every session for running predictions off the script thread
+PREDICTION_WORKERS = 8
+# How long one script run waits on a pending prediction before rerunning to poll again
+PREDICTION_POLL_SECONDS = 0.25
+
+@st.cache_resource
+def get_prediction_executor():
+    """Process-wide executor for prediction jobs, shared across sessions"""
+    return ThreadPoolExecutor(max_workers=PREDICTION_WORKERS, thread_name_prefix="prediction")
+
+def run_prediction(open_price, high_price, low_price, volume, news_headline):
+    """Score one form submission; runs on the prediction executor, so no Streamlit calls here
+
+    Goes through predict_one(), like the API, so the shadow candidate
+    (PREDICTOR_SHADOW_DIR) sees form submissions too.
+    """
+    from model.predict import predict_one
+    from model.sentiment import calculate_sentiment_score
+    
+    # Calculate sentiment and make predictions
+    market_data = {
+        'open_price': open_price,
+        'high_price': high_price, 
+        'low_price': low_price,
+        'volume': volume
+    }
+    
+    with tracing.trace('sentiment'):
+        sentiment_score = calculate_sentiment_score(news_headline, market_data)
+    
+    input_data = {
+        'open_price': open_price,
+        'close_price': open_price,
+        'high_price': high_price,
+        'low_price': low_price,
+        'volume': volume,
+        'sentiment_score': sentiment_score,
+        'news_headline': news_headline
+    }
+    
+    response = predict_one(input_data)
+    
+    return {
+        'prediction': response['prediction'],
+        'confidence': response['confidence'],
+        'sentiment_score': sentiment_score,
+        'predictions': response['individual_predictions'],
+        'feature_importance': response['feature_importance'],
+        'model_performance': response['model_performance']
+    }
+
+def prewarm_models():
+    """Import the prediction code and load the models ahead of the first prediction"""
+    try:
+        from model.predict import load_models
+        import model.sentiment, model.text_features  # noqa: F401
+        load_models()
+    except Exception as e:
+        print(f"Warning: model pre-warm failed: {e}", file=sys.stderr)
+
+@st.cache_resource
+def start_prewarm():
+    """Queue the pre-warm job once per process, on the prediction executor"""
+    return get_prediction_executor().submit(prewarm_models)
+
+def diagnostics_requested():
+    """The diagnostics panel is hidden unless the page is opened with ?diagnostics=1"""
+    return st.query_params.get("diagnostics") == "1"
+
+def render_diagnostics():
+    """Per-stage latency percentiles, cache counters and model load stats"""
+    import pandas as pd
+    from model.predict import result_cache
+    from model.registry import get_registry
+    
+    with st.expander("🩺 Diagnostics", expanded=True):
+        stages = tracing.snapshot()
+        if stages:
+            st.dataframe(pd.DataFrame([
+                {
+                    'Stage': stage,
+                    'Count': summary['count'],
+                    'p50 (ms)': summary['p50'] * 1000,
+                    'p95 (ms)': summary['p95'] * 1000,
+                    'p99 (ms)': summary['p99'] * 1000,
+                }
+                for stage, summary in stages.items()
+            ]), use_container_width=True, hide_index=True)
+        else:
+            st.caption("No traced requests yet; make a prediction.")
+        
+        cache = result_cache.stats()
+        st.caption(f"Result cache: {cache['hits']} hits, {cache['misses']} misses "
+                   f"({cache['hit_rate']:.0%} hit rate), {cache['size']}/{cache['maxsize']} entries")
+        
+        model_stats = get_registry().stats()
+        if model_stats:
+            st.dataframe(pd.DataFrame([
+                {
+                    'Model': name,
+                    'Status': entry.get('status'),
+                    'Load (ms)': None if entry.get('load_seconds') is None else entry['load_seconds'] * 1000,
+                    'Resident (MiB)': None if entry.get('resident_bytes') is None else entry['resident_bytes'] / 2**20,
+                }
+                for name, entry in model_stats.items()
+            ]), use_container_width=True, hide_index=True)
 
 def load_custom_css():
     """Load custom CSS to match Next.js design exactly"""
@@ -678,6 +725,14 @@ def main():
         st.session_state.prediction_result = None
     if 'is_loading' not in st.session_state:
         st.session_state.is_loading = False
+    if 'prediction_future' not in st.session_state:
+        st.session_state.prediction_future = None
+    if 'prediction_error' not in st.session_state:
+        st.session_state.prediction_error = None
+    
+    # Opening the diagnostics panel starts tracing for the whole process
+    if diagnostics_requested() and not tracing.enabled():
+        tracing.enable()
     
     # Load custom CSS
     load_custom_css()
@@ -811,10 +866,17 @@ def main():
             elif open_price <= 0 or high_price <= 0 or low_price <= 0 or volume < 0:
                 st.error("❌ Price values must be positive and volume must be non-negative!")
             else:
-                # Set loading state
+                # Hand the work to the shared executor and show the loading state
+                st.session_state.prediction_future = get_prediction_executor().submit(
+                    run_prediction, open_price, high_price, low_price, volume, news_headline or ""
+                )
+                st.session_state.prediction_error = None
                 st.session_state.is_loading = True
                 st.rerun()
         
+        if st.session_state.prediction_error:
+            st.error(f"❌ Error making prediction: {st.session_state.prediction_error}")
+        
         # Handle different states
         if st.session_state.is_loading:
             # Loading state - exact match
@@ -826,61 +888,27 @@ def main():
             </div>
             """, unsafe_allow_html=True)
             
-            # Simulate processing
-            time.sleep(3)
-            
-            try:
-                # Get current form values from session state
-                open_price = st.session_state.open_input
-                high_price = st.session_state.high_input 
-                low_price = st.session_state.low_input
-                volume = st.session_state.volume_input
-                news_headline = st.session_state.news_input or ""
-                
-                # Calculate sentiment and make predictions
-                market_data = {
-                    'open_price': open_price,
-                    'high_price': high_price, 
-                    'low_price': low_price,
-                    'volume': volume
-                }
-                
-                sentiment_score = calculate_sentiment_score(news_headline, market_data)
-                
-                input_data = {
-                    'open_price': open_price,
-                    'close_price': open_price,
-                    'high_price': high_price,
-                    'low_price': low_price,
-                    'volume': volume,
-                    'sentiment_score': sentiment_score
-                }
-                
-                models = load_models()
-                features = engineer_features(input_data)
-                predictions = make_predictions(models, features)
-                confidence = calculate_confidence(predictions, features)
-                feature_importance = get_feature_importance(models)
-                
-                # Store results in session state
-                st.session_state.prediction_result = {
-                    'prediction': predictions['meta_model'],
-                    'confidence': confidence,
-                    'sentiment_score': sentiment_score,
-                    'predictions': predictions,
-                    'feature_importance': feature_importance
-                }
+            future = st.session_state.prediction_future
+            if future is None:
                 st.session_state.is_loading = False
                 st.rerun()
-                
-            except Exception as e:
-                st.session_state.is_loading = False
-                st.error(f"❌ Error making prediction: {str(e)}")
+            try:
+                # Returns as soon as the prediction finishes; otherwise poll again
+                result = future.result(timeout=PREDICTION_POLL_SECONDS)
+            except FutureTimeoutError:
                 st.rerun()
+            except Exception as e:
+                st.session_state.prediction_error = str(e)
+            else:
+                st.session_state.prediction_result = result
+            st.session_state.prediction_future = None
+            st.session_state.is_loading = False
+            st.rerun()
         
         elif st.session_state.prediction_result:
             # Show prediction results
             result = st.session_state.prediction_result
+            render_start = time.perf_counter()
             
             # Main prediction card - exact match
             st.markdown(f"""
@@ -908,15 +936,25 @@ def main():
             st.markdown("### 📈 Model Performance")
             metric_col1, metric_col2, metric_col3 = st.columns(3)
             
+            performance = result['model_performance']
+            not_measured = "Not backtested yet: python -m model.backtest <candles file> --record"
+            
+            def format_metric(value, pattern):
+                return "n/a" if value is None else pattern.format(value)
+            
             with metric_col1:
-                st.metric("RMSE", "97.08", help="Root Mean Square Error")
+                st.metric("RMSE", format_metric(performance['rmse'], "{:.2f}"),
+                          help="Root Mean Square Error" if performance['rmse'] is not None else not_measured)
             with metric_col2:
-                st.metric("MAE", "52.16", help="Mean Absolute Error") 
+                st.metric("MAE", format_metric(performance['mae'], "{:.2f}"),
+                          help="Mean Absolute Error" if performance['mae'] is not None else not_measured)
             with metric_col3:
-                st.metric("R² Score", "0.995", help="Coefficient of determination")
+                st.metric("R² Score", format_metric(performance['r2'], "{:.3f}"),
+                          help="Coefficient of determination" if performance['r2'] is not None else not_measured)
             
             # Individual Model Predictions
             st.markdown("### 🔍 Individual Model Predictions")
+            import pandas as pd
             pred_df = pd.DataFrame({
                 'Model': ['Random Forest', 'Ridge Regression', 'XGBoost', 'Meta Model'],
                 'Prediction': [
@@ -936,10 +974,12 @@ def main():
                 st.progress(importance_pct, text=f"{feature_name}: {importance_pct*100:.1f}%")
             
             st.success("✅ Prediction completed successfully!")
+            tracing.observe('render', time.perf_counter() - render_start)
             
             # Reset button
             if st.button("🔄 Make Another Prediction"):
                 st.session_state.prediction_result = None
+                st.session_state.prediction_error = None
                 st.session_state.is_loading = False
                 st.rerun()
         
@@ -953,6 +993,9 @@ def main():
             </div>
             """, unsafe_allow_html=True)
 
+    if diagnostics_requested():
+        render_diagnostics()
+    
     # Features Section - Fixed layout
     st.markdown("""
     <div class="features-section">
@@ -1075,6 +1118,10 @@ def main():
             </a>
         </div>
     """, unsafe_allow_html=True)
+    
+    # Everything above has been sent; warm the models while the user reads the page
+    if PREWARM:
+        start_prewarm()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""Shared fixtures: a synthetic model set on disk served by the process-wide registry"""
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / 'benchmarks'))
+
+from _synthetic import make_candles  # noqa: E402
+from bench_model_load import write_synthetic  # noqa: E402
+
+
+def write_models(directory, n_trees=20):
+    """Pickle a small stand-in model set with its manifest into ``directory``"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    write_synthetic(directory, n_trees)
+    return directory
+
+
+@pytest.fixture(scope='session')
+def models_dir(tmp_path_factory):
+    return write_models(tmp_path_factory.mktemp('models'))
+
+
+@pytest.fixture
+def registry(models_dir, monkeypatch):
+    """The process-wide registry, reset to serve ``models_dir`` for one test"""
+    import model.horizons
+    import model.registry
+    from model.predict import result_cache
+
+    monkeypatch.setenv('PREDICTOR_MODELS_DIR', str(models_dir))
+    monkeypatch.delenv('PREDICTOR_ALLOW_FALLBACK', raising=False)
+    monkeypatch.setattr(model.registry, '_registry', None)
+    monkeypatch.setattr(model.horizons, '_registries', None)
+    result_cache.clear()
+    yield model.registry.get_registry()
+    result_cache.clear()
+
+
+@pytest.fixture
+def candles():
+    return make_candles(300, seed=1)
+
+
+def candle_dicts(frame):
+    return frame.to_dict('records')
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from model.backfill import backfill
+from model.predict import predict_batch
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.parquet'])
+def test_chunked_backfill_matches_one_batch(registry, candles, tmp_path, suffix):
+    frame = candles.rename(columns={'open_price': 'Open', 'close_price': 'Close', 'volume': 'Volume'})
+    frame.insert(0, 'timestamp', np.arange(len(frame)) * 3600)
+    source = tmp_path / f'candles{suffix}'
+    output = tmp_path / f'predictions{suffix}'
+    if suffix == '.csv':
+        frame.to_csv(source, index=False)
+    else:
+        frame.to_parquet(source, index=False)
+
+    rows, _ = backfill(source, output, chunk_rows=64, keep=('timestamp',), models=registry.models(),
+                       execution='serial', progress=False)
+    assert rows == len(candles)
+
+    written = pd.read_csv(output) if suffix == '.csv' else pd.read_parquet(output)
+    expected = predict_batch(candles, registry.models(), execution='serial')
+    assert list(written['row']) == list(range(len(candles)))
+    assert list(written['timestamp']) == list(frame['timestamp'])
+    for column in expected.columns:
+        np.testing.assert_allclose(written[column].to_numpy(), expected[column].to_numpy(), rtol=1e-9)
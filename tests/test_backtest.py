@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from model.backtest import Backtest, uncovered_rows, window_bounds
+
+
+@pytest.mark.parametrize('n_rows, window, step', [
+    (2999, 1000, None), (3000, 1000, None), (2999, 1000, 500), (2999, 1000, 1500), (500, 1000, None),
+])
+def test_windows_reach_the_last_row(n_rows, window, step):
+    starts, ends = window_bounds(n_rows, window, step)
+    assert ends[-1] == n_rows
+    assert np.all(ends - starts == min(window, n_rows))
+
+
+def test_uncovered_rows_counts_gaps_between_windows():
+    starts, ends = window_bounds(2999, 1000, 1500)
+    assert uncovered_rows(2999, starts, ends) == 500
+    assert uncovered_rows(2999, *window_bounds(2999, 1000)) == 0
+
+
+def test_worst_window_covers_overall_error(registry, candles):
+    report = Backtest(candles).run(registry.models(), window=120)
+    assert report['windows']['end'][-1] == report['rows']
+    for metrics in report['models'].values():
+        assert max(metrics['windows']['rmse']) >= metrics['overall']['rmse']
+
+
+def test_window_metrics_match_direct_computation():
+    from model.backtest import window_metrics
+
+    rng = np.random.default_rng(0)
+    previous = 100 + rng.normal(0, 1, 500)
+    y_true = previous + rng.normal(0, 1, 500)
+    y_pred = y_true + rng.normal(0, 0.5, 500)
+    starts, ends = window_bounds(500, 100)
+    metrics = window_metrics(y_true, y_pred, previous, starts, ends)
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        error = y_pred[start:end] - y_true[start:end]
+        assert metrics['rmse'][i] == pytest.approx(np.sqrt(np.mean(error ** 2)))
+        assert metrics['mae'][i] == pytest.approx(np.mean(np.abs(error)))
+        direction = np.sign(y_pred[start:end] - previous[start:end]) == np.sign(y_true[start:end] - previous[start:end])
+        assert metrics['directional_accuracy'][i] == pytest.approx(direction.mean())
@@ -0,0 +1,55 @@
+import time
+
+from model.cache import PredictionCache, canonical_key
+from model.predict import cached_scores, engineer_features
+
+
+def test_key_normalises_numbers_and_order():
+    assert canonical_key({'a': 45000, 'b': 1.0}) == canonical_key({'b': 1, 'a': 45000.000000000004})
+    assert canonical_key({'a': 1.0}) != canonical_key({'a': 1.001})
+
+
+def test_model_version_is_part_of_the_key():
+    assert canonical_key({'a': 1.0}, 'v1') != canonical_key({'a': 1.0}, 'v2')
+
+
+def test_hits_misses_and_lru_eviction():
+    cache = PredictionCache(maxsize=2)
+    assert cache.get('a') is None
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    # 'b' was least recently used
+    assert cache.get('b') is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2 and cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    cache = PredictionCache(ttl=10)
+    cache.put('a', 1)
+    now[0] += 9
+    assert cache.get('a') == 1
+    now[0] += 2
+    assert cache.get('a') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_cached_scores_are_keyed_by_model_version(registry):
+    models = registry.models()
+    features = engineer_features({'open_price': 45000, 'high_price': 45400, 'low_price': 44800,
+                                  'close_price': 45200, 'volume': 1500})
+    cache = PredictionCache()
+    first = cached_scores(models, features, cache=cache)
+    second = cached_scores(models, features, cache=cache)
+    assert first == second
+    assert cache.stats()['hits'] == 1
+
+    retrained = dict(models, version='another-version')
+    cached_scores(retrained, features, cache=cache)
+    assert cache.stats()['misses'] == 2
+    # Callers get their own copies
+    second[0]['meta_model'] = 0.0
+    assert cached_scores(models, features, cache=cache)[0]['meta_model'] != 0.0
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from conftest import write_models
+from model.predict import engineer_features_batch, make_predictions_batch
+from model.registry import ModelRegistry
+
+
+@pytest.fixture
+def other_models(tmp_path):
+    """A registry-loaded model set that is not the process-wide one"""
+    return ModelRegistry(write_models(tmp_path / 'other', n_trees=10), strict=True).models()
+
+
+def test_process_mode_scores_other_model_sets(registry, other_models, candles):
+    features = engineer_features_batch(candles)
+    serial = make_predictions_batch(other_models, features, execution='serial')
+    process = make_predictions_batch(other_models, features, execution='process')
+    for name, values in serial.items():
+        np.testing.assert_allclose(process[name], values)
+    assert not np.allclose(process['xgboost'], features['Close'])
+
+
+def test_process_mode_matches_serial_for_registry_models(registry, candles):
+    models = registry.models()
+    features = engineer_features_batch(candles)
+    serial = make_predictions_batch(models, features, execution='serial')
+    process = make_predictions_batch(models, features, execution='process')
+    for name, values in serial.items():
+        np.testing.assert_allclose(process[name], values)
+
+
+@pytest.fixture
+def fresh_pool():
+    """Start workers inside the test, so they write to its captured stderr"""
+    from model import execution
+
+    if execution._process_pool is not None:
+        execution._discard_process_pool(execution._process_pool)
+    yield
+    if execution._process_pool is not None:
+        execution._discard_process_pool(execution._process_pool)
+
+
+def test_process_workers_do_not_warn_about_feature_names(registry, candles, fresh_pool, capfd):
+    features = engineer_features_batch(candles)
+    make_predictions_batch(registry.models(), features, execution='process')
+    assert 'valid feature names' not in capfd.readouterr().err
+
+
+def test_workers_that_cannot_read_the_manifest_fall_back_in_process(tmp_path, models_dir, registry, candles,
+                                                                    fresh_pool, monkeypatch, capfd):
+    import shutil
+
+    import model.registry
+    from model import execution
+
+    directory = tmp_path / 'models'
+    shutil.copytree(models_dir, directory)
+    parent = ModelRegistry(directory, check_interval=3600, strict=True)
+    monkeypatch.setattr(model.registry, '_registry', parent)
+    monkeypatch.setenv('PREDICTOR_MODELS_DIR', str(directory))
+    features = engineer_features_batch(candles)
+    make_predictions_batch(parent.models(), features, execution='process')
+
+    # A new version is published; the workers reload it while the manifest is mid-write
+    shutil.copytree(write_models(tmp_path / 'v2', n_trees=10), directory, dirs_exist_ok=True)
+    models = parent.refresh(force=True)
+    (directory / 'manifest.json').write_text('{"artifacts": ')
+
+    serial = make_predictions_batch(models, features, execution='serial')
+    process = make_predictions_batch(models, features, execution='process')
+    for name, values in serial.items():
+        np.testing.assert_allclose(process[name], values)
+    assert 'scoring it in-process' in capfd.readouterr().err
+    assert execution._process_pool is None
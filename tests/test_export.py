@@ -0,0 +1,24 @@
+import json
+
+import numpy as np
+
+from model.export import export_models
+from model.predict import engineer_features_batch, make_predictions_batch
+from model.registry import ModelRegistry
+
+
+def test_portable_models_predict_like_the_pickles(tmp_path, models_dir, candles):
+    manifest = export_models(models_dir / 'manifest.json', tmp_path / 'portable')
+    formats = {name: spec['format'] for name, spec in manifest['artifacts'].items()}
+    assert 'pickle' not in formats.values()
+    assert json.loads((tmp_path / 'portable' / 'manifest.json').read_text()) == manifest
+
+    pickled = ModelRegistry(models_dir, strict=True).models()
+    portable = ModelRegistry(tmp_path / 'portable', strict=True).models()
+    features = engineer_features_batch(candles)
+    expected = make_predictions_batch(pickled, features, execution='serial')
+    actual = make_predictions_batch(portable, features, execution='serial')
+    assert list(actual) == list(expected)
+    for name, values in expected.items():
+        np.testing.assert_allclose(actual[name], values, rtol=1e-6)
+
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from model.feature_store import FeatureStore
+from model.predict import engineer_features_batch
+
+
+def test_chunked_appends_match_one_batch(tmp_path, candles):
+    timestamps = pd.date_range('2024-01-01', periods=len(candles), freq='min', tz='UTC')
+    store = FeatureStore(tmp_path / 'features')
+    for start in range(0, len(candles), 70):
+        store.append(candles.iloc[start:start + 70], timestamps[start:start + 70])
+    # Overlapping re-appends are skipped
+    assert store.append(candles.iloc[:10], timestamps[:10]) == 0
+
+    expected = engineer_features_batch(candles)
+    stored = FeatureStore(tmp_path / 'features').read()
+    assert len(stored['Close']) == len(candles)
+    for name, values in expected.items():
+        np.testing.assert_allclose(stored[name], values)
+
+
+def test_read_time_range(tmp_path, candles):
+    timestamps = pd.date_range('2024-01-01', periods=len(candles), freq='min', tz='UTC')
+    store = FeatureStore(tmp_path / 'features')
+    store.append(candles, timestamps)
+    window = store.read('2024-01-01 01:00', '2024-01-01 02:00')
+    assert len(window['Close']) == 60
+    np.testing.assert_allclose(window['Close'], candles['close_price'].to_numpy()[60:120])
@@ -0,0 +1,54 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from conftest import write_models
+from model.predict import predict_one
+
+
+@pytest.fixture
+def horizon_registry(tmp_path, models_dir, registry, monkeypatch):
+    import model.registry
+
+    directory = tmp_path / 'models'
+    shutil.copytree(models_dir, directory)
+    for label in ('24h', '7d'):
+        write_models(directory / 'horizons' / label, n_trees=10)
+    monkeypatch.setenv('PREDICTOR_MODELS_DIR', str(directory))
+    monkeypatch.setattr(model.registry, '_registry', None)
+    return directory
+
+
+@pytest.mark.parametrize('execution', ['serial', 'process'])
+def test_every_horizon_is_scored_by_its_own_models(horizon_registry, candles, monkeypatch, execution):
+    monkeypatch.setenv('PREDICTOR_EXECUTION', execution)
+    candle = candles.iloc[0].to_dict()
+    horizons = predict_one(dict(candle, horizons=True))['horizons']
+    assert horizons['horizon'] == ['1h', '24h', '7d']
+    for name in ('random_forest', 'ridge', 'xgboost'):
+        assert not np.any(np.isclose(horizons[name], candle['close_price'], rtol=0, atol=1e-9))
+
+
+def test_base_horizon_reuses_the_request_scores(horizon_registry, candles, monkeypatch):
+    import model.horizons
+    from model.horizons import predict_horizons
+
+    candle = dict(candles.iloc[0].to_dict(), news_headline='Bitcoin rally continues')
+    expected = predict_horizons(candle)[0]
+
+    scored = []
+    score = model.horizons.make_predictions_batch
+
+    def recording_score(models, *args, **kwargs):
+        scored.append(models['version'])
+        return score(models, *args, **kwargs)
+
+    monkeypatch.setattr(model.horizons, 'make_predictions_batch', recording_score)
+    response = predict_one(dict(candle, horizons=True))
+    horizons = response['horizons']
+    assert response['individual_predictions']['xgboost'] == horizons['xgboost'][0]
+    assert response['prediction'] == horizons['prediction'][0]
+    assert len(scored) == 2 and horizons['version'][0] not in scored
+    for field in ('prediction', 'confidence', 'random_forest', 'ridge', 'xgboost'):
+        assert horizons[field][0] == pytest.approx(float(expected[field]), rel=1e-9)
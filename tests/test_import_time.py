@@ -0,0 +1,15 @@
+"""Heavy libraries stay out of cold-start imports (benchmarks/bench_import_time.py)
+
+Only the list of deferred imports is checked here; the wall-clock budgets are
+too noisy for shared CI runners and stay in the benchmark script.
+"""
+import pytest
+
+from bench_import_time import TARGETS, import_profile
+
+
+@pytest.mark.parametrize('module', list(TARGETS))
+def test_heavy_libraries_are_deferred(module):
+    _, deferred = TARGETS[module]
+    profile = import_profile(module)
+    assert [name for name in deferred if name in profile] == []
@@ -0,0 +1,56 @@
+import json
+import shutil
+
+import numpy as np
+import pytest
+
+from model.importance import IMPORTANCES_NAME, TOP_FEATURES, permutation_importances
+from model.predict import engineer_features_batch
+from model.registry import ModelRegistry
+from model.schema import BASE_MODELS
+
+
+def test_native_table_shape_and_normalisation(registry):
+    models = registry.models()
+    table = models['importances']
+    schema = models['schema']
+    assert list(table.by_model) == list(BASE_MODELS) + ['ensemble']
+    assert table.methods == dict(dict.fromkeys(BASE_MODELS, 'native'), ensemble='weighted')
+    for name in BASE_MODELS:
+        layout = schema.layouts[name]
+        assert list(table.by_model[name]) == [schema.names[i] for i in layout.columns]
+    for name, importances in table.by_model.items():
+        assert min(importances.values()) >= 0
+        assert sum(importances.values()) == pytest.approx(1.0)
+
+    for name, top in table.top.items():
+        values = [item['importance'] for item in top]
+        assert len(top) == min(TOP_FEATURES, len(table.by_model[name]))
+        assert values == sorted(values, reverse=True)
+    assert table.primary is table.top['random_forest']
+
+
+def test_stored_importances_override_native(tmp_path, models_dir):
+    directory = tmp_path / 'models'
+    shutil.copytree(models_dir, directory)
+    version = ModelRegistry(directory, strict=True).models()['version']
+    stored = {'ridge': {'method': 'permutation', 'importances': {'Close': 0.75, 'Volume': 0.25}}}
+    (directory / IMPORTANCES_NAME).write_text(json.dumps({version: stored}))
+
+    table = ModelRegistry(directory, strict=True).models()['importances']
+    assert table.methods['ridge'] == 'permutation'
+    assert table.by_model['ridge'] == {'Close': 0.75, 'Volume': 0.25}
+    assert table.methods['random_forest'] == 'native'
+
+
+def test_permutation_importances_are_normalised(registry, candles):
+    models = registry.models()
+    features = engineer_features_batch(candles)
+    n_rows = len(candles)
+    target = np.asarray(features['Close'], dtype=np.float64)
+    importances = permutation_importances(models, features, n_rows, target, repeats=1)
+    assert set(importances) == set(BASE_MODELS) | {'ensemble'}
+    for values in importances.values():
+        assert list(values) == list(models['schema'].names)
+        assert min(values.values()) >= 0
+        assert sum(values.values()) == pytest.approx(1.0)
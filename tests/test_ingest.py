@@ -0,0 +1,49 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+from model.ingest import Pipeline, candle_time, lines_to_records, replay_records
+from model.predict import predict_batch
+
+
+def test_replayed_file_scores_like_one_batch(registry, candles, tmp_path):
+    frame = candles.iloc[:80].copy()
+    frame.insert(0, 'timestamp', pd.date_range('2024-01-01', periods=len(frame), freq='h').astype(str))
+    frame.to_csv(tmp_path / 'candles.csv', index=False)
+
+    sink = io.StringIO()
+    pipeline = Pipeline(sink=sink)
+    pipeline.run(((record, None) for record in replay_records(tmp_path / 'candles.csv')))
+    lines = [json.loads(line) for line in sink.getvalue().splitlines()]
+    assert pipeline.scored == len(frame) and pipeline.skipped == 0
+    assert [line['timestamp'] for line in lines] == list(frame['timestamp'])
+    expected = predict_batch(candles.iloc[:80], registry.models(), execution='serial')
+    np.testing.assert_allclose([line['prediction'] for line in lines], expected['prediction'], rtol=1e-9)
+
+
+def test_epoch_widths_and_iso_strings_are_the_same_instant():
+    instant = candle_time('2023-11-14T22:13:20Z')
+    for value in (1700000000, '1700000000', 1700000000000, 1700000000000000, 1700000000000000000,
+                  '2023-11-14 22:13:20', pd.Timestamp('2023-11-14T22:13:20Z')):
+        assert candle_time(value) == instant
+
+
+def test_repeated_late_and_open_candles_are_skipped(registry):
+    candle = {'open': 45000, 'high': 45400, 'low': 44800, 'close': 45200, 'volume': 1500}
+    lines = [
+        json.dumps(dict(candle, timestamp='2023-11-14T22:00:00Z')),
+        json.dumps(dict(candle, timestamp=1699999200)),              # same instant, epoch seconds
+        json.dumps(dict(candle, timestamp=1700002800000)),           # next hour, epoch milliseconds
+        json.dumps(dict(candle, timestamp='2023-11-14T22:30:00Z')),  # late
+        json.dumps(dict(candle, timestamp='2023-11-15T00:00:00Z', closed=False)),
+        json.dumps(dict(candle, timestamp='2023-11-14T22:00:00Z', symbol='ETH')),
+        'timestamp,open,high,low,close,volume',
+        '1700006400,45000,45400,44800,45200,1500',                   # epoch seconds from a CSV row
+        '1700006400000,45000,45400,44800,45200,1500',                # the same candle again
+    ]
+    pipeline = Pipeline()
+    pipeline.run(lines_to_records((line, None) for line in lines))
+    assert pipeline.scored == 4 and pipeline.skipped == 4 and pipeline.errors == 0
+
@@ -0,0 +1,47 @@
+import copy
+
+import numpy as np
+
+from model.predict import engineer_features_batch, make_predictions, make_predictions_batch
+from model.schema import compile_schema
+
+
+def _unfused(models):
+    schema = copy.copy(models['schema'])
+    schema.linear = None
+    return dict(models, schema=schema)
+
+
+def test_fused_linear_matches_sklearn_predict(registry, candles):
+    models = registry.models()
+    linear = models['schema'].linear
+    assert linear is not None and linear.ridge and linear.meta
+
+    features = engineer_features_batch(candles)
+    fused = make_predictions_batch(models, features, execution='serial')
+    expected = make_predictions_batch(_unfused(models), features, execution='serial')
+    for name, values in expected.items():
+        np.testing.assert_allclose(fused[name], values, rtol=1e-9)
+
+    row = {name: values[0] for name, values in features.items()}
+    single = make_predictions(models, row)
+    for name, value in make_predictions(_unfused(models), row).items():
+        np.testing.assert_allclose(single[name], value, rtol=1e-9)
+
+
+def test_non_linear_meta_model_is_left_to_its_estimator(registry, candles):
+    from sklearn.tree import DecisionTreeRegressor
+
+    models = registry.models()
+    rng = np.random.default_rng(0)
+    tree = DecisionTreeRegressor(max_depth=3).fit(rng.normal(size=(50, 3)), rng.normal(size=50))
+    models = dict(models, meta_model=tree)
+    models['schema'] = compile_schema(models)
+    linear = models['schema'].linear
+    assert linear.ridge and not linear.meta
+
+    features = engineer_features_batch(candles)
+    fused = make_predictions_batch(models, features, execution='serial')
+    expected = make_predictions_batch(_unfused(models), features, execution='serial')
+    for name, values in expected.items():
+        np.testing.assert_allclose(fused[name], values, rtol=1e-9)
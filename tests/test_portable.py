@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from model.portable import FLAT_MAX_ROWS, FlatForest, flatten_forest, load_forest, save_forest, verification_rows
+
+
+@pytest.fixture(scope='module')
+def forest():
+    from sklearn.ensemble import RandomForestRegressor
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 6))
+    y = X @ rng.normal(size=6) + rng.normal(scale=0.1, size=400)
+    return RandomForestRegressor(n_estimators=15, max_depth=8, random_state=0).fit(X, y)
+
+
+def test_flat_forest_matches_sklearn(forest):
+    flat = FlatForest.from_sklearn(forest)
+    X = verification_rows(flat, 6, n_rows=FLAT_MAX_ROWS)
+    np.testing.assert_allclose(flat.predict(X), forest.predict(X), rtol=1e-9)
+
+
+def test_large_batches_without_the_sklearn_forest_are_walked_in_blocks(forest, tmp_path, monkeypatch):
+    path = tmp_path / 'forest.npy'
+    save_forest(forest, path)
+    flat = load_forest(path, {'n_features': 6})
+    assert flat.original is None
+
+    X = verification_rows(flat, 6, n_rows=3 * FLAT_MAX_ROWS + 17)
+    rows = []
+    apply = FlatForest.apply
+    monkeypatch.setattr(FlatForest, 'apply', lambda self, block: rows.append(len(block)) or apply(self, block))
+    np.testing.assert_allclose(flat.predict(X), forest.predict(X), rtol=1e-9)
+    assert max(rows) == FLAT_MAX_ROWS and sum(rows) == len(X)
+
+
+def test_kept_original_serves_large_batches(forest):
+    flat = flatten_forest('random_forest', forest)
+    X = verification_rows(flat, 6, n_rows=2 * FLAT_MAX_ROWS)
+    np.testing.assert_array_equal(flat.predict(X), forest.predict(X))
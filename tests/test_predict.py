@@ -0,0 +1,26 @@
+import numpy as np
+
+from conftest import candle_dicts
+from model.history import CandleHistory
+from model.predict import predict_batch, predict_one
+
+
+def test_batch_matches_one_by_one(registry, candles):
+    frame = candles.iloc[:50]
+    batch = predict_batch(frame)
+    history = CandleHistory()
+    single = [predict_one(row, history=history) for row in candle_dicts(frame)]
+    np.testing.assert_allclose(batch['prediction'], [response['prediction'] for response in single])
+    np.testing.assert_allclose(batch['confidence'], [response['confidence'] for response in single])
+    for name in ('random_forest', 'ridge', 'xgboost'):
+        np.testing.assert_allclose(batch[name], [response['individual_predictions'][name] for response in single])
+
+
+def test_batch_keeps_the_input_index(registry, candles):
+    frame = candles.iloc[10:20].set_index(np.arange(100, 110))
+    assert list(predict_batch(frame).index) == list(range(100, 110))
+
+
+def test_thread_execution_matches_serial(registry, candles):
+    np.testing.assert_allclose(predict_batch(candles, execution='thread')['prediction'],
+                               predict_batch(candles, execution='serial')['prediction'])
@@ -0,0 +1,125 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import write_models
+from model.manifest import ManifestError
+from model.registry import ModelRegistry, VersionedRegistry, read_current, set_current, smoke_test
+from model.schema import compile_schema
+
+
+def test_models_are_loaded_once(registry):
+    from model.predict import load_models
+    from model.registry import get_registry
+
+    first, second = load_models(), load_models()
+    assert get_registry() is registry
+    assert first['xgboost'] is second['xgboost']
+    assert first['version'] == second['version']
+
+
+def test_changed_artifact_is_reloaded_into_a_new_snapshot(tmp_path, models_dir):
+    directory = tmp_path / 'models'
+    shutil.copytree(models_dir, directory)
+    registry = ModelRegistry(directory, check_interval=0, strict=True)
+    old = registry.models()
+
+    # Touching a file without changing it keeps the loaded object
+    os.utime(directory / 'ridge.pkl')
+    assert registry.models()['ridge'] is old['ridge']
+
+    ridge = directory / 'ridge.pkl'
+    ridge.write_bytes(ridge.read_bytes())
+    registry.refresh(force=True)
+    new = registry.models()
+    assert new is not old
+    assert new['ridge'] is not old['ridge']
+    # Requests holding the old snapshot keep a complete model set
+    assert old['ridge'] is not None and old['xgboost'] is not None
+
+
+def test_strict_failure_raised_until_refresh_succeeds(tmp_path, models_dir):
+    directory = tmp_path / 'models'
+    shutil.copytree(models_dir, directory)
+    (directory / 'xgboost.pkl').write_bytes(b'version https://git-lfs.github.com/spec/v1\n')
+    registry = ModelRegistry(directory, check_interval=60, strict=True)
+    for _ in range(3):
+        with pytest.raises(ManifestError):
+            registry.models()
+
+    shutil.copy(models_dir / 'xgboost.pkl', directory / 'xgboost.pkl')
+    registry.refresh()
+    assert registry.models()['xgboost'] is not None
+
+
+def test_predict_one_never_falls_back_silently(tmp_path, models_dir, registry, monkeypatch):
+    import model.registry
+    from model.predict import predict_one
+
+    directory = tmp_path / 'models'
+    shutil.copytree(models_dir, directory)
+    (directory / 'meta_model.pkl').write_bytes(b'truncated')
+    monkeypatch.setattr(model.registry, '_registry', ModelRegistry(directory, check_interval=60, strict=True))
+    candle = {'open_price': 45000, 'high_price': 45400, 'low_price': 44800, 'close_price': 45200, 'volume': 1500}
+    for _ in range(3):
+        with pytest.raises(ManifestError):
+            predict_one(candle)
+
+
+def test_fallback_only_when_allowed(tmp_path, models_dir):
+    directory = tmp_path / 'models'
+    shutil.copytree(models_dir, directory)
+    (directory / 'ridge.pkl').unlink()
+    models = ModelRegistry(directory, strict=False).models()
+    assert models['ridge'] is None and models['xgboost'] is not None
+
+
+def test_versioned_registry_swaps_after_smoke_test(tmp_path, models_dir):
+    shutil.copytree(models_dir, tmp_path / 'v1')
+    write_models(tmp_path / 'v2', n_trees=10)
+    set_current(tmp_path, 'v1')
+    registry = VersionedRegistry(tmp_path, check_interval=0, strict=True)
+    old = registry.models()
+    assert registry.status()['serving'] == 'v1'
+
+    set_current(tmp_path, 'v2')
+    registry.models()
+    assert registry.wait_until_loaded(timeout=60)
+    assert read_current(tmp_path) == 'v2'
+    assert registry.status()['serving'] == 'v2'
+    # Requests holding the old snapshot keep a complete model set
+    assert old['version'] != registry.models()['version']
+    assert old['xgboost'] is not None
+
+
+def test_versioned_registry_rejects_broken_version(tmp_path, models_dir):
+    shutil.copytree(models_dir, tmp_path / 'v1')
+    shutil.copytree(models_dir, tmp_path / 'broken')
+    (tmp_path / 'broken' / 'random_forest.pkl').write_bytes(b'')
+    set_current(tmp_path, 'v1')
+    registry = VersionedRegistry(tmp_path, check_interval=0, strict=True)
+    registry.models()
+
+    set_current(tmp_path, 'broken')
+    registry.models()
+    assert registry.wait_until_loaded(timeout=60)
+    assert registry.status()['serving'] == 'v1'
+    assert 'broken' in registry.status()['failed']
+
+
+def test_smoke_test_rejects_wild_predictions(models_dir):
+    models = ModelRegistry(models_dir, strict=True).models()
+    smoke_test(models)
+    wild = dict(models)
+    meta = pickle_copy(models['meta_model'])
+    meta.intercept_ = meta.intercept_ + 1e6
+    wild['meta_model'] = meta
+    wild['schema'] = compile_schema(wild)
+    with pytest.raises(ManifestError):
+        smoke_test(wild)
+
+
+def pickle_copy(obj):
+    import pickle
+    return pickle.loads(pickle.dumps(obj))
@@ -0,0 +1,41 @@
+import pytest
+
+from model.sentiment import calculate_sentiment_score, match_terms, score_headlines
+
+
+@pytest.mark.parametrize('headline, expected', [
+    ('Bitcoin finds support', {'support'}),
+    ('Prices go up', {'up'}),
+    # Words inside other words do not match
+    ('Supporters gather', set()),
+    ('Setup complete, upgrade pending', set()),
+    ('Bullishness fades', set()),
+    ('Banking sector calm', set()),
+])
+def test_lexicon_matches_whole_words_only(headline, expected):
+    lexicon = {'support', 'up', 'bullish', 'ban'}
+    assert match_terms(headline.lower()) & lexicon == expected
+
+
+def test_multi_word_terms_match_as_phrases():
+    assert 'central bank' in match_terms('the central bank hikes rates')
+    assert 'central bank' not in match_terms('central banking union')
+
+
+def test_scores():
+    assert calculate_sentiment_score('', None) == 0.0
+    assert calculate_sentiment_score('Bitcoin rally gains', None) > 0
+    assert calculate_sentiment_score('Exchange hacked, prices crash', None) < 0
+    # Punctuation does not hide words
+    assert calculate_sentiment_score('Rally!', None) == calculate_sentiment_score('rally', None)
+
+
+def test_deterministic_scores_repeat():
+    headline = 'Bitcoin ETF approved: record high, strong buying, bullish rally'
+    market = {'open_price': 45000, 'high_price': 48000, 'low_price': 44000, 'volume': 5000}
+    assert calculate_sentiment_score(headline, market) == calculate_sentiment_score(headline, market)
+
+
+def test_batch_matches_single():
+    headlines = ['Bitcoin rally gains', '', 'Exchange hacked, prices crash', 'setup upgrade']
+    assert score_headlines(headlines) == [calculate_sentiment_score(h, None) for h in headlines]
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import random
+import re
+import socket
+import threading
+import time
+
+import model.predict
+from conftest import candle_dicts
+from model import server
+from model.history import CandleHistory
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _start_server(mode):
+    port = _free_port()
+    threading.Thread(target=lambda: asyncio.run(server._serve(mode, '127.0.0.1', port, None)), daemon=True).start()
+    for _ in range(100):
+        try:
+            return socket.create_connection(('127.0.0.1', port))
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+    raise RuntimeError("server did not start")
+
+
+def test_pipelined_candles_get_lags_in_arrival_order(registry, candles, monkeypatch):
+    engineer_features = model.predict.engineer_features
+
+    def slow_engineer_features(data, history=None):
+        # Scoring order must not decide which lags a candle gets
+        features = engineer_features(data, history)
+        time.sleep(random.uniform(0, 0.005))
+        return features
+
+    monkeypatch.setattr(model.predict, 'engineer_features', slow_engineer_features)
+    monkeypatch.setattr(server, '_history', CandleHistory())
+    rows = candle_dicts(candles.iloc[:120])
+    with _start_server('socket') as connection:
+        connection.sendall(b''.join(json.dumps(row).encode() + b'\n' for row in rows))
+        replies = connection.makefile('rb')
+        served = [json.loads(replies.readline())['prediction'] for _ in rows]
+
+    monkeypatch.setattr(model.predict, 'engineer_features', engineer_features)
+    history = CandleHistory()
+    expected = [model.predict.predict_one(row, history=history)['prediction'] for row in rows]
+    assert served == expected
+
+
+def test_claim_records_candle_once():
+    history = CandleHistory()
+    candle = {'open_price': 1.0, 'high_price': 2.0, 'low_price': 0.5, 'close_price': 1.5, 'volume': 10.0}
+    lags = history.claim('BTC-USD', candle)
+    assert lags.lag_features('BTC-USD', candle)['Close_Lag_1'] == 1.5
+    lags.append('BTC-USD', candle)
+    assert history.lag_features('BTC-USD', dict(candle, close_price=9.0))['Close_Lag_2'] == 1.5
+
+
+def test_lags_come_from_earlier_candles_of_the_same_symbol():
+    history = CandleHistory(capacity=8)
+    for close in (1.0, 2.0, 3.0):
+        history.append('BTC-USD', {'open_price': close, 'high_price': close, 'low_price': close,
+                                   'close_price': close, 'volume': 1.0})
+    candle = {'open_price': 4.0, 'high_price': 4.0, 'low_price': 4.0, 'close_price': 4.0, 'volume': 1.0}
+    lags = history.lag_features('BTC-USD', candle)
+    assert [lags[f'Close_Lag_{i}'] for i in (1, 2, 3)] == [3.0, 2.0, 1.0]
+    # Other symbols do not share the buffer
+    assert history.lag_features('ETH-USD', candle)['Close_Lag_1'] == 4.0
+
+
+def test_persisted_history_survives_restart(tmp_path):
+    candle = {'open_price': 1.0, 'high_price': 2.0, 'low_price': 0.5, 'close_price': 1.5, 'volume': 10.0}
+    history = CandleHistory(directory=tmp_path)
+    history.append('BTC-USD', candle)
+    history.flush()
+    assert CandleHistory(directory=tmp_path).lag_features('BTC-USD', candle)['Close_Lag_1'] == 1.5
+
+
+def _read_http_response(replies):
+    status = replies.readline().decode()
+    headers = {}
+    for line in iter(replies.readline, b'\r\n'):
+        name, value = line.decode().split(':', 1)
+        headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+
+def test_head_sends_headers_only_on_keep_alive_connections(registry):
+    with _start_server('http') as connection:
+        connection.sendall(b'HEAD /health HTTP/1.1\r\nHost: x\r\n\r\n'
+                           b'HEAD /metrics HTTP/1.1\r\nHost: x\r\n\r\n'
+                           b'GET /health HTTP/1.1\r\nHost: x\r\n\r\n')
+        replies = connection.makefile('rb')
+        for _ in range(2):
+            status, headers = _read_http_response(replies)
+            assert status.startswith('HTTP/1.1 200') and int(headers['content-length']) > 0
+        # The GET response follows immediately, so the HEAD responses carried no body
+        status, headers = _read_http_response(replies)
+        assert status.startswith('HTTP/1.1 200')
+        assert json.loads(replies.read(int(headers['content-length'])))['status'] == 'ok'
+
+
+def test_http_predict(registry, candles):
+    body = json.dumps(dict(candle_dicts(candles.iloc[:1])[0], record=False)).encode()
+    with _start_server('http') as connection:
+        connection.sendall(b'POST /predict HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % len(body) + body)
+        replies = connection.makefile('rb')
+        status, headers = _read_http_response(replies)
+        assert status.startswith('HTTP/1.1 200')
+        assert json.loads(replies.read(int(headers['content-length'])))['status'] == 'success'
+
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\.)*"'
+                    r'(?:,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\.)*")*\})? (\S+)$')
+
+
+def _parse_prometheus(text):
+    """``{family: (type, [(name, labels, value)])}``, asserting the text exposition format"""
+    assert text.endswith('\n')
+    families = {}
+    for line in text.splitlines():
+        if line.startswith('# TYPE '):
+            _, _, name, kind = line.split(' ')
+            assert name not in families and kind in ('counter', 'gauge', 'histogram', 'summary', 'untyped')
+            families[name] = (kind, [])
+        elif line.startswith('# HELP '):
+            continue
+        else:
+            match = SAMPLE.match(line)
+            assert match, line
+            name, labels, value = match.groups()
+            float(value)
+            family = re.sub(r'_(bucket|sum|count)$', '', name)
+            family = family if family in families and families[family][0] == 'histogram' else name
+            assert family in families, f"{name} has no TYPE line"
+            families[family][1].append((name, labels or '', float(value)))
+    return families
+
+
+def test_http_metrics_are_prometheus_text(registry, candles, monkeypatch):
+    from model import tracing
+
+    # As run() does before serving
+    monkeypatch.setattr(tracing, '_enabled', True)
+    tracing.reset()
+    body = json.dumps(dict(candle_dicts(candles.iloc[:1])[0], record=False)).encode()
+    with _start_server('http') as connection:
+        connection.sendall(b'POST /predict HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % len(body) + body)
+        replies = connection.makefile('rb')
+        _, headers = _read_http_response(replies)
+        replies.read(int(headers['content-length']))
+        connection.sendall(b'GET /metrics HTTP/1.1\r\nHost: x\r\n\r\n')
+        status, headers = _read_http_response(replies)
+        text = replies.read(int(headers['content-length'])).decode()
+    assert status.startswith('HTTP/1.1 200') and headers['content-type'].startswith('text/plain; version=0.0.4')
+
+    families = _parse_prometheus(text)
+    kind, samples = families['predictor_stage_seconds']
+    assert kind == 'histogram' and samples
+    for stage in {re.search(r'stage="([^"]*)"', labels).group(1) for _, labels, _ in samples}:
+        buckets = [value for name, labels, value in samples
+                   if name.endswith('_bucket') and f'stage="{stage}"' in labels]
+        count = next(value for name, labels, value in samples
+                     if name.endswith('_count') and f'stage="{stage}"' in labels)
+        assert buckets == sorted(buckets) and buckets[-1] == count > 0
+    assert families['predictor_cache_misses_total'][0] == 'counter'
+    assert families['predictor_model_loaded'][1]
+    tracing.reset()
@@ -0,0 +1,47 @@
+import pytest
+
+from conftest import candle_dicts, write_models
+from model.predict import predict_one
+from model.shadow import ShadowEvaluator
+
+
+@pytest.fixture
+def shadow(tmp_path, registry, monkeypatch):
+    import model.shadow
+
+    evaluator = ShadowEvaluator(write_models(tmp_path / 'candidate', n_trees=10), log_path=tmp_path / 'shadow.jsonl')
+    monkeypatch.setattr(model.shadow, '_shadow', evaluator)
+    return evaluator
+
+
+def test_candidate_scored_off_the_request_path(shadow, candles):
+    rows = candle_dicts(candles.iloc[:20])
+    responses = [predict_one(row) for row in rows]
+    shadow.drain()
+    stats = shadow.stats()
+    assert stats['compared'] == len(rows) and stats['errors'] == 0
+    assert stats['mean_abs_difference']['meta_model'] > 0
+    assert all(response['status'] == 'success' for response in responses)
+
+
+def test_cache_hits_are_left_out_of_production_latency(shadow, candles):
+    row = candle_dicts(candles.iloc[:1])[0]
+    for _ in range(5):
+        predict_one(row)
+    shadow.drain()
+    stats = shadow.stats()
+    assert stats['compared'] == 5
+    assert stats['production_cached'] == 4
+    assert shadow.production_latency.count == 1
+    assert shadow.candidate_latency.count == 5
+
+
+def test_streamlit_predictions_are_shadowed(shadow):
+    from streamlit_app import run_prediction
+
+    result = run_prediction(45000.0, 45400.0, 44800.0, 1500.0, "Bitcoin ETF approved")
+    shadow.drain()
+    stats = shadow.stats()
+    assert stats['compared'] == 1 and stats['errors'] == 0
+    assert shadow.production_latency.count == 1
+    assert result['predictions']['meta_model'] == result['prediction']
@@ -0,0 +1,37 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from _synthetic import make_headlines, make_text_models
+from model.text_features import embed_headlines, text_feature_columns, text_features
+
+
+@pytest.fixture(scope='module')
+def text_models():
+    return make_text_models(n_headlines=500, n_components=8)
+
+
+def test_batches_match_one_call(text_models):
+    headlines = make_headlines(300, seed=2)
+    np.testing.assert_allclose(embed_headlines(text_models, headlines, batch_size=64),
+                               embed_headlines(text_models, headlines, batch_size=1000))
+
+
+def test_missing_headlines_embed_as_empty_text(text_models):
+    frame = pd.read_csv(io.StringIO('news_headline\nBitcoin rally\n\n'), skip_blank_lines=False)
+    headlines = frame['news_headline'].tolist()
+    assert isinstance(headlines[1], float)
+    embedded = embed_headlines(text_models, headlines + [None])
+    empty = embed_headlines(text_models, [''])[0]
+    np.testing.assert_array_equal(embedded[1], empty)
+    np.testing.assert_array_equal(embedded[2], empty)
+
+
+def test_single_matches_batch(text_models):
+    headline = 'Bitcoin ETF approved as institutional investors surge'
+    single = text_features(text_models, headline)
+    batch = text_feature_columns(text_models, [headline])
+    assert list(single) == list(batch)
+    np.testing.assert_allclose(list(single.values()), [column[0] for column in batch.values()])
@@ -0,0 +1,58 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from _synthetic import make_candles
+from model.feature_store import FeatureStore
+from model.registry import read_current, smoke_test
+from model.train import TRAINING_NAME, load_version, main
+
+FAST = ['--trees', '10', '--rounds', '10', '--new-trees', '5', '--new-rounds', '5', '--jobs', '1']
+
+
+@pytest.fixture
+def store(tmp_path):
+    candles = make_candles(1000, seed=3)
+    timestamps = pd.date_range('2024-01-01', periods=len(candles), freq='h', tz='UTC')
+    store = FeatureStore(tmp_path / 'features')
+    store.append(candles.iloc[:500], timestamps[:500])
+    return store, candles, timestamps
+
+
+def _train(store, out, *args, capsys):
+    main(['--store', str(store.directory), '--out', str(out), *FAST, *args])
+    return load_version(capsys.readouterr().out.strip().splitlines()[-1])
+
+
+def test_train_warm_start_and_promote(store, tmp_path, capsys):
+    store, candles, timestamps = store
+    out = tmp_path / 'versions'
+
+    models, first = _train(store, out, '--promote', capsys=capsys)
+    assert not first['warm_started'] and first['parent'] is None
+    assert read_current(out) == first['version']
+    smoke_test(models)
+
+    store.append(candles.iloc[500:], timestamps[500:])
+    warm, second = _train(store, out, '--warm-start', capsys=capsys)
+    assert second['warm_started'] and second['parent'] == first['version']
+    # Only candles after the previous training range are new training data
+    assert second['trained_from_ns'] == first['trained_from_ns']
+    assert second['trained_until_ns'] > first['holdout_until_ns']
+    assert len(warm['random_forest'].estimators_) == 15
+    assert warm['xgboost'].get_booster().num_boosted_rounds() == 15
+    np.testing.assert_array_equal(warm['scaler'].mean_, models['scaler'].mean_)
+    # Not promoted: CURRENT still serves the first version
+    assert read_current(out) == first['version']
+    assert json.loads((out / second['version'] / TRAINING_NAME).read_text())['version'] == second['version']
+
+
+def test_warm_start_needs_new_candles(store, tmp_path, capsys):
+    store, _, _ = store
+    out = tmp_path / 'versions'
+    _train(store, out, capsys=capsys)
+    with pytest.raises(SystemExit):
+        main(['--store', str(store.directory), '--out', str(out), *FAST, '--warm-start'])
+    assert 'too few to train on' in capsys.readouterr().err